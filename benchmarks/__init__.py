@@ -0,0 +1,15 @@
+"""
+Benchmarks for the client notes tools.
+
+Run from the repository root, e.g. `python -m benchmarks.run`. Importing the
+package puts `src/` and the repository root on sys.path so the benchmarks
+can import the modules the same way the scripts do.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for path in (os.path.join(ROOT, "src"), ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
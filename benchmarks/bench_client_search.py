@@ -0,0 +1,90 @@
+"""
+Measure per-keystroke latency of the client completer at large client counts.
+
+Every query is typed one character at a time and the completer is asked for
+its completions after each keystroke, as prompt_toolkit does. Queries cover
+name prefixes, later words, acronyms ('ADS') and substrings of random clients.
+With --fuzzy the old FuzzyWordCompleter is timed on the same keystrokes.
+
+Usage:
+    python -m benchmarks.bench_client_search [--clients 100000] [--queries 200] [--fuzzy]
+"""
+import argparse
+import random
+import time
+
+import benchmarks  # noqa: F401  (puts src/ on sys.path)
+from benchmarks.corpus import client_ids
+from client_index import ClientCompleter, ClientIndex, acronym, normalize  # noqa: E402
+from client_list import client_name_from_id  # noqa: E402
+from prompt_toolkit.completion import CompleteEvent, FuzzyWordCompleter  # noqa: E402
+from prompt_toolkit.document import Document  # noqa: E402
+
+TARGET_MS = 5
+
+
+def sample_queries(names:list, count:int, seed:int = 0) -> list[str]:
+    rng = random.Random(seed)
+    queries = []
+    for name in rng.sample(names, count):
+        key = normalize(name)
+        words = key.split(" ")
+        kind = len(queries) % 4
+        if kind == 0:
+            queries.append(name[:rng.randint(3, len(name))])
+        elif kind == 1:
+            queries.append(" ".join(words[rng.randrange(len(words)):]))
+        elif kind == 2:
+            queries.append(acronym(key).upper())
+        else:
+            start = rng.randrange(len(key) - 2)
+            queries.append(key[start:start + rng.randint(3, 8)])
+    return queries
+
+
+def keystroke_latencies(completer, queries:list) -> list[float]:
+    event = CompleteEvent(text_inserted=True)
+    latencies = []
+    for query in queries:
+        for end in range(1, len(query) + 1):
+            document = Document(query[:end])
+            start = time.perf_counter()
+            list(completer.get_completions(document, event))
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(label:str, latencies:list):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    worst = latencies[-1] * 1000
+    verdict = "ok" if p99 < TARGET_MS else f"over the {TARGET_MS} ms target"
+    print(f"{label:<20}{len(latencies):>8}{p50:>10.3f}{p99:>10.3f}{worst:>10.3f}  {verdict}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--fuzzy", action="store_true", help="Also time FuzzyWordCompleter")
+    args = parser.parse_args()
+
+    clients = [(client_id, client_name_from_id(client_id)) for client_id in client_ids(args.clients)]
+    start = time.perf_counter()
+    index = ClientIndex(clients)
+    built = time.perf_counter()
+    index.build_trigrams()
+    print(f"clients: {args.clients}, index built in {built - start:.2f}s, "
+          f"trigrams in {time.perf_counter() - built:.2f}s")
+
+    queries = sample_queries([name for _, name in clients], args.queries)
+    print(f"{'completer':<20}{'keys':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    report("ClientCompleter", keystroke_latencies(ClientCompleter(index), queries))
+    if args.fuzzy:
+        fuzzy = FuzzyWordCompleter([name for _, name in clients])
+        report("FuzzyWordCompleter", keystroke_latencies(fuzzy, queries[:max(len(queries) // 10, 1)]))
+
+
+if __name__ == "__main__":
+    main()
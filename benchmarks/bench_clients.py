@@ -0,0 +1,76 @@
+"""
+Time onboarding a large client list: one CSV, one command.
+
+A folder with an existing corpus and its search index gets a CSV of new
+clients applied with apply_changes(); the batch is then checked (every
+file created with the current structure, clients.json written once with
+every name, the new files in the search index) and a rename, merge and
+remove batch is timed on the result.
+
+Usage:
+    python -m benchmarks.bench_clients [--clients 5000] [--existing 2000]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import benchmarks  # noqa: F401  (puts src/ on sys.path)
+from benchmarks.corpus import write_corpus
+from clients import apply_changes, client_id_from_name  # noqa: E402
+from migrate import CURRENT_VERSION, file_version  # noqa: E402
+from search import connect, update_index  # noqa: E402
+
+TARGET_S = 10
+
+
+def onboarding(count:int) -> list[dict]:
+    return [{"op": "create", "name": f"ONBOARDED CLIENT {i:05d} & SONS, LLC"} for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--existing", type=int, default=2000, help="Client files already in the folder")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        client_dir = os.path.join(directory, "clients")
+        names_file = os.path.join(directory, "clients.json")
+        search_db = os.path.join(directory, "search.db")
+        write_corpus(client_dir, args.existing)
+        conn = connect(search_db)
+        update_index(conn, [client_dir])
+
+        changes = onboarding(args.clients)
+        start = time.perf_counter()
+        results = apply_changes(changes, [client_dir], names_file, None, search_db, None)
+        seconds = time.perf_counter() - start
+
+        failed = [error for _, error in results if error]
+        assert not failed, failed[:3]
+        with open(names_file, "r") as f:
+            names = json.load(f)
+        ids = [client_id_from_name(change["name"]) for change in changes]
+        assert len(names) == args.clients and set(names) == set(ids), "clients.json does not list every client"
+        assert all(file_version(os.path.join(client_dir, f"{client_id}.md")) == CURRENT_VERSION for client_id in ids)
+        indexed = conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        assert indexed == args.existing + args.clients, f"{indexed} files in the search index"
+        print(f"{'onboard ' + str(args.clients) + ' clients':<28}{seconds:>8.2f}s  "
+              f"({seconds / args.clients * 1e6:.0f} us per client, {args.existing} already there)  "
+              f"{'ok' if seconds < TARGET_S else f'over the {TARGET_S} s target'}")
+
+        batch = [{"op": "rename", "client": ids[0], "name": "RENAMED CLIENT, LLC"},
+                 {"op": "merge", "client": ids[1], "into": ids[2]},
+                 {"op": "remove", "client": ids[3]}]
+        start = time.perf_counter()
+        results = apply_changes(batch, [client_dir], names_file, None, search_db, None)
+        seconds = time.perf_counter() - start
+        assert not [error for _, error in results if error]
+        print(f"{'rename + merge + remove':<28}{seconds * 1000:>8.1f}ms")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
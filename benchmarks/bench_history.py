@@ -0,0 +1,100 @@
+"""
+Measure what the version history costs a save, and how much it stores.
+
+The same sequence of note edits (status updates, archives, deletes and
+adds, as noteTaker makes them) is applied to copies of a corpus with the
+history on and off. Then every edit is undone and the files are checked
+to be byte-identical to the corpus again.
+
+Usage:
+    python -m benchmarks.bench_history [--clients 200] [--edits 2000] [--notes 20]
+"""
+import argparse
+import filecmp
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+import benchmarks  # noqa: F401  (puts src/ on sys.path)
+import history  # noqa: E402
+from benchmarks.corpus import write_corpus
+from note import Note, tokenize_notes  # noqa: E402
+from store import edit_client_file, edit_note, insert_note, read_client_file, remove_note, replace_note  # noqa: E402
+
+
+def run_edits(client_dir:str, ids:list, edits:int, seed:int = 0) -> list[float]:
+    """Apply `edits` random note edits; returns the seconds each save took."""
+    rng = random.Random(seed)
+    seconds = []
+    for _ in range(edits):
+        file_path = os.path.join(client_dir, f"{rng.choice(ids)}.md")
+        content, digest = read_client_file(file_path)
+        notes = [note for notes in tokenize_notes(content).values() for note in notes]
+        kind = rng.choice(("update", "archive", "delete", "add")) if notes else "add"
+        start = time.perf_counter()
+        if kind == "add":
+            note = Note("2026-01-02", "2026-01-02", "EPA", f"benchmark note {rng.random():.6f}", "Submitted")
+            edit_client_file(file_path, lambda content: insert_note(content, "Que", note), op=kind)
+        else:
+            note = rng.choice(notes)
+            if kind == "update":
+                updated = Note(note.started, "2026-01-02", note.action, note.summary, "In FCP")
+                change = lambda content, current: replace_note(content, current, updated)  # noqa: E731
+            elif kind == "archive":
+                archived = Note(note.started, "2026-01-02", note.action, note.summary, note.status)
+                change = lambda content, current: insert_note(remove_note(content, current), "Archive", archived)  # noqa: E731
+            else:
+                change = remove_note
+            edit_note(file_path, note, change, digest, op=kind)
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def directory_size(directory:str) -> int:
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--edits", type=int, default=2000)
+    parser.add_argument("--notes", type=int, default=20, help="Notes per section of each client file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        corpus = os.path.join(directory, "corpus")
+        ids = write_corpus(corpus, args.clients, notes_per_section=args.notes)
+        file_size = statistics.mean(os.path.getsize(os.path.join(corpus, f"{client_id}.md")) for client_id in ids)
+
+        timings = {}
+        for keep in (False, True):
+            client_dir = os.path.join(directory, "history" if keep else "plain")
+            shutil.copytree(corpus, client_dir)
+            history.KEEP_HISTORY = keep
+            timings[keep] = run_edits(client_dir, ids, args.edits)
+
+        for keep in (False, True):
+            print(f"{'save, history ' + ('on' if keep else 'off'):<28}{statistics.median(timings[keep]) * 1000:>8.3f}ms "
+                  f"median, {statistics.mean(timings[keep]) * 1000:.3f}ms mean")
+
+        client_dir = os.path.join(directory, "history")
+        stored = directory_size(os.path.join(client_dir, history.HISTORY_DIR))
+        copies = file_size * args.edits
+        print(f"{'history size':<28}{stored / 1024:>8.0f}KB  ({stored / args.edits:.0f} bytes per edit; "
+              f"a copy per save would be {copies / 1024:.0f}KB, {copies / stored:.0f}x more)")
+
+        start = time.perf_counter()
+        results = history.undo_last(args.edits, [client_dir])
+        seconds = time.perf_counter() - start
+        assert not [error for _, error in results if error], [error for _, error in results if error][:3]
+        match, mismatch, errors = filecmp.cmpfiles(corpus, client_dir, [f"{client_id}.md" for client_id in ids],
+                                                   shallow=False)
+        assert not mismatch and not errors, f"{len(mismatch) + len(errors)} files differ after undoing every edit"
+        print(f"{'undo every edit':<28}{seconds:>8.2f}s  ({len(results)} edits, all {len(match)} files restored)")
+
+
+if __name__ == "__main__":
+    main()
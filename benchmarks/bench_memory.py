@@ -0,0 +1,84 @@
+"""
+Measure the memory held by parsed notes, old representation vs the slotted Note.
+
+The old representation is a plain Note with a per-instance __dict__ and
+'YYYY-MM-DD' date strings, plus the dict noteTaker built for every note.
+
+Usage:
+    python -m benchmarks.bench_memory [--notes 1000000]
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+
+import benchmarks  # noqa: F401  (puts src/ on sys.path)
+from benchmarks.corpus import ACTIONS, STATUSES
+from note import Note  # noqa: E402
+
+
+class LegacyNote:
+    """The Note class as it was before __slots__ and date ordinals."""
+
+    def __init__(self, started, updated, action, summary, status=None):
+        self.started = started
+        self.updated = updated
+        self.action = action
+        self.summary = summary
+        self.status = status
+
+
+def fresh(text:str) -> str:
+    """Return a new string object equal to `text`, as slicing a parsed line would."""
+    return (" " + text)[1:]
+
+
+def synthetic_fields(count:int, seed:int = 0):
+    """Yield (started, updated, action, summary, status) tuples like the parser produces."""
+    rng = random.Random(seed)
+    for i in range(count):
+        started = f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        updated = f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        yield (started, updated, fresh(rng.choice(ACTIONS)),
+               f"Summary {i} for the client modification", fresh(rng.choice(STATUSES)))
+
+
+def build_legacy(count:int) -> list:
+    notes = []
+    for started, updated, action, summary, status in synthetic_fields(count):
+        notes.append(LegacyNote(started, updated, action, summary, status))
+        # noteTaker.get_client_mods built a second, dict copy of every note
+        notes.append({"started": started, "updated": updated, "action": action, "summary": summary})
+    return notes
+
+
+def build_slotted(count:int) -> list:
+    return [Note(*fields) for fields in synthetic_fields(count)]
+
+
+def measure(builder, count:int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    notes = builder(count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del notes
+    gc.collect()
+    return current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--notes", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    legacy = measure(build_legacy, args.notes)
+    slotted = measure(build_slotted, args.notes)
+    print(f"notes: {args.notes}")
+    print(f"legacy Note + dict: {legacy / 2**20:10.1f} MiB  ({legacy / args.notes:6.1f} B/note)")
+    print(f"slotted Note:       {slotted / 2**20:10.1f} MiB  ({slotted / args.notes:6.1f} B/note)")
+    print(f"reduction:          {100 * (1 - slotted / legacy):9.1f} %")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Compare the single-pass note tokenizer with the original section/note regexes.
+
+Usage:
+    python -m benchmarks.bench_parser [--notes 2000] [--repeat 3]
+"""
+import argparse
+import random
+import time
+
+import benchmarks  # noqa: F401  (puts src/ on sys.path)
+from benchmarks.corpus import render_client
+from note import NOTE_SECTIONS, extract_note_section, parse_client_notes, tokenize_notes  # noqa: E402
+
+
+def build_file(notes:int, summary_length:int = 80, malformed_rate:float = 0.0) -> str:
+    """Build a client file with `notes` notes in each section."""
+    rng = random.Random(0)
+    return render_client(rng, notes, summary_length, malformed_rate, malformed_kinds=("missing_status",))
+
+
+def regex_parse(content:str):
+    return {section: parse_client_notes(extract_note_section(content, section))
+            for section in NOTE_SECTIONS}
+
+
+def best_of(func, content:str, repeat:int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(content)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--notes", type=int, default=2000, help="Notes per section in the large input")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    cases = [
+        ("large", build_file(args.notes)),
+        ("long summaries", build_file(args.notes // 10, summary_length=20000)),
+    ]
+    # Notes without Status make the lazy Summary group scan to the end of the
+    # section from every note, so the regex cost grows superlinearly.
+    for notes in (50, 100, 200):
+        cases.append((f"missing Status x{notes}", build_file(notes, malformed_rate=1.0)))
+
+    print(f"{'input':<24}{'size':>10}{'regex (s)':>12}{'tokenizer (s)':>15}{'speedup':>10}")
+    for name, content in cases:
+        regex_time = best_of(regex_parse, content, args.repeat)
+        tokenizer_time = best_of(tokenize_notes, content, args.repeat)
+        print(f"{name:<24}{len(content):>10}{regex_time:>12.4f}{tokenizer_time:>15.4f}"
+              f"{regex_time / tokenizer_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
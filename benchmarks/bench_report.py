@@ -0,0 +1,113 @@
+"""
+Measure the workload report at a million notes: columns vs dict loops.
+
+Synthetic notes (spread over ~3 years, 50 per client) are loaded into
+NoteColumns and the report is rendered; the same throughput and age
+aggregates are then computed with plain dict loops over the notes, and
+both results are checked to agree. With --corpus the whole command
+(parsing the client files included) is timed on a corpus on disk.
+
+Usage:
+    python -m benchmarks.bench_report [--notes 1000000] [--corpus CLIENTS]
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date
+
+import benchmarks  # noqa: F401  (puts src/ on sys.path)
+from benchmarks.corpus import ACTIONS, STATUSES, client_id, write_corpus
+from note import Note  # noqa: E402
+from report import (ARCHIVE, IN_PROGRESS, QUE, SECTIONS, WEEKS, NoteColumns, ages_by_action,  # noqa: E402
+                    render_report, weekly_throughput, write_report)
+
+TARGET_S = 10
+TODAY = date(2026, 1, 1).toordinal()
+
+
+def synthetic_notes(count:int, seed:int = 0) -> list[tuple[str, Note]]:
+    """(client_id, Note) pairs: mostly archived, started within ~3 years of TODAY."""
+    rng = random.Random(seed)
+    clients = [client_id(i) for i in range(max(count // 50, 1))]
+    notes = []
+    for _ in range(count):
+        started = TODAY - rng.randrange(1100)
+        updated = min(started + rng.randrange(90), TODAY)
+        section = rng.choices(SECTIONS, weights=(10, 5, 85))[0]
+        notes.append((rng.choice(clients), Note(started, updated, rng.choice(ACTIONS), "x",
+                                                 rng.choice(STATUSES), section=section)))
+    return notes
+
+
+def loop_aggregates(notes:list, today:int, weeks:int = WEEKS) -> tuple:
+    """Weekly opened/closed counts and median ages per section and action, one note at a time."""
+    first = (today - 1) // 7 - weeks + 1
+    opened, closed = [0] * weeks, [0] * weeks
+    ages = {"In Progress": defaultdict(list), "Que": defaultdict(list)}
+    for _, note in notes:
+        week = (note.started_ordinal - 1) // 7 - first
+        if 0 <= week < weeks:
+            opened[week] += 1
+        if note.section == "Archive":
+            week = (note.updated_ordinal - 1) // 7 - first
+            if 0 <= week < weeks:
+                closed[week] += 1
+        else:
+            ages[note.section][note.action].append(today - note.started_ordinal)
+    medians = {section: {action: statistics.median(values) for action, values in by_action.items()}
+               for section, by_action in ages.items()}
+    return opened, closed, medians
+
+
+def column_aggregates(columns:NoteColumns, today:int, weeks:int = WEEKS) -> tuple:
+    _, opened, closed = weekly_throughput(columns, today, weeks)
+    medians = {name: {action: median for action, _, median, _ in ages_by_action(columns, section, today)
+                      if action != "All actions"}
+               for name, section in (("In Progress", IN_PROGRESS), ("Que", QUE))}
+    return opened.tolist(), closed.tolist(), medians
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--notes", type=int, default=1_000_000)
+    parser.add_argument("--corpus", type=int, metavar="CLIENTS",
+                        help="Also time the report command on this many client files on disk")
+    args = parser.parse_args()
+
+    notes = synthetic_notes(args.notes)
+    columns, load_s = timed(NoteColumns.from_notes, notes)
+    rendered, render_s = timed(render_report, columns, TODAY)
+    (column_results, column_s) = timed(column_aggregates, columns, TODAY)
+    (loop_results, loop_s) = timed(loop_aggregates, notes, TODAY)
+    assert column_results == loop_results, "columnar and loop aggregates differ"
+
+    archived = int((columns.section == ARCHIVE).sum())
+    print(f"notes: {len(columns)} ({archived} archived), clients: {len(columns.clients)}")
+    print(f"{'load columns':<28}{load_s:>8.2f}s")
+    print(f"{'aggregate + render report':<28}{render_s:>8.2f}s  ({len(rendered)} chars)")
+    print(f"{'aggregates, columns':<28}{column_s:>8.3f}s")
+    print(f"{'aggregates, dict loops':<28}{loop_s:>8.3f}s  ({loop_s / column_s:.0f}x slower)")
+    total = load_s + render_s
+    print(f"{'report total':<28}{total:>8.2f}s  {'ok' if total < TARGET_S else f'over the {TARGET_S} s target'}")
+
+    if args.corpus:
+        with tempfile.TemporaryDirectory() as directory:
+            client_dir = os.path.join(directory, "clients")
+            write_corpus(client_dir, args.corpus)
+            output = os.path.join(directory, "report.md")
+            columns, seconds = timed(write_report, output, [client_dir], None, date.fromordinal(TODAY))
+            print(f"{'report command':<28}{seconds:>8.2f}s  ({len(columns)} notes of {args.corpus} client files)")
+
+
+if __name__ == "__main__":
+    main()
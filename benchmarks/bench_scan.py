@@ -0,0 +1,68 @@
+"""
+Measure how get_all_active_mods scales with reader threads, parser processes
+and simulated mount latency.
+
+Latency is simulated by sleeping before every file read, the way a slow
+network or drvfs mount blocks on open()/read().
+
+Usage:
+    python -m benchmarks.bench_scan [--clients 2000] [--latency-ms 0 2 10]
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import benchmarks  # noqa: F401  (puts src/ on sys.path)
+from benchmarks.corpus import write_corpus
+import main  # noqa: E402
+
+
+def with_latency(read, latency:float):
+    def slow_read(file_path):
+        time.sleep(latency)
+        return read(file_path)
+    return slow_read
+
+
+def timed_scan(io_executor=None, parse_executor=None) -> float:
+    start = time.perf_counter()
+    main.get_all_active_mods(io_executor=io_executor, parse_executor=parse_executor)
+    return time.perf_counter() - start
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--latency-ms", type=float, nargs="+", default=[0, 2, 10])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    read = main.read_client_file
+    with tempfile.TemporaryDirectory() as directory:
+        write_corpus(directory, args.clients)
+        main.CLIENT_DIRS = [directory]
+        print(f"clients: {args.clients}, cores: {os.cpu_count()}")
+        print(f"{'latency':>8}{'threads':>9}{'processes':>11}{'seconds':>10}{'speedup':>9}")
+
+        for latency_ms in args.latency_ms:
+            main.read_client_file = with_latency(read, latency_ms / 1000) if latency_ms else read
+            baseline = timed_scan()
+            print(f"{latency_ms:>6}ms{1:>9}{0:>11}{baseline:>10.3f}{1:>8.1f}x")
+            for workers in args.workers[1:] if args.workers[0] == 1 else args.workers:
+                with ThreadPoolExecutor(max_workers=workers) as io_executor:
+                    elapsed = timed_scan(io_executor)
+                print(f"{latency_ms:>6}ms{workers:>9}{0:>11}{elapsed:>10.3f}{baseline / elapsed:>8.1f}x")
+
+            processes = os.cpu_count() or 1
+            with ThreadPoolExecutor(max_workers=max(args.workers)) as io_executor, \
+                    ProcessPoolExecutor(max_workers=processes) as parse_executor:
+                timed_scan(io_executor, parse_executor)  # start the worker processes
+                elapsed = timed_scan(io_executor, parse_executor)
+            print(f"{latency_ms:>6}ms{max(args.workers):>9}{processes:>11}{elapsed:>10.3f}{baseline / elapsed:>8.1f}x")
+    main.read_client_file = read
+
+
+if __name__ == "__main__":
+    main_benchmark()
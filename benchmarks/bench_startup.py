@@ -0,0 +1,119 @@
+"""
+Measure noteTaker's startup: import cost and time to the first prompt.
+
+The import breakdown comes from `python -X importtime -c "import noteTaker"`.
+Time to first prompt is measured from launching a fresh interpreter, which
+runs noteTaker.main() on a pseudo-terminal, until "Client: " is printed;
+it is reported with a cold client-list snapshot and with a warm one, next
+to a bare interpreter printing the same prompt, which bounds what noteTaker
+itself can save.
+
+Usage:
+    python -m benchmarks.bench_startup [--clients 2000] [--repeat 5] [--top 10]
+"""
+import argparse
+import os
+import pty
+import select
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks import ROOT
+from benchmarks.corpus import write_corpus
+
+TARGET_MS = 150
+
+DRIVER = """
+import os, sys
+sys.path.insert(0, {root!r})
+import noteTaker, client_list
+noteTaker.CLIENT_DIRS = [{client_dir!r}]
+noteTaker.SOCKET_PATH = None
+client_list.SNAPSHOT_FILE = {snapshot!r}
+noteTaker.configure_logging()
+noteTaker.main()
+"""
+
+
+def import_times(top:int):
+    """Return the total self time and the `top` slowest imports, in microseconds."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import noteTaker"],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    total = sum(self_us for _, self_us, _ in rows)
+    top_level = [row for row in rows if not row[2].startswith("  ")]
+    return total, sorted(top_level, reverse=True)[:top], [row[2].strip() for row in rows]
+
+
+def time_to_prompt(code:str, cwd:str, timeout:float = 10.0) -> float:
+    """Run `code` in a new interpreter on a pty; seconds until the prompt appears."""
+    start = time.perf_counter()
+    pid, fd = pty.fork()
+    if pid == 0:
+        os.chdir(cwd)
+        os.execv(sys.executable, [sys.executable, "-c", code])
+
+    output = b""
+    try:
+        while b"Client:" not in output:
+            remaining = timeout - (time.perf_counter() - start)
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                raise TimeoutError(f"no prompt after {timeout}s:\n{output.decode(errors='replace')}")
+            try:
+                output += os.read(fd, 4096)
+            except OSError:  # child exited
+                raise RuntimeError(output.decode(errors="replace"))
+        return time.perf_counter() - start
+    finally:
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+        os.close(fd)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Slowest top-level imports to list")
+    args = parser.parse_args()
+
+    total, slowest, modules = import_times(args.top)
+    print(f"import noteTaker: {total / 1000:.1f} ms self time over {len(modules)} modules")
+    for cumulative_us, _, name in slowest:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name.strip()}")
+    for heavy in ("prompt_toolkit", "colorlog"):
+        print(f"  {heavy} imported eagerly: {'yes' if heavy in modules else 'no'}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        client_dir = os.path.join(directory, "clients")
+        write_corpus(client_dir, args.clients)
+        snapshot = os.path.join(directory, "client_list.json")
+        code = DRIVER.format(root=ROOT, client_dir=client_dir, snapshot=snapshot)
+
+        baseline, cold, warm = [], [], []
+        for _ in range(args.repeat):
+            baseline.append(time_to_prompt("print('Client:')", directory))
+            if os.path.exists(snapshot):
+                os.unlink(snapshot)
+            cold.append(time_to_prompt(code, directory))
+            warm.append(time_to_prompt(code, directory))
+
+    print(f"\ntime to first prompt ({args.clients} clients, best of {args.repeat}):")
+    interpreter = min(baseline) * 1000
+    print(f"  bare interpreter: {interpreter:7.1f} ms")
+    for label, samples in (("cold snapshot", cold), ("warm snapshot", warm)):
+        best = min(samples) * 1000
+        verdict = "ok" if best < TARGET_MS else f"over the {TARGET_MS} ms target"
+        print(f"  {label}: {best:10.1f} ms  (+{best - interpreter:.1f} ms, {verdict})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Deterministic generator for synthetic client note corpora.
+
+Files follow the exact layout of docs/clients/*.md: '## *In Progress*',
+'## *Que*' and '## *Archive*' sections closed by '----' rules, holding
+'- Started:/Updated:/Action:/Summary:/Status:' notes.
+"""
+import os
+import random
+from datetime import date, timedelta
+
+ACTIONS = ["EPA", "Add Sin", "Add", "Delete", "Sale", "Terms", "Description", "Photo", "Baseline"]
+STATUSES = ["Needs Submission", "Submitted", "In FCP", "Pending C&P", "FCP Validation In Progress"]
+SECTIONS = ["In Progress", "Que", "Archive"]
+RULES = {"In Progress": "--------------------", "Que": "-----------------------------------",
+         "Archive": "-----------------------------------"}
+WORDS = ("pricing removals vendor profile approved product baseline started photo adds needed "
+         "manufactures pending contracting officer confirmation description change submitted").split()
+NAME_WORDS = ("advanced digital solutions international american federal supply systems global "
+              "technical services medical products office furniture industrial safety tactical "
+              "environmental engineering data network security research group partners pacific "
+              "atlantic mountain valley river eagle summit pioneer quality precision integrated").split()
+NAME_SUFFIXES = ("INC", "LLC", "CORP", "CO", "INCORPORATED", "LTD")
+MALFORMED_KINDS = ("missing_status", "missing_updated", "bad_date", "no_space")
+FIRST_DAY = date(2023, 1, 1)
+
+
+def random_summary(rng:random.Random, length:int) -> str:
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:length].strip() or "x"
+
+
+def render_note(rng:random.Random, summary_length:int = 80, malformed:str = None) -> str:
+    """Render one note; `malformed` names one of MALFORMED_KINDS to break it."""
+    started = FIRST_DAY + timedelta(days=rng.randrange(900))
+    updated = started + timedelta(days=rng.randrange(60))
+    fields = [
+        ("- Started", started.isoformat()),
+        ("  Updated", updated.isoformat()),
+        ("  Action", rng.choice(ACTIONS)),
+        ("  Summary", random_summary(rng, summary_length)),
+        ("  Status", rng.choice(STATUSES)),
+    ]
+    if malformed == "missing_status":
+        fields.pop()
+    elif malformed == "missing_updated":
+        fields.pop(1)
+    elif malformed == "bad_date":
+        fields[0] = ("- Started", started.strftime("%m/%d/%Y"))
+    separator = ":" if malformed == "no_space" else ": "
+    return "\n".join(f"{name}{separator}{value}" for name, value in fields)
+
+
+def render_client(rng:random.Random, notes_per_section:int = 3, summary_length:int = 80,
+                  malformed_rate:float = 0.0, malformed_kinds:tuple = MALFORMED_KINDS) -> str:
+    """Render a whole client file."""
+    parts = ["\n"]
+    for section in SECTIONS:
+        notes = []
+        for _ in range(notes_per_section):
+            malformed = rng.choice(malformed_kinds) if rng.random() < malformed_rate else None
+            notes.append(render_note(rng, summary_length, malformed))
+        body = "\n\n".join(notes)
+        parts.append(f"## *{section}*\n\n{body}\n{RULES[section]}\n" if body else f"## *{section}*\n\n{RULES[section]}\n")
+    return "".join(parts)
+
+
+def client_id(index:int) -> str:
+    return f"CLIENT_{index:06d}_INC"
+
+
+def client_ids(count:int, seed:int = 0) -> list[str]:
+    """Return `count` distinct, company-like client IDs such as 'GLOBAL_DATA_SYSTEMS_LLC'."""
+    rng = random.Random(seed)
+    ids = set()
+    while len(ids) < count:
+        words = rng.sample(NAME_WORDS, rng.randint(1, 4)) + [rng.choice(NAME_SUFFIXES)]
+        if rng.random() < 0.1:
+            words.insert(rng.randint(1, len(words) - 1), "&")
+        name = "_".join(words).upper().replace("_&_", "__")
+        if name in ids:
+            name = f"{name}_{len(ids)}"
+        ids.add(name)
+    return sorted(ids)
+
+
+def write_corpus(directory:str, clients:int, notes_per_section:int = 3, summary_length:int = 80,
+                 malformed_rate:float = 0.0, seed:int = 0) -> list[str]:
+    """
+    Write `clients` client files into `directory`.
+
+    The same arguments and seed always produce byte-identical files.
+    Returns:
+        list[str]: The client IDs written, sorted.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    ids = []
+    for i in range(clients):
+        ids.append(client_id(i))
+        with open(os.path.join(directory, f"{client_id(i)}.md"), "w") as f:
+            f.write(render_client(rng, notes_per_section, summary_length, malformed_rate))
+    return ids
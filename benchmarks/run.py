@@ -0,0 +1,202 @@
+"""
+Run the benchmark suite on a synthetic corpus and write the results as JSON.
+
+Usage:
+    python -m benchmarks.run [--clients 1000] [--output bench.json] [--compare old.json]
+
+Each benchmark reports the best of --repeat runs. With --compare, the
+ratio against a previous results file is printed so regressions between
+commits stand out.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks import ROOT
+from benchmarks.corpus import write_corpus
+
+import main as index_daemon  # src/main.py  # noqa: E402
+import noteTaker  # noqa: E402
+from note import get_active_mods  # noqa: E402
+from query import NoteStore  # noqa: E402
+
+
+def best_of(func, repeat:int, setup=None) -> float:
+    """Run `func` `repeat` times and return the fastest wall time in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def stub_prompts():
+    """Answer every menu and content prompt without a terminal."""
+    answers = {"Select a section": "Que", "Select an action type": "Epa", "What would you like to update?": "summary"}
+
+    async def choose(message, options, default=None):
+        return answers.get(message, options[0][0])
+
+    async def get_user_content():
+        return "Benchmark summary written without prompts"
+
+    noteTaker.choose = choose
+    noteTaker.get_user_content = get_user_content
+
+
+def run_edit(ask):
+    """Answer an edit's prompts, then apply its write as the background writer would."""
+    write, _, _ = asyncio.run(ask)
+    return write()
+
+
+def bench_parse(client_dir:str, ids:list, repeat:int) -> dict:
+    contents = []
+    for client_id in ids:
+        with open(os.path.join(client_dir, f"{client_id}.md")) as f:
+            contents.append((f.read(), client_id))
+
+    def run():
+        for content, client_id in contents:
+            get_active_mods(content, client_id)
+
+    seconds = best_of(run, repeat)
+    return {"seconds": seconds, "ops": len(contents), "bytes": sum(len(c) for c, _ in contents)}
+
+
+def bench_scan_and_generate(client_dir:str, repeat:int) -> dict:
+    index_daemon.CLIENT_DIRS = [client_dir]
+    index_daemon.MOD_FILE = os.path.join(os.path.dirname(client_dir), "index.md")
+    scan = best_of(index_daemon.get_all_active_mods, repeat)
+    notes = NoteStore()
+    index_daemon.get_all_active_mods(notes)
+
+    def generate():
+        # Remove the file so every run pays for a real write
+        if os.path.exists(index_daemon.MOD_FILE):
+            os.unlink(index_daemon.MOD_FILE)
+        index_daemon.generate_mod_md(notes)
+
+    return {
+        "get_all_active_mods": {"seconds": scan, "ops": 1},
+        "generate_mod_md": {"seconds": best_of(generate, repeat), "ops": 1},
+    }
+
+
+def bench_edits(client_dir:str, ids:list, ops:int) -> dict:
+    """Time each noteTaker edit once per client on `ops` different clients."""
+    noteTaker.CLIENT_DIRS = [client_dir]
+    stub_prompts()
+    targets = ids[:ops]
+    results = {}
+
+    def timed(name, func):
+        start = time.perf_counter()
+        for client_id in targets:
+            func(client_id, os.path.join(client_dir, f"{client_id}.md"))
+        results[name] = {"seconds": time.perf_counter() - start, "ops": len(targets)}
+
+    def with_mods(edit):
+        def run(client_id, file_path):
+            mods, digest = noteTaker.get_client_mods(file_path)
+            edit(client_id, file_path, mods, digest)
+        return run
+
+    timed("add_note_to_file", lambda client_id, _: noteTaker.add_note_to_file(
+        client_id, "Que", "EPA", "Benchmark note added without prompts"))
+    # Keys keep their pre-asyncio names so --compare works across the change
+    timed("update_existing_note", with_mods(
+        lambda _, file_path, mods, digest: run_edit(noteTaker.ask_note_update(file_path, mods, digest))))
+    timed("archive_note", with_mods(
+        lambda _, file_path, mods, digest: run_edit(noteTaker.ask_archive(file_path, mods, digest))))
+    timed("remove_note_from_file", with_mods(
+        lambda _, file_path, mods, digest: run_edit(noteTaker.ask_delete(file_path, mods, digest))))
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results:dict, previous:dict):
+    print(f"\n{'benchmark':<28}{'previous (s)':>14}{'current (s)':>14}{'ratio':>8}")
+    for name, current in results["benchmarks"].items():
+        old = previous.get("benchmarks", {}).get(name)
+        if not old:
+            continue
+        ratio = current["seconds"] / old["seconds"] if old["seconds"] else float("inf")
+        flag = "  <-- slower" if ratio > 1.2 else ""
+        print(f"{name:<28}{old['seconds']:>14.4f}{current['seconds']:>14.4f}{ratio:>7.2f}x{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--notes-per-section", type=int, default=3)
+    parser.add_argument("--summary-length", type=int, default=80)
+    parser.add_argument("--malformed-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--edit-ops", type=int, default=200, help="Clients each noteTaker edit is timed on")
+    parser.add_argument("--output", default="bench.json")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    corpus_params = {
+        "clients": args.clients,
+        "notes_per_section": args.notes_per_section,
+        "summary_length": args.summary_length,
+        "malformed_rate": args.malformed_rate,
+        "seed": args.seed,
+    }
+    logging.disable(logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as directory:
+        client_dir = os.path.join(directory, "clients")
+        ids = write_corpus(client_dir, **corpus_params)
+
+        benchmarks = {"get_active_mods": bench_parse(client_dir, ids, args.repeat)}
+        benchmarks.update(bench_scan_and_generate(client_dir, args.repeat))
+        benchmarks.update(bench_edits(client_dir, ids, min(args.edit_ops, len(ids))))
+    logging.disable(logging.NOTSET)
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "corpus": corpus_params,
+            "repeat": args.repeat,
+        },
+        "benchmarks": benchmarks,
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    for name, result in benchmarks.items():
+        per_op = result["seconds"] / result["ops"] * 1000
+        print(f"{name:<28}{result['seconds']:>10.4f}s  {per_op:>9.3f} ms/op")
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
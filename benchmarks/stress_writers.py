@@ -0,0 +1,134 @@
+"""
+Stress concurrent writers of the client files and check that no update is lost.
+
+N writer processes add notes to the same few clients through noteTaker, then
+update each of their notes from a stale copy of the file (loaded before a
+pause in which the other writers keep saving), so most updates go through
+the optimistic merge. A reader process meanwhile re-parses every client file
+in a loop, as the index daemon does, and checks it never sees a partial file.
+
+Afterwards every added note must be in its client file exactly once, updated
+if its update was accepted. --no-lock disables the advisory lock to show the
+lost updates it prevents.
+
+Usage:
+    python -m benchmarks.stress_writers [--writers 8] [--notes 25] [--clients 3] [--no-lock]
+"""
+import argparse
+import contextlib
+import logging
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+import benchmarks  # noqa: F401  (puts src/ and the root on sys.path)
+from benchmarks.corpus import write_corpus
+import noteTaker  # noqa: E402
+import store  # noqa: E402
+from note import tokenize_notes  # noqa: E402
+
+
+def writer(client_dir:str, ids:list, number:int, notes:int, lock:bool, results):
+    logging.disable(logging.CRITICAL)
+    noteTaker.CLIENT_DIRS = [client_dir]
+    if not lock:
+        store.client_lock = lambda file_path: contextlib.nullcontext()
+    rng = random.Random(number)
+    added = []
+    for i in range(notes):
+        client_id = rng.choice(ids)
+        summary = f"writer {number} note {i}"
+        if noteTaker.add_note_to_file(client_id, "Que", "EPA", summary):
+            added.append((client_id, summary))
+
+    updated, conflicts = [], 0
+    for client_id, summary in added:
+        file_path = os.path.join(client_dir, f"{client_id}.md")
+        mods, digest = noteTaker.get_client_mods(file_path)
+        time.sleep(rng.random() * 0.01)  # let the other writers move the file on
+        note = next((note for note in mods if note.summary == summary), None)
+        if note is None:
+            continue
+        new_note = noteTaker.Note(note.started, note.updated, note.action, f"{summary} updated", note.status)
+        try:
+            noteTaker.replace_note_in_file(file_path, note, new_note, digest)
+            updated.append((client_id, summary))
+        except store.ConcurrentModificationError:
+            conflicts += 1
+    results.put((added, updated, conflicts))
+
+
+def reader(client_dir:str, ids:list, stop, results):
+    reads = partial = 0
+    while not stop.is_set():
+        for client_id in ids:
+            with open(os.path.join(client_dir, f"{client_id}.md")) as f:
+                content = f.read()
+            malformed = []
+            sections = tokenize_notes(content, malformed)
+            reads += 1
+            if malformed or not content.rstrip().endswith("-") or not sections["Archive"]:
+                partial += 1
+    results.put((reads, partial))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--notes", type=int, default=25, help="Notes each writer adds, then updates")
+    parser.add_argument("--clients", type=int, default=3)
+    parser.add_argument("--no-lock", action="store_true", help="Disable the advisory lock")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        client_dir = os.path.join(directory, "clients")
+        ids = write_corpus(client_dir, args.clients)
+        results, reader_results = multiprocessing.Queue(), multiprocessing.Queue()
+        stop = multiprocessing.Event()
+        daemon = multiprocessing.Process(target=reader, args=(client_dir, ids, stop, reader_results))
+        daemon.start()
+
+        start = time.perf_counter()
+        writers = [multiprocessing.Process(target=writer, args=(client_dir, ids, number, args.notes,
+                                                                not args.no_lock, results))
+                   for number in range(args.writers)]
+        for process in writers:
+            process.start()
+        outcomes = [results.get() for _ in writers]
+        for process in writers:
+            process.join()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        reads, partial = reader_results.get()
+        daemon.join()
+
+        summaries = []
+        for client_id in ids:
+            with open(os.path.join(client_dir, f"{client_id}.md")) as f:
+                summaries += [(client_id, note.summary) for notes in tokenize_notes(f.read()).values()
+                              for note in notes]
+
+    lost = duplicated = stale = 0
+    for added, updated, _ in outcomes:
+        updated = set(updated)
+        for client_id, summary in added:
+            expected = f"{summary} updated" if (client_id, summary) in updated else summary
+            count = summaries.count((client_id, expected))
+            lost += count == 0
+            duplicated += count > 1
+            stale += (client_id, summary) in updated and (client_id, summary) in summaries
+
+    total = sum(len(added) for added, _, _ in outcomes)
+    print(f"{args.writers} writers on {args.clients} clients, {elapsed:.2f}s, lock {'off' if args.no_lock else 'on'}")
+    print(f"notes added:     {total}")
+    print(f"updates applied: {sum(len(updated) for _, updated, _ in outcomes)}")
+    print(f"updates refused: {sum(conflicts for _, _, conflicts in outcomes)}")
+    print(f"reader passes:   {reads} files read, {partial} partial")
+    print(f"lost: {lost}, duplicated: {duplicated}, update lost: {stale}")
+    return 1 if lost or duplicated or stale or partial else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
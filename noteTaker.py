@@ -1,143 +1,177 @@
+import argparse
+import asyncio
+import json
 import os
-import re
-import inquirer
+import sys
 import logging
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from prompt_toolkit import prompt
-from prompt_toolkit.completion import FuzzyWordCompleter
+from functools import partial
+
+# prompt_toolkit takes ~200 ms to import, so it is imported inside the
+# functions that prompt; importing this module has no side effects.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from client_list import load_all_clients
+from config import CLIENT_DIRS, COLD_DIR, SOCKET_PATH, client_path
+from journal import append_operation
+from logs import console_handlers, setup_logging, timed_operation
+from note import Note
+from operations import apply_operations, list_notes
+from service_client import ServiceError, ServiceUnavailable, connect
+from store import (ConcurrentModificationError, edit_client_file, edit_note, insert_note,
+                   read_client_file, remove_note, replace_note)
+
+# Client folders, the cold history and the notes service socket come from
+# src/config.py (NOTES_* environment variables). When the notes service
+# (src/service.py) is running, clients, notes and batch operations go
+# through it; otherwise the files are read here.
+# Append adds and batch operations to the client's journal instead of
+# rewriting its file (--journal); the index daemon compacts the journals
+USE_JOURNAL = False
+
+CONFLICT_MESSAGE = ("The note was changed or removed by someone else since it was loaded. "
+                    "Select the client again and retry.")
+# Clients matching what has been typed so far that are loaded in the background
+PREFETCH_CANDIDATES = 3
 
-CLIENT_DIR = "/mnt/g/clients/client_notes/docs/clients"
+logger = logging.getLogger(__name__)
 
-# Ensure logs directory exists
-if not os.path.exists("logs"):
-    os.makedirs("logs")
 
-logger = logging.getLogger(__name__)
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(message)s",
-    handlers=[
-        logging.FileHandler("logs/note_taker.log"),
-        logging.StreamHandler()
-    ]
-)
-
-def get_client_list():
-    """Get a list of all client files in the directory."""
-    clients = []
-    for filename in sorted(os.listdir(CLIENT_DIR)):
-        if filename.endswith(".md"):
-            client_id = filename[:-3]  # Remove .md extension
-            client_name = client_id.replace("_", " ").replace("  ", " & ")
-            clients.append((client_id, client_name))
-    return clients
-
-
-def select_client(clients):
-    """Let user select a client with autocomplete support."""
-    # Create a dictionary mapping client names to their IDs
-    client_dict = {name: client_id for client_id, name in clients}
-
-    # Create a fuzzy word completer with all client names
-    client_completer = FuzzyWordCompleter(list(client_dict.keys()))
+def configure_logging():
+    """Log to the console, logs/note_taker.log and logs/operations.jsonl from a background thread."""
+    setup_logging("note_taker")
+
+
+@contextmanager
+def log_above_prompt():
+    """
+    Print console log lines above the active prompt.
+
+    Saves finish on a background thread while the next prompt is already
+    shown; prompt_toolkit's patched stdout redraws the prompt below them.
+    """
+    from prompt_toolkit.patch_stdout import patch_stdout
+
+    with patch_stdout(raw=True):
+        handlers = console_handlers()
+        streams = [handler.setStream(sys.stdout) for handler in handlers]
+        try:
+            yield
+        finally:
+            for handler, stream in zip(handlers, streams):
+                if stream is not None:
+                    handler.setStream(stream)
+
+
+def get_client_list(service=None):
+    """Get a list of all clients of every client folder.
+
+    Comes from the notes service when it runs. Otherwise it is served from
+    a snapshot that is only rebuilt when a folder's mtime changes, so
+    startup costs one stat() per folder instead of a full listing.
+    """
+    if service is not None:
+        try:
+            return service.list_clients()
+        except (ServiceUnavailable, ServiceError) as e:
+            logger.warning(f"Notes service failed ({e}), reading the client folders instead.")
+    return load_all_clients(CLIENT_DIRS)
+
+
+async def ask(message=""):
+    """Read one line of text."""
+    from prompt_toolkit import PromptSession
+
+    return await PromptSession().prompt_async(message)
+
+
+async def choose(message, options, default=None):
+    """Let the user pick one of `options`, (value, label) pairs; returns None on Ctrl+C."""
+    from prompt_toolkit.shortcuts.choice_input import ChoiceInput
 
-    logger.info("Start typing to search for a client (Tab for completion, Enter to select):")
     try:
-        # Use prompt_toolkit's prompt with autocomplete
-        client_name = prompt("Client: ", completer=client_completer)
-
-        # Verify the selected client exists
-        # and get current notes
-        if client_name in client_dict:
-            current_note_file = os.path.join(CLIENT_DIR, f"{client_dict[client_name]}.md")
-            if os.path.exists(current_note_file):
-                with open(current_note_file, "r") as f:
-                    current_notes = f.read()
-                    if not current_notes.strip():
-                        logger.warning(f"Client file '{current_note_file}' is empty.")
-
-                return (client_dict[client_name], client_name)
-        else:
-            logger.warning(f"Client '{client_name}' not found. Please try again.")
-            return select_client(clients)
-    except KeyboardInterrupt:
-        # Handle Ctrl+C gracefully
+        return await ChoiceInput(message=message, options=options, default=default).prompt_async()
+    except (KeyboardInterrupt, EOFError):
         return None
 
 
+async def select_client(session, index):
+    """Let user select a client with autocomplete support.
+
+    Args:
+        session (PromptSession): The "Client: " prompt, with its completer.
+        index (ClientIndex): Search index over the client list.
+    Returns:
+        tuple[str, str]: (client_id, client_name), or None if the user quit.
+    """
+    logger.info("Start typing to search for a client (Tab for completion, Enter to select):")
+    while True:
+        try:
+            client_name = await session.prompt_async()
+        except (KeyboardInterrupt, EOFError):
+            # Handle Ctrl+C gracefully
+            return None
+
+        # Accept a client's name or ID, in any case
+        selected = index.resolve(client_name)
+        if selected:
+            return selected
+        logger.warning(f"Client '{client_name}' not found. Please try again.")
+
+
 def get_client_mods(note_file):
-    """Get a list of all modifications for a specific client note."""
-    mods = []
-    with open(note_file, "r") as f:
-        content = f.read()
-        
-        # Find all detailed notes using regex
-        pattern = r"- Started: (\d{4}-\d{2}-\d{2})\n\s+Updated: (\d{4}-\d{2}-\d{2})\n\s+Action: (.+?)\n\s+Summary: (.+?)(?=\n\n- Started:|\Z)"
-        matches = re.findall(pattern, content, re.DOTALL)
-        
-        for started, updated, action, summary in matches:
-            mods.append({
-                'started': started,
-                'updated': updated,
-                'action': action.strip(),
-                'summary': summary.strip()
-            })
-    return mods
-
-
-def select_section():
+    """Get all modifications (Note objects) for a specific client note.
+
+    Returns:
+        tuple[list[Note], str]: The notes in file order and the content hash
+            they were parsed from, which edits use to detect concurrent changes.
+    """
+    content, digest = read_client_file(note_file)
+    return list_notes(content), digest
+
+
+async def select_section():
     """Let user select which section to add the note to using a dropdown."""
-    questions = [
-        inquirer.List(
-            "section",
-            message="Select a section",
-            choices=[
-                ("In Progress", "In Progress"),
-                ("Que", "Que"),
-                ("Archive", "Archive"),
-            ],
-        )
-    ]
-
-    answers = inquirer.prompt(questions)
-    return answers["section"] if answers else None
-
-
-def get_mod_action():
+    return await choose("Select a section", [
+        ("In Progress", "In Progress"),
+        ("Que", "Que"),
+        ("Archive", "Archive"),
+    ])
+
+
+async def get_mod_action():
     """Get the action type from the user."""
-    questions = [
-        inquirer.List(
-            "action",
-            message="Select an action type",
-            choices=[
-                ("EPA", "Epa"),
-                ("Add Sin", "Add Sin"),
-                ("Add", "Add"),
-                ("Delete", "Delete"),
-                ("Sale", "Sale"),
-                ("Terms", "Terms"),
-                ("Description", "Description"),
-                ("Photo", "Photo"),
-                ("Other", "Other"),
-            ],
-        )
-    ]
-    answers = inquirer.prompt(questions)
-    
-    if answers and answers["action"] == "Other":
-        custom_action = input("Enter custom action type: ")
-        return custom_action
-        
-    return answers["action"] if answers else "MOD"
-
-
-def get_user_content():
-    """Get the note content from the user."""
+    action = await choose("Select an action type", [
+        ("Epa", "EPA"),
+        ("Add Sin", "Add Sin"),
+        ("Add", "Add"),
+        ("Delete", "Delete"),
+        ("Sale", "Sale"),
+        ("Terms", "Terms"),
+        ("Description", "Description"),
+        ("Photo", "Photo"),
+        ("Other", "Other"),
+    ])
+
+    if action == "Other":
+        return await ask("Enter custom action type: ")
+
+    return action or "MOD"
+
+
+async def get_user_content():
+    """Get the note content from the user; empty if they press Ctrl+C."""
+    from prompt_toolkit import PromptSession
+
     logger.info("\nEnter note content (press Enter twice to finish):")
+    session = PromptSession()
     lines = []
     while True:
-        line = input()
+        try:
+            line = await session.prompt_async("")
+        except (KeyboardInterrupt, EOFError):
+            return ""
         if not line and (not lines or not lines[-1]):
             break
         lines.append(line)
@@ -146,402 +180,394 @@ def get_user_content():
 
 def add_note_to_file(client_id, section, action, summary):
     """Add the note to the appropriate section in the client file."""
-    file_path = os.path.join(CLIENT_DIR, f"{client_id}.md")
+    file_path = client_path(client_id, CLIENT_DIRS)
 
-    # Read the file content
-    with open(file_path, "r") as f:
-        content = f.read()
+    if USE_JOURNAL:
+        append_operation(file_path, {"op": "add", "section": section, "action": action, "summary": summary})
+        return True
 
     # Format the note with timestamps
     timestamp = datetime.now().strftime("%Y-%m-%d")
-    formatted_note = f"- Started: {timestamp}\n  Updated: {timestamp}\n  Action: {action}\n  Summary: {summary}"
+    note = Note(timestamp, timestamp, action, summary)
 
-    # Find the section and add the note after it
-    section_pattern = f"## \\*{section}\\*"
-    section_match = re.search(section_pattern, content)
+    # Insert the note after the section heading in a single read/write
+    return edit_client_file(file_path, lambda content: insert_note(content, section, note), op="add") is not None
 
-    if section_match:
-        # Find the position to insert the note (after the section heading)
-        pos = section_match.end()
 
-        # Insert the note after the section heading
-        new_content = content[:pos] + "\n\n" + formatted_note + content[pos:]
+async def select_note(mods, message, date_field="updated"):
+    """Let user select one of the client's notes; returns the Note or None."""
+    choices = []
+    for i, note in enumerate(mods):
+        summary_preview = note.summary[:40] + "..." if len(note.summary) > 40 else note.summary
+        choices.append((i, f"[{getattr(note, date_field)}] {note.action}: {summary_preview}"))
 
-        # Write the updated content back to the file
-        with open(file_path, "w") as f:
-            f.write(new_content)
+    note_index = await choose(message, choices)
+    if note_index is None:
+        return None
+    return mods[note_index]
 
-        return True
 
-    return False
+def replace_note_in_file(file_path, note, updated_note, digest):
+    """Replace a parsed note with `updated_note`, splicing on the note's offsets."""
+    return edit_note(file_path, note, lambda content, current: replace_note(content, current, updated_note),
+                     digest, op="update") is not None
 
 
-def update_existing_note(file_path, mods):
-    """Update an existing note in the client file."""
-    if not mods:
-        return False
+def move_note_to_archive(file_path, note, digest):
+    """Move a parsed note to the top of the Archive section with today's date."""
+    timestamp = datetime.now().strftime("%Y-%m-%d")
+    archived = Note(note.started, timestamp, note.action, note.summary, note.status)
+    return edit_note(
+        file_path, note, lambda content, current: insert_note(remove_note(content, current), "Archive", archived),
+        digest, op="archive"
+    ) is not None
 
-    # Let user select which note to update
-    choices = []
-    for i, note in enumerate(mods):
-        summary_preview = note["summary"][:40] + "..." if len(note["summary"]) > 40 else note["summary"]
-        choices.append((f"[{note['started']}] {note['action']}: {summary_preview}", i))
-        
-    questions = [
-        inquirer.List(
-            "note_index",
-            message="Select a note to update",
-            choices=choices,
-        )
-    ]
-
-    answers = inquirer.prompt(questions)
-    if not answers:
+
+def delete_note_from_file(file_path, note, digest):
+    """Remove a parsed note from the client file."""
+    return edit_note(file_path, note, remove_note, digest, op="delete") is not None
+
+
+async def browse_history(client_id, page_size=10):
+    """Page through a client's cold archive, newest first; it is only read when asked for."""
+    from cold import format_note, load_history
+
+    notes = await asyncio.to_thread(load_history, client_id, COLD_DIR)
+    if not notes:
+        logger.info("No archived history for this client.")
+        return
+    page = 0
+    pages = -(-len(notes) // page_size)
+    while True:
+        logger.info(f"\nArchived history, page {page + 1} of {pages}:")
+        for note in notes[page * page_size:(page + 1) * page_size]:
+            logger.info(format_note(note))
+        options = ([("next", "Next page")] if page + 1 < pages else []) + \
+                  ([("previous", "Previous page")] if page else []) + [("back", "Go back")]
+        move = await choose("History", options)
+        if move == "next":
+            page += 1
+        elif move == "previous":
+            page -= 1
+        else:
+            return
+
+
+def recorded(op, file_path, action, write):
+    """Wrap a write so that running it adds a record to the operations log."""
+    client_id = os.path.basename(file_path)[:-3]
+
+    def run():
+        with timed_operation(op, client_id, action=action) as record:
+            result = write()
+            record["ok"] = bool(result)
+        return result
+    return run
+
+
+def save_note_edit(edit, *args):
+    """Run a note edit, reporting a concurrent change of the note instead of raising it."""
+    try:
+        return edit(*args)
+    except ConcurrentModificationError:
+        logger.error(CONFLICT_MESSAGE)
         return False
 
-    note_index = answers["note_index"]
-    note = mods[note_index]
+
+async def ask_new_note(client_id, client_name):
+    """Prompt for a new note.
+
+    Returns:
+        tuple: (write, success message, failure message) for
+            BackgroundWriter.submit, or None if the user cancelled.
+    """
+    # Get section to add note to
+    section = await select_section()
+    if not section:
+        logger.info("Operation canceled.")
+        return None
+
+    # Get action type
+    action_type = await get_mod_action()
+
+    # Get note content
+    summary = await get_user_content()
+    if not summary:
+        logger.warning("\nNo note content provided. Note was not added.")
+        return None
+
+    file_path = client_path(client_id, CLIENT_DIRS)
+    return (recorded("add", file_path, action_type,
+                     partial(add_note_to_file, client_id, section, action_type, summary)),
+            f"\nNote added successfully for {client_name}!",
+            f"\nFailed to add note. Section '{section}' not found in the file.")
+
+
+async def ask_note_update(file_path, mods, digest):
+    """Prompt for changes to an existing note; returns (write, success, failure) or None.
+
+    `digest` is the content hash the notes in `mods` were parsed from.
+    """
+    # Let user select which note to update
+    note = await select_note(mods, "Select a note to update", date_field="started")
+    if not note:
+        return None
 
     logger.info(f"\nCurrent note:")
-    logger.info(f"Started: {note['started']}")
-    logger.info(f"Updated: {note['updated']}")
-    logger.info(f"Action: {note['action']}")
-    logger.info(f"Summary: {note['summary']}")
-    
+    logger.info(f"Started: {note.started}")
+    logger.info(f"Updated: {note.updated}")
+    logger.info(f"Action: {note.action}")
+    logger.info(f"Summary: {note.summary}")
+
     # Choose what to update
-    update_questions = [
-        inquirer.Checkbox(
-            "fields",
-            message="What would you like to update?",
-            choices=[
-                ("Action", "action"),
-                ("Summary", "summary"),
-            ],
-        )
-    ]
-    update_answers = inquirer.prompt(update_questions)
-    if not update_answers or not update_answers["fields"]:
+    fields = await choose("What would you like to update?", [
+        ("summary", "Summary"),
+        ("action", "Action"),
+        ("both", "Action and summary"),
+    ])
+    if not fields:
         logger.warning("No fields selected for update. Operation cancelled.")
-        return False
-        
+        return None
+
     # Get updated values
-    updated_note = note.copy()
-    
-    if "action" in update_answers["fields"]:
-        updated_note["action"] = get_mod_action()
-        
-    if "summary" in update_answers["fields"]:
+    new_action = note.action
+    new_summary = note.summary
+
+    if fields in ("action", "both"):
+        new_action = await get_mod_action()
+
+    if fields in ("summary", "both"):
         logger.info("\nEnter the updated summary (press Enter twice to finish):")
-        updated_note["summary"] = get_user_content()
-        
-    if updated_note["summary"] == note["summary"] and updated_note["action"] == note["action"]:
+        new_summary = await get_user_content()
+
+    if new_summary == note.summary and new_action == note.action:
         logger.warning("No changes made. Update cancelled.")
-        return False
-        
+        return None
+
     # Update the timestamp
-    updated_note["updated"] = datetime.now().strftime("%Y-%m-%d")
-    
-    # Read the file content
-    with open(file_path, "r") as f:
-        content = f.read()
-    
-    # Format the old note to find and remove it
-    if note.get("_legacy", False):
-        old_entry = f"- {note['started']}: {note['summary']}"
-    else:
-        old_entry = f"- Started: {note['started']}\n  Updated: {note['updated']}\n  Action: {note['action']}\n  Summary: {note['summary']}"
-    
-    # Format the new note
-    new_entry = f"- Started: {updated_note['started']}\n  Updated: {updated_note['updated']}\n  Action: {updated_note['action']}\n  Summary: {updated_note['summary']}"
-    
-    # Use regex for more precise matching with proper handling of surrounding whitespace
-    pattern = f"(\n\n)?{re.escape(old_entry)}(\n\n)?"
-    
-    # Replace the old note with the new one
-    if re.search(pattern, content):
-        new_content = re.sub(pattern, f"\n\n{new_entry}\n\n", content, count=1)
-        
-        # Clean up excessive newlines
-        new_content = re.sub(r'\n{3,}', '\n\n', new_content)
-        
-        # Write the updated content back to the file
-        with open(file_path, "w") as f:
-            f.write(new_content)
-            
-        return True
-        
-    logger.error("Could not find the original note in the file. This might be due to a format mismatch.")
-    return False
+    updated_note = Note(note.started, datetime.now().strftime("%Y-%m-%d"), new_action, new_summary, note.status)
+    return (recorded("update", file_path, new_action,
+                     partial(save_note_edit, replace_note_in_file, file_path, note, updated_note, digest)),
+            "\nNote updated successfully!", "\nFailed to update note.")
 
 
-def archive_note(client_id, mods):
-    """Move a note to the Archive section in the client file."""
-    note_file_path = os.path.join(CLIENT_DIR, f"{client_id}.md")
-    
-    # Let user select which note to archive
-    choices = []
-    for i, note in enumerate(mods):
-        summary_preview = note["summary"][:40] + "..." if len(note["summary"]) > 40 else note["summary"]
-        choices.append((f"[{note['updated']}] {note['action']}: {summary_preview}", i))
-        
-    questions = [
-        inquirer.List(
-            "note_index",
-            message="Select a note to archive",
-            choices=choices,
-        )
-    ]
-
-    answers = inquirer.prompt(questions)
-    if not answers:
-        return False
+async def ask_archive(file_path, mods, digest):
+    """Prompt for a note to move to the Archive section; returns (write, success, failure) or None."""
+    note = await select_note(mods, "Select a note to archive")
+    if not note:
+        return None
+    return (recorded("archive", file_path, note.action,
+                     partial(save_note_edit, move_note_to_archive, file_path, note, digest)),
+            "\nNote archived successfully!", "\nFailed to archive note.")
 
-    note_index = answers["note_index"]
-    note = mods[note_index]
 
-    # Format the note to find and remove it
-    entry_to_remove = f"- Started: {note['started']}\n  Updated: {note['updated']}\n  Action: {note['action']}\n  Summary: {note['summary']}"
-    
-    # Format the new note for archive with updated timestamp
-    timestamp = datetime.now().strftime("%Y-%m-%d")
-    formatted_note = f"- Started: {note['started']}\n  Updated: {timestamp}\n  Action: {note['action']}\n  Summary: {note['summary']}"
-
-    # Read the file as lines for better handling
-    with open(note_file_path, "r") as f:
-        lines = f.read().split('\n')
-    
-    # Find and remove the note
-    entry_lines = entry_to_remove.split('\n')
-    new_lines = []
-    i = 0
-    found = False
-    
-    while i < len(lines):
-        if i+len(entry_lines)-1 < len(lines) and lines[i] == entry_lines[0]:
-            # Check if this is our note
-            match = True
-            for j in range(1, len(entry_lines)):
-                if i+j >= len(lines) or lines[i+j] != entry_lines[j]:
-                    match = False
+async def ask_delete(file_path, mods, digest):
+    """Prompt for a note to remove from the client file; returns (write, success, failure) or None."""
+    note = await select_note(mods, "Select a note to delete")
+    if not note:
+        return None
+    return (recorded("delete", file_path, note.action,
+                     partial(save_note_edit, delete_note_from_file, file_path, note, digest)),
+            f"Note '{note.summary[:40]}...' removed successfully.", "\nFailed to delete note.")
+
+
+def apply_client_operations(client_id, ops):
+    """
+    Apply every operation for one client with a single read and a single write.
+
+    Returns:
+        list[tuple[dict, str]]: Each operation with its error, or None on success.
+    """
+    return apply_operations(client_path(client_id, CLIENT_DIRS), ops, journal=USE_JOURNAL)
+
+
+def run_batch(ops, workers=8, service=None):
+    """
+    Run operations grouped by client, applying the client files in parallel.
+
+    With a notes service the whole batch is sent to it instead, so its
+    parsed notes are updated along with the files.
+    Returns:
+        int: The number of failed operations.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    groups = {}
+    for op in ops:
+        groups.setdefault(op.get("client"), []).append(op)
+
+    results = None
+    if service is not None:
+        try:
+            results = service.mutate(ops, journal=USE_JOURNAL)
+        except (ServiceUnavailable, ServiceError) as e:
+            logger.warning(f"Notes service failed ({e}), applying the operations here instead.")
+    if results is None:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(apply_client_operations, client_id, client_ops)
+                       for client_id, client_ops in groups.items()]
+            results = [result for future in futures for result in future.result()]
+
+    failed = 0
+    for op, error in results:
+        if error:
+            failed += 1
+            logger.error(f"[failed] {op.get('op')} {op.get('client')}: {error}")
+        else:
+            logger.info(f"[ok] {op.get('op')} {op.get('client')}")
+    logger.info(f"{len(ops) - failed}/{len(ops)} operations applied to {len(groups)} clients.")
+    return failed
+
+
+def read_batch_file(path):
+    """Read one JSON operation per line, skipping blank lines."""
+    ops = []
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                ops.append(json.loads(line))
+    return ops
+
+
+async def run_interactive(index, service=None):
+    """
+    The interactive session: one asyncio loop for every prompt.
+
+    While a client name is typed, the best matches are read and parsed in
+    the background, and saves are handed to a writer thread, so neither
+    reading nor writing a client file holds up the next prompt. With a
+    notes service, notes come from its memory instead.
+    """
+    from prompt_toolkit import PromptSession
+    from background import BackgroundWriter, ClientPrefetcher
+    from client_index import ClientCompleter
+
+    prefetcher = ClientPrefetcher(CLIENT_DIRS, service=service)
+    writer = BackgroundWriter(prefetcher)
+    session = PromptSession("Client: ", completer=ClientCompleter(index))
+
+    def prefetch_candidates(buffer):
+        if buffer.text.strip():
+            prefetcher.prefetch(client_id for client_id, _ in index.search(buffer.text, PREFETCH_CANDIDATES))
+
+    session.default_buffer.on_text_changed += prefetch_candidates
+
+    edits = {"update": ask_note_update, "delete": ask_delete, "archive": ask_archive}
+    with log_above_prompt():
+        try:
+            while True:
+                selected = await select_client(session, index)
+                if not selected:
+                    logger.info("Exiting program.")
                     break
-            
-            if match:
-                # Skip these lines (the note we're removing)
-                i += len(entry_lines)
-                found = True
-                continue
-        
-        new_lines.append(lines[i])
-        i += 1
-    
-    # Find the Archive section
-    archive_index = -1
-    for i, line in enumerate(new_lines):
-        if line.strip() == "## *Archive*":
-            archive_index = i
-            break
-    
-    if archive_index != -1 and found:
-        # Insert the note after the Archive heading
-        archive_note_lines = formatted_note.split('\n')
-        new_lines = new_lines[:archive_index+1] + [''] + archive_note_lines + [''] + new_lines[archive_index+1:]
-        
-        # Write the updated content back to the file
-        with open(note_file_path, "w") as f:
-            f.write('\n'.join(new_lines))
-        
-        return True
-    
-    return False
 
+                # selected client and note file
+                client_id, client_name = selected
+                logger.info(f"\nSelected: {client_name}")
+                current_note_file = client_path(client_id, CLIENT_DIRS)
+
+                # Get and display client modifications, including saves still in flight
+                await writer.wait_for(client_id)
+                try:
+                    mods, digest = await prefetcher.get(client_id)
+                except FileNotFoundError:
+                    logger.error(f"Client file '{current_note_file}' does not exist.")
+                    continue
+                if mods:
+                    logger.info("\nExisting notes:")
+                    for i, note in enumerate(mods, 1):
+                        logger.info(f"{i}. [{note.updated}] {note.action}: {note.summary[:50]}...")
+                else:
+                    logger.warning(f"Client file '{current_note_file}' has no notes.")
+
+                # Ask whether to add a new note or update an existing one
+                action = await choose("What would you like to do?", [
+                    ("add", "Add a new note"),
+                    ("update", "Update an existing note"),
+                    ("delete", "Delete an existing note"),
+                    ("archive", "Archive an existing note"),
+                    ("history", "Browse archived history"),
+                    ("back", "Go back"),
+                ])
+
+                # Handle user action
+                if action in (None, "back"):
+                    continue
+                if action == "history":
+                    await browse_history(client_id)
+                    continue
+                if action == "add":
+                    edit = await ask_new_note(client_id, client_name)
+                elif not mods:
+                    logger.warning(f"No existing notes to {action}.")
+                    continue
+                else:
+                    edit = await edits[action](current_note_file, mods, digest)
 
-def remove_note_from_file(client_id, mods):
-    """Remove a note from the client file."""
-    note_file_path = os.path.join(CLIENT_DIR, f"{client_id}.md")
-    
-    # Let user select which note to delete
-    choices = []
-    for i, note in enumerate(mods):
-        summary_preview = note["summary"][:40] + "..." if len(note["summary"]) > 40 else note["summary"]
-        choices.append((f"[{note['updated']}] {note['action']}: {summary_preview}", i))
-        
-    questions = [
-        inquirer.List(
-            "note_index",
-            message="Select a note to delete",
-            choices=choices,
-        )
-    ]
-
-    answers = inquirer.prompt(questions)
-    if not answers:
-        return False
+                if edit:
+                    writer.submit(client_id, *edit)
+        finally:
+            await writer.drain()
+            prefetcher.close()
 
-    note_index = answers["note_index"]
-    note = mods[note_index]
-
-    # Format the note to find and remove it
-    entry_to_remove = f"- Started: {note['started']}\n  Updated: {note['updated']}\n  Action: {note['action']}\n  Summary: {note['summary']}"
-    
-    # Read the file as lines for better handling
-    with open(note_file_path, "r") as f:
-        lines = f.read().split('\n')
-    
-    # Find and remove the note
-    entry_lines = entry_to_remove.split('\n')
-    new_lines = []
-    i = 0
-    found = False
-    
-    while i < len(lines):
-        if i+len(entry_lines)-1 < len(lines) and lines[i] == entry_lines[0]:
-            # Check if this is our note
-            match = True
-            for j in range(1, len(entry_lines)):
-                if i+j >= len(lines) or lines[i+j] != entry_lines[j]:
-                    match = False
-                    break
-            
-            if match:
-                # Skip these lines (the note we're removing)
-                i += len(entry_lines)
-                found = True
-                continue
-        
-        new_lines.append(lines[i])
-        i += 1
-    
-    if found:
-        # Clean up consecutive empty lines
-        clean_lines = []
-        prev_empty = False
-        for line in new_lines:
-            if not line.strip():
-                if not prev_empty:
-                    clean_lines.append(line)
-                prev_empty = True
-            else:
-                clean_lines.append(line)
-                prev_empty = False
-        
-        # Write the updated content back to the file
-        with open(note_file_path, "w") as f:
-            f.write('\n'.join(clean_lines))
-        
-        logger.info(f"Note '{note['summary'][:40]}...' removed successfully.")
-        return True
-    
-    logger.error("Could not find the note to delete.")
-    return False
 
 def main():
     # Main function to run the client notes manager
-    clients = get_client_list()
+    service = connect(SOCKET_PATH)
+    clients = get_client_list(service)
     if not clients:
         logger.error("No client files found!")
         return
     logger.info("\n=== Client Notes Manager ===\n")
 
-    while True:
-        selected = select_client(clients)
-        if not selected:
-            logger.info("Exiting program.")
-            break
-        
-        # selected client and note file
-        client_id, client_name = selected
-        logger.info(f"\nSelected: {client_name}")
-        current_note_file = os.path.join(CLIENT_DIR, f"{client_id}.md")
-        
-        if not os.path.exists(current_note_file):
-            logger.error(f"Client file '{current_note_file}' does not exist.")
-            continue
-
-        with open(current_note_file, "r") as f:
-            content = f.read()
-            if not content.strip():
-                logger.warning(f"Client file '{current_note_file}' is empty.")
-
-        # Get and display client modifications
-        mods = get_client_mods(current_note_file)
-        if mods:
-            logger.info("\nExisting notes:")
-            for i, note in enumerate(mods, 1):
-                logger.info(f"{i}. [{note['updated']}] {note['action']}: {note['summary'][:50]}...")
-
-        # Ask whether to add a new note or update an existing one
-        questions = [
-            inquirer.List(
-                "action",
-                message="What would you like to do?",
-                choices=[
-                    ("Add a new note", "add"),
-                    ("Update an existing note", "update"),
-                    ("Delete an existing note", "delete"),
-                    ("Archive an existing note", "archive"),
-                    ("Go back", "back"),
-                ],
-            )
-        ]
-        action = inquirer.prompt(questions)["action"]
-
-        # Handle user action
-        if action == "back":
-            continue
-        elif action == "add":
-            # Get section to add note to
-            section = select_section()
-            if not section:
-                logger.info("Operation canceled.")
-                continue
-
-            # Get action type
-            action_type = get_mod_action()
-            
-            # Get note content
-            summary = get_user_content()
-
-            if summary:
-                success = add_note_to_file(client_id, section, action_type, summary)
-                if success:
-                    logger.info(f"\nNote added successfully for {client_name}!")
-                else:
-                    logger.error(f"\nFailed to add note. Section '{section}' not found in the file.")
-            else:
-                logger.warning("\nNo note content provided. Note was not added.")
-                
-        elif action == "update":
-            if not mods:
-                logger.warning("No existing notes to update.")
-                continue
-
-            success = update_existing_note(current_note_file, mods)
-            if success:
-                logger.info("\nNote updated successfully!")
-            else:
-                logger.error("\nFailed to update note.")
-        
-        elif action == "delete":
-            if not mods:
-                logger.error("No existing notes to delete.")
-                continue
-
-            success = remove_note_from_file(client_id, mods)
-            if success:
-                logger.info("\nNote deleted successfully!")
-            else:
-                logger.error("\nFailed to delete note.")
-           
-        elif action == "archive":
-            if not mods:
-                logger.error("No existing notes to archive.")
-                continue
-
-            success = archive_note(client_id, mods)
-            if success:
-                logger.info("\nNote archived successfully!")
-            else:
-                logger.error("\nFailed to archive note.")
+    from client_index import ClientIndex
+    index = ClientIndex(clients)
+    # Substring matches scan every name until the trigram index is ready
+    threading.Thread(target=index.build_trigrams, daemon=True).start()
+
+    asyncio.run(run_interactive(index, service))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Add, update, archive or delete client notes. Runs interactively without arguments."
+    )
+    parser.add_argument("--batch", metavar="OPS_JSONL",
+                        help="Apply one JSON operation per line, e.g. "
+                             '{"op": "add", "client": "ACME_INC", "section": "Que", "action": "EPA", "summary": "..."}')
+    parser.add_argument("--workers", type=int, default=8, help="Client files applied in parallel (default: 8)")
+    parser.add_argument("--journal", action="store_true",
+                        help="Append adds and batch operations to the client journals instead of rewriting the files")
+    subparsers = parser.add_subparsers(dest="op")
+
+    add_parser = subparsers.add_parser("add", help="Add a note")
+    add_parser.add_argument("client", help="Client ID (file name without .md)")
+    add_parser.add_argument("--section", default="In Progress", choices=["In Progress", "Que", "Archive"])
+    add_parser.add_argument("--action", default="MOD")
+    add_parser.add_argument("--summary", required=True)
+    add_parser.add_argument("--status")
+
+    for name, help_text in (("update", "Update a note"), ("archive", "Archive a note"), ("delete", "Delete a note")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("client", help="Client ID (file name without .md)")
+        sub.add_argument("--note", type=int, required=True, help="1-based position of the note in the client file")
+        if name == "update":
+            sub.add_argument("--action")
+            sub.add_argument("--summary")
+            sub.add_argument("--status")
+    return parser.parse_args(argv)
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    configure_logging()
+    args = parse_args()
+    USE_JOURNAL = args.journal
+    if args.batch:
+        failed = run_batch(read_batch_file(args.batch), workers=args.workers, service=connect(SOCKET_PATH))
+        sys.exit(1 if failed else 0)
+    elif args.op:
+        op = {key: value for key, value in vars(args).items()
+              if key not in ("batch", "workers", "journal") and value is not None}
+        sys.exit(1 if run_batch([op], workers=1, service=connect(SOCKET_PATH)) else 0)
+    else:
+        main()
\ No newline at end of file
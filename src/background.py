@@ -0,0 +1,153 @@
+"""
+Background reads and writes of client files for the interactive noteTaker.
+
+The prompts run on one asyncio loop; everything that touches the disk runs
+on worker threads instead. ClientPrefetcher loads the clients the user is
+likely to pick while they are still typing, so the client's notes are
+usually parsed before Enter is pressed. BackgroundWriter applies saves in
+order on a single thread, so the next menu appears without waiting for the
+write. When the notes service runs, clients come from its memory instead
+and nothing is prefetched.
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import client_signature
+from config import client_path
+from operations import list_notes
+from service_client import ServiceError, ServiceUnavailable
+from store import read_client_file
+
+logger = logging.getLogger(__name__)
+
+
+def load_client(file_path:str) -> tuple:
+    """Read and parse a client file; returns (signature, notes, content hash)."""
+    # Stat first: if the file changes while it is read, the stale signature forces a reload
+    signature = client_signature(file_path)
+    content, digest = read_client_file(file_path)
+    return signature, list_notes(content), digest
+
+
+class ClientPrefetcher:
+    """
+    Read-ahead cache of parsed client files.
+
+    Entries are checked against the file's signature when they are used, so
+    a client saved by someone else after it was prefetched is read again.
+    Attributes:
+        service (ServiceClient): The notes service, or None to read the files.
+        loads (OrderedDict): client file path -> future of load_client(),
+            least recently used first.
+        hits (int): Clients that were already loaded when asked for.
+    """
+
+    def __init__(self, client_dirs:list[str], workers:int = 2, size:int = 32, service=None):
+        self.client_dirs = client_dirs
+        self.service = service
+        self.size = size
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self.loads = OrderedDict()
+        self.hits = 0
+
+    def file_path(self, client_id:str) -> str:
+        return client_path(client_id, self.client_dirs)
+
+    def prefetch(self, client_ids):
+        """Start loading clients that are not loaded or loading yet."""
+        if self.service is not None:
+            return
+        for client_id in client_ids:
+            file_path = self.file_path(client_id)
+            if file_path in self.loads:
+                self.loads.move_to_end(file_path)
+                continue
+            self.loads[file_path] = self.executor.submit(load_client, file_path)
+            while len(self.loads) > self.size:
+                self.loads.popitem(last=False)
+
+    def invalidate(self, client_id:str):
+        self.loads.pop(self.file_path(client_id), None)
+
+    async def get(self, client_id:str) -> tuple:
+        """
+        Return (notes, content hash) of a client, loading it now if it was not prefetched.
+
+        Raises:
+            FileNotFoundError: If the client file does not exist.
+        """
+        if self.service is not None:
+            try:
+                # A round trip to memory; not worth a thread hand-off
+                return self.service.get(client_id)
+            except (ServiceUnavailable, ServiceError) as e:
+                logger.warning(f"Notes service failed ({e}), reading the client files instead.")
+                self.service = None
+        file_path = self.file_path(client_id)
+        future = self.loads.get(file_path)
+        if future is not None:
+            try:
+                signature, mods, digest = await asyncio.wrap_future(future)
+                if signature == await asyncio.to_thread(client_signature, file_path):
+                    self.hits += 1
+                    return mods, digest
+            except OSError:
+                pass
+        self.loads[file_path] = self.executor.submit(load_client, file_path)
+        _, mods, digest = await asyncio.wrap_future(self.loads[file_path])
+        return mods, digest
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class BackgroundWriter:
+    """
+    Apply client file edits on one worker thread, in the order they were submitted.
+
+    The caller gets control back immediately; the outcome is logged when the
+    write finishes. A client with a write in flight is not read until the
+    write is done, so the next load of that client includes it.
+    """
+
+    def __init__(self, prefetcher:ClientPrefetcher):
+        self.prefetcher = prefetcher
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="writer")
+        self.pending = {}
+
+    def submit(self, client_id:str, write, success:str, failure:str):
+        """
+        Run `write()` in the background.
+
+        `success` is logged when it returns a true value and `failure` when it
+        returns a false one; exceptions are logged with their message.
+        """
+        self.prefetcher.invalidate(client_id)
+        future = self.executor.submit(write)
+        self.pending[client_id] = future
+
+        def done(future):
+            try:
+                if future.result():
+                    logger.info(success)
+                else:
+                    logger.error(failure)
+            except Exception as e:
+                logger.error(f"{failure} {e}")
+
+        future.add_done_callback(done)
+
+    async def wait_for(self, client_id:str):
+        """Wait until the writes already submitted for a client have finished."""
+        future = self.pending.get(client_id)
+        if future is not None and not future.done():
+            await asyncio.wait([asyncio.wrap_future(future)])
+
+    async def drain(self):
+        """Wait for every pending write."""
+        unfinished = sum(1 for future in self.pending.values() if not future.done())
+        if unfinished:
+            logger.info(f"Waiting for {unfinished} saves to finish...")
+        await asyncio.to_thread(self.executor.shutdown, wait=True)
@@ -0,0 +1,81 @@
+import os
+
+from note import get_active_mods
+from store import journal_path, read_client_content
+
+
+def file_signature(stat_result) -> tuple:
+    """Build the cache key for a file from its stat result (mtime, size, inode)."""
+    return (stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino)
+
+
+def client_signature(file_path:str, stat_result=None) -> tuple:
+    """
+    Build the cache key for a client file, covering its operation journal.
+
+    A pending journal moves the mtime to the journal's and adds its size,
+    so appending an operation changes the key just like rewriting the file.
+    """
+    signature = file_signature(stat_result or os.stat(file_path))
+    try:
+        journal = os.stat(journal_path(file_path))
+    except FileNotFoundError:
+        return signature
+    return (max(signature[0], journal.st_mtime_ns), signature[1] + journal.st_size, signature[2])
+
+
+class ParseCache:
+    """
+    Cache of parsed client files keyed on each file's (mtime, size, inode).
+
+    A file is only re-read and re-parsed when its signature changes, so an
+    unchanged client directory costs one stat() per file per pass.
+    Attributes:
+        entries (dict): Maps file path to (signature, client_mods).
+        parsed (int): Number of files parsed during the last refresh.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.parsed = 0
+
+    def lookup(self, file_path:str) -> tuple:
+        """Return (signature, cached mods) for a file; mods is None if it changed."""
+        signature = client_signature(file_path)
+        entry = self.entries.get(file_path)
+        if entry and entry[0] == signature:
+            return signature, entry[1]
+        return signature, None
+
+    def store(self, file_path:str, signature:tuple, client_mods:list[dict], sections:dict = None):
+        """Record freshly parsed mods for a file; `sections`, all of its notes, is for subclasses that index them."""
+        self.entries[file_path] = (signature, client_mods)
+        self.parsed += 1
+
+    def get(self, file_path:str, client_name:str) -> list[dict]:
+        """Return the active mods for a file, parsing it only if it changed."""
+        signature, client_mods = self.lookup(file_path)
+        if client_mods is not None:
+            return client_mods
+
+        content = read_client_content(file_path)
+        client_mods = get_active_mods(content, client_name)
+        self.store(file_path, signature, client_mods)
+        return client_mods
+
+    def discard(self, file_path:str):
+        """Forget a file, e.g. after it was deleted or renamed away."""
+        self.entries.pop(file_path, None)
+
+    def client_mods(self) -> list[dict]:
+        """Return the cached mods of every file, ordered by file path."""
+        all_client_mods = []
+        for file_path in sorted(self.entries):
+            all_client_mods.extend(self.entries[file_path][1])
+        return all_client_mods
+
+    def prune(self, live_paths:set):
+        """Drop entries for files that no longer exist in the directory."""
+        for file_path in list(self.entries):
+            if file_path not in live_paths:
+                del self.entries[file_path]
@@ -0,0 +1,152 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+from prompt_toolkit.completion import Completer, Completion
+
+EXACT, PREFIX, ACRONYM, WORD_PREFIX, SUBSTRING = range(5)
+
+
+def normalize(text:str) -> str:
+    """Lower-case a client name or ID and reduce it to single-space separated words."""
+    return " ".join(text.lower().replace("_", " ").replace("&", " ").split())
+
+
+def acronym(key:str) -> str:
+    """Initials of a normalized name: 'advanced digital solutions' -> 'ads'."""
+    return "".join(word[0] for word in key.split(" ") if word)
+
+
+def trigrams(text:str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def prefix_range(sorted_keys:list, prefix:str) -> range:
+    """Positions of the entries of a sorted list that start with `prefix`."""
+    start = bisect_left(sorted_keys, prefix)
+    return range(start, bisect_left(sorted_keys, prefix + "\uffff", start))
+
+
+class ClientIndex:
+    """
+    Precomputed search index over client names and IDs.
+
+    Every client is matched on its normalized name, so 'Smith & Jones',
+    'SMITH__JONES' and 'smith jones' are the same key. Results are ranked by
+    match kind, then alphabetically:
+        exact match, name prefix, acronym prefix ('ADS' for Advanced Digital
+        Solutions), prefix of a later word, and finally any substring.
+
+    The first four come from bisecting sorted key lists; substrings go
+    through a trigram index, scanning the postings of the query's rarest
+    trigram (or every key until build_trigrams() has run). Each stage stops as soon as `limit` results are collected, so
+    the cost of a query depends on the limit rather than the client count.
+    Attributes:
+        clients (list[tuple[str, str]]): (client_id, client_name), sorted by name.
+    """
+
+    def __init__(self, clients:list[tuple[str, str]]):
+        keyed = sorted((normalize(name), client_id, name) for client_id, name in clients)
+        self.keys = [key for key, _, _ in keyed]
+        self.clients = [(client_id, name) for _, client_id, name in keyed]
+
+        acronyms = sorted((acronym(key), i) for i, key in enumerate(self.keys))
+        self.acronyms = [value for value, _ in acronyms]
+        self.acronym_owners = array("i", (i for _, i in acronyms))
+
+        # Every word after the first, with the client it belongs to
+        words = sorted((word, i) for i, key in enumerate(self.keys) for word in key.split(" ")[1:])
+        self.words = [word for word, _ in words]
+        self.word_owners = array("i", (i for _, i in words))
+
+        self.by_key = {}
+        for i, key in enumerate(self.keys):
+            self.by_key.setdefault(key, i)
+        for i, (client_id, _) in enumerate(self.clients):
+            self.by_key.setdefault(client_id.lower(), i)
+
+        # Built by build_trigrams(), which callers may run on a background thread
+        self.trigrams = None
+
+    def build_trigrams(self):
+        """Build the trigram index used for substring matches (seconds at 100k clients)."""
+        postings = defaultdict(list)
+        for i, key in enumerate(self.keys):
+            for trigram in trigrams(key):
+                postings[trigram].append(i)
+        self.trigrams = {trigram: array("i", owners) for trigram, owners in postings.items()}
+
+    def __len__(self):
+        return len(self.clients)
+
+    def resolve(self, text:str):
+        """Return the (client_id, client_name) whose name or ID is `text`, or None."""
+        i = self.by_key.get(text.strip().lower(), self.by_key.get(normalize(text)))
+        return self.clients[i] if i is not None else None
+
+    def search(self, text:str, limit:int = 20) -> list[tuple[str, str]]:
+        """Return up to `limit` (client_id, client_name) matching `text`, best first."""
+        return [self.clients[i] for _, i in self.ranked(text, limit)]
+
+    def ranked(self, text:str, limit:int = 20) -> list[tuple[int, int]]:
+        """Return up to `limit` (match kind, position in self.clients) pairs, best first."""
+        query = normalize(text)
+        if not query:
+            return [(PREFIX, i) for i in range(min(limit, len(self.clients)))]
+
+        results = []
+        seen = set()
+
+        def add(kind, i):
+            if i not in seen:
+                seen.add(i)
+                results.append((kind, i))
+            return len(results) >= limit
+
+        # An exact match sorts first in its own prefix range
+        for i in prefix_range(self.keys, query):
+            if add(EXACT if self.keys[i] == query else PREFIX, i):
+                return results
+
+        if len(query) > 1 and " " not in query:
+            for position in prefix_range(self.acronyms, query):
+                if add(ACRONYM, self.acronym_owners[position]):
+                    return results
+
+        # Every query word starts a word after the key's first one; walk the
+        # entries of the rarest query word (all but the last must be whole)
+        query_words = query.split(" ")
+        ranges = [range(bisect_left(self.words, word), bisect_right(self.words, word))
+                  for word in query_words[:-1]]
+        ranges.append(prefix_range(self.words, query_words[-1]))
+        needle = " " + query
+        for position in min(ranges, key=len):
+            i = self.word_owners[position]
+            if needle in self.keys[i] and add(WORD_PREFIX, i):
+                return results
+
+        if len(query) >= 3:
+            for i in self.substring_candidates(query):
+                if query in self.keys[i] and add(SUBSTRING, i):
+                    return results
+        return results
+
+    def substring_candidates(self, query:str):
+        """Clients that may contain `query`: the postings of its rarest trigram."""
+        if self.trigrams is None:  # not built yet; scan every key
+            return range(len(self.keys))
+        postings = [self.trigrams.get(trigram) for trigram in trigrams(query)]
+        return min(postings, key=len) if all(postings) else ()
+
+
+class ClientCompleter(Completer):
+    """prompt_toolkit completer that looks up the text typed so far in a ClientIndex."""
+
+    def __init__(self, index:ClientIndex, limit:int = 20):
+        self.index = index
+        self.limit = limit
+
+    def get_completions(self, document, complete_event):
+        text = document.text_before_cursor
+        for client_id, client_name in self.index.search(text, self.limit):
+            yield Completion(client_name, start_position=-len(text), display_meta=client_id)
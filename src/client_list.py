@@ -0,0 +1,67 @@
+import json
+import os
+
+from store import atomic_write
+
+SNAPSHOT_FILE = os.path.join(os.path.expanduser("~"), ".cache", "client_notes", "client_list.json")
+
+
+def client_name_from_id(client_id:str) -> str:
+    """Turn a file stem like 'Smith__Jones_LLC' into 'Smith & Jones LLC'."""
+    return client_id.replace("_", " ").replace("  ", " & ")
+
+
+def list_clients(client_dir:str) -> list[tuple[str, str]]:
+    """List (client_id, client_name) for every .md file, sorted by file name."""
+    clients = []
+    for filename in sorted(os.listdir(client_dir)):
+        if filename.endswith(".md"):
+            client_id = filename[:-3]  # Remove .md extension
+            clients.append((client_id, client_name_from_id(client_id)))
+    return clients
+
+
+def load_client_list(client_dir:str, snapshot_file:str = None) -> list[tuple[str, str]]:
+    """
+    Return the client list, served from a snapshot while the directory is unchanged.
+
+    Adding, removing or renaming a file updates the directory's mtime, so one
+    stat() tells whether the snapshot is still valid; edits to existing client
+    files do not. A stale, missing or unreadable snapshot is rebuilt from a
+    full listing. Failing to save the snapshot is not an error. The snapshot
+    file keeps one entry per directory.
+    """
+    snapshot_file = snapshot_file or SNAPSHOT_FILE
+    directory = os.path.abspath(client_dir)
+    mtime_ns = os.stat(directory).st_mtime_ns
+    try:
+        with open(snapshot_file, "r") as f:
+            snapshots = json.load(f)
+    except (OSError, ValueError):
+        snapshots = {}
+    if not isinstance(snapshots, dict):
+        snapshots = {}
+    try:
+        snapshot = snapshots[directory]
+        if snapshot["mtime_ns"] == mtime_ns:
+            return [tuple(client) for client in snapshot["clients"]]
+    except (KeyError, TypeError):
+        pass
+
+    clients = list_clients(directory)
+    snapshots[directory] = {"mtime_ns": mtime_ns, "clients": clients}
+    try:
+        os.makedirs(os.path.dirname(snapshot_file), exist_ok=True)
+        atomic_write(snapshot_file, json.dumps(snapshots))
+    except OSError:
+        pass
+    return clients
+
+
+def load_all_clients(client_dirs:list[str], snapshot_file:str = None) -> list[tuple[str, str]]:
+    """The client lists of several directories merged, sorted by ID; earlier directories win on duplicate IDs."""
+    clients = {}
+    for client_dir in client_dirs:
+        for client_id, client_name in load_client_list(client_dir, snapshot_file):
+            clients.setdefault(client_id, client_name)
+    return sorted(clients.items())
@@ -0,0 +1,440 @@
+"""
+Create, rename, merge and remove clients, one at a time or thousands from a CSV.
+
+A client is its file in a client folder, named after its ID ('ACME_INC.md'),
+plus its display name in clients.json, which the mkdocs hooks use for the
+nav. Every command is a batch of changes: the client files are changed
+first, then clients.json is rewritten once for the whole batch, and only
+the files the batch touched are re-indexed in the search index and
+re-parsed by the notes service (when one is running). The index daemon's
+watcher picks up the same files for the mods page.
+
+    create   A skeleton file with the current structure marker; the ID is
+             derived from the display name unless given.
+    rename   A new display name and, unless --keep-id, the ID that follows
+             from it; the file, its cold history and its version history move
+             along (the journal is folded in first).
+    merge    Moves every note (and the cold history) of a client into
+             another one, then removes it. The notes are written to the
+             target before the source is deleted, and notes the target
+             already has are skipped, so an interrupted merge can be rerun.
+    remove   Deletes a client file; refused while it has open mods unless
+             --force. Its cold history is kept, and the removal is recorded
+             in its version history, so `history.py undo` brings it back.
+
+A CSV has a header row with the columns op, client, name, new_id, into and
+force; unused columns may be left out or empty:
+
+    op,client,name
+    create,,"ACME, INC"
+    rename,ACME_INC,"ACME HOLDINGS, INC"
+    remove,OLD_CLIENT_LLC,
+
+Usage:
+    python src/clients.py create NAME [--id CLIENT_ID]
+    python src/clients.py rename CLIENT_ID NAME [--id NEW_ID | --keep-id]
+    python src/clients.py merge CLIENT_ID INTO_ID
+    python src/clients.py remove CLIENT_ID [--force]
+    python src/clients.py apply CHANGES.csv [--workers 8]
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from client_list import client_name_from_id
+from cold import append_records, cold_path, identity, read_records
+from config import CLIENT_DIRS, CLIENTS_FILE, COLD_DIR, INDEX_DB, SOCKET_PATH, client_path
+from history import record_change, record_rename
+from locking import client_lock
+from migrate import CURRENT_VERSION
+from note import tokenize_notes
+from store import (atomic_write, insert_note, journal_path, read_client_content, read_client_file,
+                   write_client_file)
+
+OPERATIONS = ("create", "rename", "merge", "remove")
+CLIENT_ID = re.compile(r"[A-Za-z0-9][A-Za-z0-9_]*\Z")
+# The layout of a client without notes, as the existing empty client files have it
+SKELETON = (f"<!-- structure: {CURRENT_VERSION} -->\n"
+            "\n## *In Progress*\n\n\n--------------------\n\n"
+            "## *Que*\n\n-----------------------------------\n"
+            "## *Archive*\n\n-----------------------------------\n")
+
+logger = logging.getLogger(__name__)
+
+
+class ClientError(Exception):
+    """A change that cannot be made: unknown client, ID already taken, open mods..."""
+
+
+def client_id_from_name(name:str) -> str:
+    """
+    Derive a file stem from a display name, the inverse of client_name_from_id.
+
+    'A.D.A. SUPPLIES & LEASING SERVICES, INC' -> 'ADA_SUPPLIES__LEASING_SERVICES_INC':
+    a standalone '&' becomes a double underscore, other punctuation is dropped.
+    """
+    words = []
+    for word in name.split():
+        if word == "&":
+            words.append("")  # joined with '_' on both sides: 'A__B'
+        elif word := re.sub(r"[^A-Za-z0-9]", "", word):
+            words.append(word)
+    return "_".join(words)
+
+
+def existing_path(client_id:str, client_dirs:list[str]) -> str:
+    """The file of an existing client."""
+    file_path = client_path(client_id, client_dirs)
+    if not os.path.exists(file_path):
+        raise ClientError(f"Client '{client_id}' does not exist.")
+    return file_path
+
+
+def check_new_id(client_id:str, client_dirs:list[str]) -> str:
+    """The path a new client file would get; the ID must be valid and not taken in any folder."""
+    if not CLIENT_ID.match(client_id or ""):
+        raise ClientError(f"'{client_id}' is not a valid client ID.")
+    file_path = client_path(client_id, client_dirs)
+    if os.path.exists(file_path):
+        raise ClientError(f"Client '{client_id}' already exists.")
+    return file_path
+
+
+def create_file(file_path:str, content:str):
+    """
+    Write a new file, failing if it exists.
+
+    The content is written to a temp file and hard-linked into place, which
+    fails instead of replacing a file that appeared meanwhile. The caller
+    fsyncs the directory, once per batch.
+    """
+    directory = os.path.dirname(file_path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(file_path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.link(tmp_path, file_path)
+        except FileExistsError:
+            raise ClientError(f"Client '{os.path.basename(file_path)[:-3]}' already exists.") from None
+    finally:
+        os.unlink(tmp_path)
+
+
+def move_history(client_id:str, into_id:str, cold_dir:str):
+    """Move a client's cold history to another ID, appending to the history that ID already has."""
+    if not cold_dir:
+        return
+    source = cold_path(cold_dir, client_id)
+    if not os.path.exists(source):
+        return
+    target = cold_path(cold_dir, into_id)
+    if not os.path.exists(target):
+        os.rename(source, os.path.join(cold_dir, into_id + source[len(os.path.join(cold_dir, client_id)):]))
+        return
+    known = {identity(record) for record in read_records(target)}
+    records = [record for record in read_records(source) if identity(record) not in known]
+    if records:
+        append_records(target, records)
+    os.unlink(source)
+
+
+def delete_client_file(file_path:str, op:str):
+    """Delete a client file and its journal, recording the content in its history so the removal can be undone."""
+    record_change(file_path, read_client_content(file_path), "", op)
+    os.unlink(file_path)
+    if os.path.exists(journal_path(file_path)):
+        os.unlink(journal_path(file_path))
+
+
+def create_client(client_id:str, client_dirs:list[str]) -> str:
+    """Create a client file with the empty sections; returns its path."""
+    file_path = check_new_id(client_id, client_dirs)
+    create_file(file_path, SKELETON)
+    return file_path
+
+
+def rename_client(client_id:str, new_id:str, client_dirs:list[str], cold_dir:str = COLD_DIR) -> list[str]:
+    """Move a client file (journal folded in) and its cold history to a new ID; returns the paths touched."""
+    file_path = existing_path(client_id, client_dirs)
+    if new_id == client_id:
+        return []
+    new_path = os.path.join(os.path.dirname(file_path), f"{new_id}.md")
+    check_new_id(new_id, client_dirs)
+    with client_lock(file_path):
+        if os.path.exists(journal_path(file_path)):
+            write_client_file(file_path, read_client_content(file_path))  # fold the journal in
+        try:
+            os.link(file_path, new_path)
+        except FileExistsError:
+            raise ClientError(f"Client '{new_id}' already exists.") from None
+        os.unlink(file_path)
+        record_rename(file_path, new_path)
+    move_history(client_id, new_id, cold_dir)
+    return [file_path, new_path]
+
+
+def merge_clients(client_id:str, into_id:str, client_dirs:list[str], cold_dir:str = COLD_DIR) -> list[str]:
+    """
+    Move every note of a client into another client and remove it; returns the paths touched.
+
+    Raises:
+        ClientError: If a client is missing, the target lacks a section, or
+            the source has notes that do not parse (they would be lost).
+    """
+    if client_id == into_id:
+        raise ClientError(f"Cannot merge '{client_id}' into itself.")
+    file_path = existing_path(client_id, client_dirs)
+    into_path = existing_path(into_id, client_dirs)
+
+    # Both locks, always in the same order, so opposite merges cannot deadlock
+    first, second = sorted((file_path, into_path))
+    with client_lock(first), client_lock(second):
+        # An opposite merge may have removed one of them while we waited
+        existing_path(client_id, client_dirs)
+        existing_path(into_id, client_dirs)
+        malformed = []
+        sections = tokenize_notes(read_client_content(file_path), malformed)
+        if malformed:
+            raise ClientError(f"Client '{client_id}' has {len(malformed)} notes that do not parse; "
+                              f"fix them before merging it.")
+
+        content, digest = read_client_file(into_path)
+        present = {(note.section, note.to_entry()) for notes in tokenize_notes(content).values() for note in notes}
+        new_content = content
+        for section, notes in sections.items():
+            # insert_note puts a note at the top of its section, so go backwards to keep the order
+            for note in reversed(notes):
+                if (section, note.to_entry()) in present:
+                    continue
+                new_content = insert_note(new_content, section, note)
+                if new_content is None:
+                    raise ClientError(f"Client '{into_id}' has no {section} section.")
+        write_client_file(into_path, new_content)
+        record_change(into_path, content, new_content, "merge", digest)
+        delete_client_file(file_path, "merge")
+    move_history(client_id, into_id, cold_dir)
+    return [file_path, into_path]
+
+
+def remove_client(client_id:str, client_dirs:list[str], force:bool = False) -> list[str]:
+    """Delete a client file; refused while it has In Progress or Que notes unless `force`."""
+    file_path = existing_path(client_id, client_dirs)
+    with client_lock(file_path):
+        if not force:
+            sections = tokenize_notes(read_client_content(file_path))
+            open_mods = len(sections.get("In Progress", ())) + len(sections.get("Que", ()))
+            if open_mods:
+                raise ClientError(f"Client '{client_id}' has {open_mods} open mods; use --force to remove it.")
+        delete_client_file(file_path, "remove")
+    return [file_path]
+
+
+def load_names(names_file:str) -> dict:
+    try:
+        with open(names_file, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_names(names_file:str, names:dict):
+    """Write clients.json sorted by display name, the order the nav lists clients in."""
+    ordered = dict(sorted(names.items(), key=lambda item: (item[1], item[0])))
+    atomic_write(names_file, json.dumps(ordered, indent=2) + "\n")
+
+
+def normalize(change:dict) -> dict:
+    """Check a change and fill in the IDs and names it implies."""
+    op = change.get("op")
+    if op not in OPERATIONS:
+        raise ClientError(f"Unknown client operation '{op}'.")
+    change = {key: value for key, value in change.items() if value not in (None, "")}
+    if op == "create":
+        if not change.get("client") and not change.get("name"):
+            raise ClientError("create needs a name or a client ID.")
+        change.setdefault("client", client_id_from_name(change.get("name", "")))
+        change.setdefault("name", client_name_from_id(change["client"]))
+        return change
+    if not change.get("client"):
+        raise ClientError(f"{op} needs a client ID.")
+    if op == "rename":
+        if not change.get("name") and not change.get("new_id"):
+            raise ClientError("rename needs a new name or a new ID.")
+        change.setdefault("new_id", client_id_from_name(change["name"]) if change.get("name") else None)
+        change.setdefault("name", client_name_from_id(change["new_id"]))
+    elif op == "merge" and not change.get("into"):
+        raise ClientError("merge needs the client to merge into.")
+    elif op == "remove":
+        change["force"] = str(change.get("force", "")).lower() in ("1", "true", "yes")
+    return change
+
+
+def apply_change(change:dict, names:dict, client_dirs:list[str], cold_dir:str) -> list[str]:
+    """Make one normalized change on disk and in `names`; returns the client files touched."""
+    op, client_id = change["op"], change["client"]
+    if op == "create":
+        touched = [create_client(client_id, client_dirs)]
+        names[client_id] = change["name"]
+    elif op == "rename":
+        touched = rename_client(client_id, change["new_id"], client_dirs, cold_dir)
+        names.pop(client_id, None)
+        names[change["new_id"]] = change["name"]
+    elif op == "merge":
+        touched = merge_clients(client_id, change["into"], client_dirs, cold_dir)
+        names.pop(client_id, None)
+    else:
+        touched = remove_client(client_id, client_dirs, change["force"])
+        names.pop(client_id, None)
+    return touched
+
+
+def fsync_dir(directory:str):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def refresh_indexes(touched:list[str], search_db:str, socket_path:str = SOCKET_PATH):
+    """Re-index the touched files in the search index (if one was built) and the notes service (if running)."""
+    if search_db and os.path.exists(search_db):
+        from search import connect, update_files
+
+        conn = connect(search_db)
+        try:
+            update_files(conn, touched)
+        finally:
+            conn.close()
+
+    from service_client import ServiceError, ServiceUnavailable, connect as connect_service
+
+    service = connect_service(socket_path)
+    if service is not None:
+        try:
+            service.mods(sorted({os.path.basename(path) for path in touched}))
+        except (ServiceUnavailable, ServiceError) as e:
+            logger.warning(f"The notes service did not refresh: {e}")
+        finally:
+            service.close()
+
+
+def apply_changes(changes:list[dict], client_dirs:list[str] = None, names_file:str = CLIENTS_FILE,
+                  cold_dir:str = COLD_DIR, search_db:str = INDEX_DB, socket_path:str = SOCKET_PATH,
+                  workers:int = 8) -> list[tuple[dict, str]]:
+    """
+    Apply a batch of client changes in order.
+
+    Runs of consecutive creates are written in parallel; every other change
+    waits for the ones before it. clients.json is written and the indexes
+    are refreshed once, after the last change.
+    Returns:
+        list[tuple[dict, str]]: Each change with its error, or None on success.
+    """
+    client_dirs = client_dirs or CLIENT_DIRS
+    names = load_names(names_file)
+    results, touched = [], []
+    names_changed = False
+
+    def run(change):
+        try:
+            change = normalize(change)
+            return change, apply_change(change, names, client_dirs, cold_dir), None
+        except (ClientError, OSError, ValueError) as e:
+            return change, [], str(e)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        i = 0
+        while i < len(changes):
+            j = i + 1
+            if changes[i].get("op") == "create":
+                while j < len(changes) and changes[j].get("op") == "create":
+                    j += 1
+            # Two creates of the same ID race on os.link(); the loser reports that it exists
+            for change, paths, error in executor.map(run, changes[i:j]):
+                results.append((change, error))
+                touched.extend(paths)
+                names_changed = names_changed or error is None
+            i = j
+
+    for directory in {os.path.dirname(path) for path in touched}:
+        fsync_dir(directory)
+    if names_changed:
+        save_names(names_file, names)
+    if touched:
+        refresh_indexes(list(dict.fromkeys(touched)), search_db, socket_path)
+    return results
+
+
+def read_changes(csv_path:str) -> list[dict]:
+    """The rows of a changes CSV as dicts keyed by its header."""
+    with open(csv_path, "r", newline="") as f:
+        return [{key.strip(): (value or "").strip() for key, value in row.items() if key}
+                for row in csv.DictReader(f)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create, rename, merge and remove clients.")
+    parser.add_argument("--dir", action="append",
+                        help="Client folder; repeat for several (default: NOTES_CLIENT_DIRS or the shared drive)")
+    parser.add_argument("--names", default=CLIENTS_FILE, help="Display names for the nav (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=8, help="Parallel file writes (default: %(default)s)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    create_parser = subparsers.add_parser("create", help="Create a client")
+    create_parser.add_argument("name", help="Display name")
+    create_parser.add_argument("--id", help="Client ID (default: derived from the name)")
+    rename_parser = subparsers.add_parser("rename", help="Rename a client")
+    rename_parser.add_argument("client")
+    rename_parser.add_argument("name", help="New display name")
+    rename_ids = rename_parser.add_mutually_exclusive_group()
+    rename_ids.add_argument("--id", help="New client ID (default: derived from the name)")
+    rename_ids.add_argument("--keep-id", action="store_true", help="Change only the display name")
+    merge_parser = subparsers.add_parser("merge", help="Move a client's notes into another client and remove it")
+    merge_parser.add_argument("client")
+    merge_parser.add_argument("into")
+    remove_parser = subparsers.add_parser("remove", help="Remove a client")
+    remove_parser.add_argument("client")
+    remove_parser.add_argument("--force", action="store_true", help="Remove it even with open mods")
+    apply_parser = subparsers.add_parser("apply", help="Apply the changes listed in a CSV")
+    apply_parser.add_argument("csv")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "apply":
+        changes = read_changes(args.csv)
+    elif args.command == "create":
+        changes = [{"op": "create", "client": args.id, "name": args.name}]
+    elif args.command == "rename":
+        changes = [{"op": "rename", "client": args.client, "name": args.name,
+                    "new_id": args.client if args.keep_id else args.id}]
+    elif args.command == "merge":
+        changes = [{"op": "merge", "client": args.client, "into": args.into}]
+    else:
+        changes = [{"op": "remove", "client": args.client, "force": args.force}]
+
+    start = time.perf_counter()
+    results = apply_changes(changes, args.dir or CLIENT_DIRS, args.names, workers=args.workers)
+    failed = [(change, error) for change, error in results if error]
+    for change, error in failed:
+        logger.error(f"{change.get('op')} {change.get('client') or change.get('name')}: {error}")
+    logger.info(f"{len(results) - len(failed)}/{len(results)} client changes applied "
+                f"in {time.perf_counter() - start:.2f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,215 @@
+"""
+Cold tier for archived notes.
+
+Archive notes not updated for COLD_AFTER_DAYS move out of the client file
+into a compressed per-client history, one JSON line per note. Opening,
+editing and indexing a client then only parses its active notes and recent
+archive; the history is decompressed only when it is browsed or searched.
+
+Histories are zstd-compressed when the zstandard package is installed and
+gzip-compressed otherwise. Every freeze appends one compressed member
+(gzip) or frame (zstd) to the file instead of rewriting it. Notes are
+appended to the history before they are removed from the client file, and
+notes already in the history are not appended again, so a freeze that is
+interrupted can simply be run again.
+
+Usage:
+    python src/cold.py freeze [--days 180] [--client ID]
+    python src/cold.py history CLIENT_ID [--page 1] [--page-size 20]
+    python src/cold.py search TERMS... [--client ID]
+"""
+import argparse
+import gzip
+import io
+import json
+import logging
+import os
+from datetime import date, timedelta
+
+from config import CLIENT_DIR, COLD_DIR
+from note import Note, tokenize_notes
+from store import edit_client_file, remove_note
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COLD_AFTER_DAYS = 180
+
+logger = logging.getLogger(__name__)
+
+
+def cold_path(cold_dir:str, client_id:str) -> str:
+    """The history file of a client: the existing one, or a new one in the preferred format."""
+    zst = os.path.join(cold_dir, f"{client_id}.jsonl.zst")
+    gz = os.path.join(cold_dir, f"{client_id}.jsonl.gz")
+    if os.path.exists(zst) or (zstandard and not os.path.exists(gz)):
+        return zst
+    return gz
+
+
+def note_record(note:Note, frozen:str) -> dict:
+    return {"started": note.started, "updated": note.updated, "action": note.action,
+            "summary": note.summary, "status": note.status, "frozen": frozen}
+
+
+def identity(record:dict) -> tuple:
+    return tuple(record[field] for field in ("started", "updated", "action", "summary", "status"))
+
+
+def read_records(path:str):
+    """Yield the records of a history file, decompressing it as it is read."""
+    if not os.path.exists(path):
+        return
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd-compressed; install zstandard to read it")
+        with open(path, "rb") as raw:
+            stream = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+            yield from (json.loads(line) for line in io.TextIOWrapper(stream, encoding="utf-8"))
+        return
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        yield from (json.loads(line) for line in f)
+
+
+def append_records(path:str, records:list[dict]):
+    """Append records as one new compressed member, fsynced before returning."""
+    data = "".join(json.dumps(record) + "\n" for record in records).encode()
+    compressed = zstandard.ZstdCompressor().compress(data) if path.endswith(".zst") else gzip.compress(data)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "ab") as f:
+        f.write(compressed)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def to_note(record:dict) -> Note:
+    return Note(record["started"], record["updated"], record["action"], record["summary"], record["status"],
+                section="Archive")
+
+
+def freeze_client(file_path:str, cold_dir:str = COLD_DIR, days:int = COLD_AFTER_DAYS, today:date = None) -> int:
+    """
+    Move a client's Archive notes not updated in `days` days to its history.
+
+    Returns:
+        int: The number of notes moved.
+    """
+    today = today or date.today()
+    cutoff = (today - timedelta(days=days)).toordinal()
+    client_id = os.path.basename(file_path)[:-3]
+    moved = []
+
+    def transform(content):
+        old = [note for note in tokenize_notes(content)["Archive"] if note.updated_ordinal < cutoff]
+        if not old:
+            return None
+        path = cold_path(cold_dir, client_id)
+        frozen = {identity(record) for record in read_records(path)}
+        records = [note_record(note, today.isoformat()) for note in old]
+        new_records = [record for record in records if identity(record) not in frozen]
+        if new_records:
+            append_records(path, new_records)
+        # Remove from the end so the offsets of the earlier notes stay valid
+        for note in sorted(old, key=lambda note: note.start, reverse=True):
+            content = remove_note(content, note)
+        moved.extend(old)
+        return content
+
+    edit_client_file(file_path, transform, op="freeze")
+    return len(moved)
+
+
+def freeze_all(client_dir:str = CLIENT_DIR, cold_dir:str = COLD_DIR, days:int = COLD_AFTER_DAYS) -> dict:
+    """Freeze every client file; returns client ID -> notes moved, for clients with any."""
+    moved = {}
+    for filename in sorted(os.listdir(client_dir)):
+        if not filename.endswith(".md"):
+            continue
+        try:
+            count = freeze_client(os.path.join(client_dir, filename), cold_dir, days)
+        except OSError as e:
+            logger.error(f"Could not freeze {filename}: {e}")
+            continue
+        if count:
+            moved[filename[:-3]] = count
+    return moved
+
+
+def load_history(client_id:str, cold_dir:str = COLD_DIR) -> list[Note]:
+    """Every frozen note of a client, most recently updated first."""
+    notes = [to_note(record) for record in read_records(cold_path(cold_dir, client_id))]
+    notes.sort(key=lambda note: note.updated_ordinal, reverse=True)
+    return notes
+
+
+def history_clients(cold_dir:str = COLD_DIR) -> list[str]:
+    if not os.path.isdir(cold_dir):
+        return []
+    return sorted({filename.split(".jsonl")[0] for filename in os.listdir(cold_dir)
+                   if filename.endswith((".jsonl.gz", ".jsonl.zst"))})
+
+
+def search_history(terms:list[str], cold_dir:str = COLD_DIR, client_id:str = None):
+    """Yield (client ID, Note) for frozen notes whose action, summary or status contain every term."""
+    terms = [term.lower() for term in terms]
+    for cid in [client_id] if client_id else history_clients(cold_dir):
+        for record in read_records(cold_path(cold_dir, cid)):
+            text = f"{record['action']} {record['summary']} {record['status']}".lower()
+            if all(term in text for term in terms):
+                yield cid, to_note(record)
+
+
+def format_note(note:Note) -> str:
+    return f"[{note.updated}] {note.action}: {note.summary} ({note.status})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old archived notes to compressed history, or read it.")
+    parser.add_argument("--dir", default=CLIENT_DIR, help="Client directory (default: %(default)s)")
+    parser.add_argument("--cold-dir", default=COLD_DIR, help="History directory (default: %(default)s)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    freeze_parser = subparsers.add_parser("freeze", help="Move Archive notes older than --days to the history")
+    freeze_parser.add_argument("--days", type=int, default=COLD_AFTER_DAYS,
+                               help="Age in days since the last update (default: %(default)s)")
+    freeze_parser.add_argument("--client", help="Only this client ID")
+
+    history_parser = subparsers.add_parser("history", help="Page through a client's history, newest first")
+    history_parser.add_argument("client", help="Client ID (file name without .md)")
+    history_parser.add_argument("--page", type=int, default=1)
+    history_parser.add_argument("--page-size", type=int, default=20)
+
+    search_parser = subparsers.add_parser("search", help="Find frozen notes containing every term")
+    search_parser.add_argument("terms", nargs="+")
+    search_parser.add_argument("--client", help="Only this client ID")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "freeze":
+        if args.client:
+            moved = {args.client: freeze_client(os.path.join(args.dir, f"{args.client}.md"), args.cold_dir, args.days)}
+        else:
+            moved = freeze_all(args.dir, args.cold_dir, args.days)
+        for client_id, count in moved.items():
+            logger.info(f"{client_id}: {count} notes moved")
+        logger.info(f"{sum(moved.values())} notes older than {args.days} days moved to {args.cold_dir}.")
+    elif args.command == "history":
+        notes = load_history(args.client, args.cold_dir)
+        start = (args.page - 1) * args.page_size
+        for note in notes[start:start + args.page_size]:
+            print(format_note(note))
+        pages = max(1, -(-len(notes) // args.page_size))
+        logger.info(f"Page {args.page} of {pages} ({len(notes)} archived notes).")
+    else:
+        found = 0
+        for client_id, note in search_history(args.terms, args.cold_dir, args.client):
+            print(f"{client_id}: {format_note(note)}")
+            found += 1
+        logger.info(f"{found} archived notes found.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,63 @@
+"""
+Where the client notes live.
+
+Every location defaults to the shared drive and can be overridden from the
+environment, so the same scripts run against a local copy or a test folder:
+
+    NOTES_ROOT          base folder of the defaults below
+    NOTES_CLIENT_DIRS   client folders, separated by os.pathsep (':'); a
+                        client ID found in several folders is read from the
+                        first, and new clients are created in the first
+    NOTES_CLIENTS_FILE  client ID -> display name, read by the mkdocs hooks
+                        for the nav (clients.json next to mkdocs.yml)
+    NOTES_MOD_FILE      the mods index page
+    NOTES_ACTIVE_DIR    the sharded mods pages (main.py --sharded)
+    NOTES_REPORT_FILE   the workload report page (src/report.py)
+    NOTES_COLD_DIR      compressed history of old archived notes
+    NOTES_SEARCH_DB     full-text search index
+    NOTES_SOCKET        Unix socket of the notes service (src/service.py)
+    NOTES_HISTORY       '0' stops recording the version history of client
+                        files (src/history.py)
+    NOTES_PROFILE_TRIGGER  creating this file makes the running index daemon
+                        profile its next pass (src/metrics.py)
+"""
+import os
+import tempfile
+
+NOTES_ROOT = os.environ.get("NOTES_ROOT", "/mnt/g/clients/client_notes")
+DOCS_DIR = os.path.join(NOTES_ROOT, "docs")
+
+CLIENT_DIRS = [path for path in os.environ.get("NOTES_CLIENT_DIRS", "").split(os.pathsep) if path] \
+    or [os.path.join(DOCS_DIR, "clients")]
+CLIENT_DIR = CLIENT_DIRS[0]
+CLIENTS_FILE = os.environ.get("NOTES_CLIENTS_FILE", os.path.join(NOTES_ROOT, "clients.json"))
+MOD_FILE = os.environ.get("NOTES_MOD_FILE", os.path.join(DOCS_DIR, "index.md"))
+ACTIVE_DIR = os.environ.get("NOTES_ACTIVE_DIR", os.path.join(DOCS_DIR, "active"))
+REPORT_FILE = os.environ.get("NOTES_REPORT_FILE", os.path.join(DOCS_DIR, "report.md"))
+COLD_DIR = os.environ.get("NOTES_COLD_DIR", os.path.join(NOTES_ROOT, "archive"))
+INDEX_DB = os.environ.get("NOTES_SEARCH_DB", os.path.join(NOTES_ROOT, ".notes", "search.db"))
+KEEP_HISTORY = os.environ.get("NOTES_HISTORY", "1") != "0"
+PROFILE_TRIGGER = os.environ.get("NOTES_PROFILE_TRIGGER", os.path.join(NOTES_ROOT, ".notes", "profile"))
+SOCKET_PATH = os.environ.get("NOTES_SOCKET") or os.path.join(
+    os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir(), f"client_notes-{os.getuid()}.sock")
+
+
+def client_path(client_id:str, client_dirs:list[str] = None) -> str:
+    """The file of a client: in the first folder that has it, or the first folder for a new client."""
+    client_dirs = client_dirs or CLIENT_DIRS
+    filename = f"{client_id}.md"
+    for client_dir in client_dirs:
+        file_path = os.path.join(client_dir, filename)
+        if os.path.exists(file_path):
+            return file_path
+    return os.path.join(client_dirs[0], filename)
+
+
+def client_files(client_dirs:list[str] = None) -> list[str]:
+    """Every client file of every folder, sorted by file name; earlier folders win on duplicate IDs."""
+    files = {}
+    for client_dir in client_dirs or CLIENT_DIRS:
+        for filename in os.listdir(client_dir):
+            if filename.endswith(".md"):
+                files.setdefault(filename, os.path.join(client_dir, filename))
+    return [files[filename] for filename in sorted(files)]
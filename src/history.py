@@ -0,0 +1,410 @@
+"""
+Version history and undo for client files.
+
+Every write of a client file through the store, and every journaled
+operation, appends one delta to the client's history: the hashes of the
+content before and after, and the span that changed, i.e. the text removed
+and inserted between the common prefix and suffix of the two versions (two
+spans when a note moved, e.g. to the Archive). Versions are addressed by
+their content hash and each delta by the hash of its record, so a history
+grows by the size of the edits, not by a copy of the file per save. Spans
+of COMPRESS_MIN characters or more (a migration, a freeze) are stored
+zlib-compressed.
+
+Histories live in a .history folder inside each client folder, which the
+.md scanners ignore like journals and locks: '<ID>.log' holds a client's
+deltas, one JSON line each, and 'operations.log' one line per delta of any
+client (and per client rename) in the order they were made, for the global
+undo. Lines are appended
+without an fsync, so a save pays for two small writes; a crash can lose the
+last lines of history, never a client file.
+
+Undo applies a delta in reverse, and only when the client's content is
+still the version that delta produced, so an edit made outside the history
+(in an editor, say) is never overwritten. An undo is recorded as a delta
+itself, marked with the delta it undid.
+
+Usage:
+    python src/history.py history CLIENT_ID [--limit 20]
+    python src/history.py diff CLIENT_ID DELTA_ID
+    python src/history.py undo CLIENT_ID
+    python src/history.py undo --last N
+"""
+import argparse
+import base64
+import difflib
+import json
+import logging
+import os
+import time
+import zlib
+from datetime import datetime
+
+from config import CLIENT_DIRS, KEEP_HISTORY, client_path
+from locking import client_lock
+from store import content_hash, journal_path, read_client_content, write_client_file
+
+HISTORY_DIR = ".history"
+OPERATIONS_LOG = "operations.log"
+COMPRESS_MIN = 256
+# Spans this long on both sides are checked for a moved note
+MOVE_MIN = 256
+MOVE_PROBE = 64
+HASH_CHARS = 16
+NOTE_START = "- Started:"
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryError(Exception):
+    """A delta that cannot be undone or shown, e.g. because the file changed outside the history."""
+
+
+def history_dir(file_path:str) -> str:
+    return os.path.join(os.path.dirname(file_path), HISTORY_DIR)
+
+
+def log_path(file_path:str) -> str:
+    """The history of a client file: '.history/<ID>.log' in its folder."""
+    return os.path.join(history_dir(file_path), os.path.basename(file_path)[:-3] + ".log")
+
+
+def short_hash(content:str) -> str:
+    return content_hash(content)[:HASH_CHARS]
+
+
+def common_length(a:str, b:str, suffix:bool = False) -> int:
+    """Length of the common prefix (or suffix) of two strings, by binary search over C-level slice compares."""
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if (a[len(a) - middle:] == b[len(b) - middle:]) if suffix else (a[:middle] == b[:middle]):
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def changed_spans(before:str, after:str) -> list[tuple[int, str, str]]:
+    """
+    (offset in `before`, removed text, inserted text) of each span turning `before` into `after`.
+
+    Usually one span, between the common prefix and suffix. A note moved to
+    another section (an archive) would make that span everything in between,
+    so a move is recorded as two spans instead: the note removed here and
+    inserted there.
+    """
+    prefix = common_length(before, after)
+    suffix = common_length(before[prefix:], after[prefix:], suffix=True)
+    removed, inserted = before[prefix:len(before) - suffix], after[prefix:len(after) - suffix]
+    if min(len(removed), len(inserted)) >= MOVE_MIN:
+        # Moved down: removed = note + between, inserted = between + new note
+        k = removed.find(inserted[:MOVE_PROBE])
+        if k > 0 and inserted.startswith(removed[k:]):
+            return [(prefix, removed[:k], ""), (prefix + len(removed), "", inserted[len(removed) - k:])]
+        # Moved up: removed = between + note, inserted = new note + between
+        k = inserted.find(removed[:MOVE_PROBE])
+        if k > 0 and removed.startswith(inserted[k:]):
+            return [(prefix, "", inserted[:k]), (prefix + len(inserted) - k, removed[len(inserted) - k:], "")]
+    return [(prefix, removed, inserted)]
+
+
+def pack(span:dict, key:str, text:str):
+    if len(text) >= COMPRESS_MIN:
+        packed = base64.b64encode(zlib.compress(text.encode())).decode()
+        if len(packed) < len(text):
+            span[key + "z"] = packed
+            return
+    if text:
+        span[key] = text
+
+
+def unpack(span:dict, key:str) -> str:
+    if key + "z" in span:
+        return zlib.decompress(base64.b64decode(span[key + "z"])).decode()
+    return span.get(key, "")
+
+
+def apply_delta(content:str, record:dict, reverse:bool = False) -> str:
+    """The version after a delta (or before it, with `reverse`) from the version on the other side."""
+    spans = [(span["at"], unpack(span, "-"), unpack(span, "+")) for span in record["spans"]]
+    if reverse:
+        # Offsets are into the version before; shift them into the version after
+        shifted, shift = [], 0
+        for at, removed, inserted in spans:
+            shifted.append((at + shift, inserted, removed))
+            shift += len(inserted) - len(removed)
+        spans = shifted
+    # From the last span back, so the offsets of the earlier ones stay valid
+    for at, removed, inserted in reversed(spans):
+        content = content[:at] + inserted + content[at + len(removed):]
+    return content
+
+
+def append_line(path:str, record:dict):
+    # One write() of a short line with O_APPEND, so concurrent writers do not interleave
+    try:
+        f = open(path, "a")
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        f = open(path, "a")
+    with f:
+        f.write(json.dumps(record) + "\n")
+
+
+def record_change(file_path:str, before:str, after:str, op:str = "edit", before_hash:str = None,
+                  after_hash:str = None, **fields) -> str:
+    """
+    Append the delta from `before` to `after` to a client's history; callers hold the client's lock.
+
+    Failing to write history is logged, not raised: the save it records
+    has already happened.
+    Returns:
+        str: The delta's ID, or None if nothing was recorded.
+    """
+    if not KEEP_HISTORY or before == after:
+        return None
+    record = {"t": round(time.time(), 3), "op": op,
+              "before": (before_hash or content_hash(before))[:HASH_CHARS],
+              "after": (after_hash or content_hash(after))[:HASH_CHARS], **fields}
+    spans, notes = [], 0
+    context = len(NOTE_START) - 1
+    for at, removed, inserted in changed_spans(before, after):
+        # A span can start or end mid-marker, so count with the text around it
+        left, right = before[max(at - context, 0):at], before[at + len(removed):at + len(removed) + context]
+        notes += (left + inserted + right).count(NOTE_START) - (left + removed + right).count(NOTE_START)
+        span = {"at": at}
+        pack(span, "-", removed)
+        pack(span, "+", inserted)
+        spans.append(span)
+    record["spans"] = spans
+    if notes:
+        record["notes"] = notes
+    client_id = os.path.basename(file_path)[:-3]
+    # Identical edits of identical files (a migration) still get their own IDs
+    record = {"id": content_hash(client_id + json.dumps(record, sort_keys=True))[:12], **record}
+    try:
+        append_line(log_path(file_path), record)
+        append_line(os.path.join(history_dir(file_path), OPERATIONS_LOG),
+                    {"t": record["t"], "client": client_id, "id": record["id"], "op": op, **fields})
+    except OSError as e:
+        logger.warning(f"Could not record the history of {file_path}: {e}")
+        return None
+    return record["id"]
+
+
+def record_rename(file_path:str, new_path:str):
+    """Move a client's history along with its file; callers hold the client's lock."""
+    try:
+        if os.path.exists(log_path(file_path)):
+            os.replace(log_path(file_path), log_path(new_path))
+            append_line(os.path.join(history_dir(file_path), OPERATIONS_LOG),
+                        {"t": round(time.time(), 3), "client": os.path.basename(file_path)[:-3],
+                         "renamed_to": os.path.basename(new_path)[:-3]})
+    except OSError as e:
+        logger.warning(f"Could not move the history of {file_path}: {e}")
+
+
+def read_log(path:str) -> list[dict]:
+    """The records of a history log, oldest first; a torn last line is skipped."""
+    records = []
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def live_deltas(records:list[dict]) -> list[dict]:
+    """The deltas that can still be undone: neither undos themselves nor undone already."""
+    undone = {record["undoes"] for record in records if "undoes" in record}
+    return [record for record in records if "undoes" not in record and record["id"] not in undone]
+
+
+def current_content(file_path:str) -> str:
+    """A client's content, or '' for a client whose file was removed."""
+    try:
+        return read_client_content(file_path)
+    except FileNotFoundError:
+        return ""
+
+
+def undo(file_path:str, delta_id:str = None) -> dict:
+    """
+    Undo a client's latest delta that is not undone yet.
+
+    `delta_id`, when given, must be that delta. A delta that removed the
+    whole file (a removed client) is undone by writing the file again.
+    Raises:
+        HistoryError: If there is nothing to undo, or the file no longer
+            holds the version the delta produced.
+    Returns:
+        dict: The delta that was undone.
+    """
+    with client_lock(file_path):
+        deltas = live_deltas(read_log(log_path(file_path)))
+        if not deltas:
+            raise HistoryError(f"Nothing to undo for {os.path.basename(file_path)[:-3]}.")
+        delta = deltas[-1]
+        if delta_id is not None and delta["id"] != delta_id:
+            raise HistoryError(f"{delta_id} is not the latest change of {os.path.basename(file_path)[:-3]}.")
+        content = current_content(file_path)
+        current_hash = content_hash(content)
+        if current_hash[:HASH_CHARS] != delta["after"]:
+            raise HistoryError(f"{file_path} was changed outside the history since {delta['id']}; "
+                               "nothing was undone.")
+        previous = apply_delta(content, delta, reverse=True)
+        previous_hash = content_hash(previous)
+        if previous_hash[:HASH_CHARS] != delta["before"]:
+            raise HistoryError(f"The history of {file_path} is damaged at {delta['id']}.")
+
+        if previous:
+            write_client_file(file_path, previous)
+        else:
+            os.unlink(file_path)
+            if os.path.exists(journal_path(file_path)):
+                os.unlink(journal_path(file_path))
+        record_change(file_path, content, previous, "undo", current_hash, previous_hash, undoes=delta["id"])
+    return delta
+
+
+def undo_last(count:int, client_dirs:list[str] = None) -> list[tuple[dict, str]]:
+    """
+    Undo the last `count` changes over every client, newest first.
+
+    Returns:
+        list[tuple[dict, str]]: Each operations.log entry with its error, or None on success.
+    """
+    entries = []
+    for client_dir in client_dirs or CLIENT_DIRS:
+        for entry in read_log(os.path.join(client_dir, HISTORY_DIR, OPERATIONS_LOG)):
+            entries.append((entry["t"], client_dir, entry))
+    entries.sort(key=lambda item: item[0])
+
+    # Follow renames made since each change to the client's current file
+    files, renamed = {}, {}
+    for _, client_dir, entry in reversed(entries):
+        if "renamed_to" in entry:
+            renamed[entry["client"]] = renamed.get(entry["renamed_to"], entry["renamed_to"])
+        else:
+            client_id = renamed.get(entry["client"], entry["client"])
+            files[entry["id"]] = os.path.join(client_dir, f"{client_id}.md")
+    live = live_deltas([entry for _, _, entry in entries if "id" in entry])
+
+    results = []
+    for entry in reversed(live[-count:] if count > 0 else []):
+        file_path = files[entry["id"]]
+        try:
+            undo(file_path, entry["id"])
+            results.append((entry, None))
+        except (HistoryError, OSError) as e:
+            results.append((entry, str(e)))
+    return results
+
+
+def versions(file_path:str, delta_id:str) -> tuple[str, str]:
+    """
+    The content before and after a delta, rebuilt by undoing the later deltas on the current content.
+
+    Raises:
+        HistoryError: If the delta is unknown or the chain back to it was
+            broken by a change made outside the history.
+    """
+    content = current_content(file_path)
+    for record in reversed(read_log(log_path(file_path))):
+        if short_hash(content) != record["after"]:
+            raise HistoryError(f"{file_path} was changed outside the history after {record['id']}.")
+        previous = apply_delta(content, record, reverse=True)
+        if record["id"] == delta_id:
+            return previous, content
+        content = previous
+    raise HistoryError(f"No change {delta_id} in the history of {file_path}.")
+
+
+def diff(file_path:str, delta_id:str) -> str:
+    """A unified diff of one delta; just its removed and inserted text if the versions cannot be rebuilt."""
+    try:
+        before, after = versions(file_path, delta_id)
+    except HistoryError as e:
+        record = next((record for record in read_log(log_path(file_path)) if record["id"] == delta_id), None)
+        if record is None:
+            raise
+        logger.warning(f"{e} Showing the change without context.")
+        before = "".join(unpack(span, "-") for span in record["spans"])
+        after = "".join(unpack(span, "+") for span in record["spans"])
+    name = os.path.basename(file_path)
+    return "".join(difflib.unified_diff(before.splitlines(True), after.splitlines(True),
+                                        f"a/{name}", f"b/{name}"))
+
+
+def describe(record:dict, undone:set = frozenset()) -> str:
+    """One line of the history listing."""
+    notes = record.get("notes")
+    if notes:
+        change = f"{notes:+d} notes"
+    else:
+        removed = sum(len(unpack(span, "-")) for span in record["spans"])
+        inserted = sum(len(unpack(span, "+")) for span in record["spans"])
+        change = f"{removed} -> {inserted} chars"
+    when = datetime.fromtimestamp(record["t"]).strftime("%Y-%m-%d %H:%M:%S")
+    line = f"{record['id']}  {when}  {record['op']:<8} {change}"
+    if "undoes" in record:
+        line += f" (undoes {record['undoes']})"
+    if record["id"] in undone:
+        line += " [undone]"
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show and undo the changes made to client files.")
+    parser.add_argument("--dir", action="append",
+                        help="Client folder; repeat for several (default: NOTES_CLIENT_DIRS or the shared drive)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    history_parser = subparsers.add_parser("history", help="List a client's changes, newest first")
+    history_parser.add_argument("client", help="Client ID (file name without .md)")
+    history_parser.add_argument("--limit", type=int, default=20)
+    diff_parser = subparsers.add_parser("diff", help="Show one change as a unified diff")
+    diff_parser.add_argument("client")
+    diff_parser.add_argument("delta", help="Change ID, as listed by history")
+    undo_parser = subparsers.add_parser("undo", help="Undo a client's latest change, or the last N of any client")
+    undo_target = undo_parser.add_mutually_exclusive_group(required=True)
+    undo_target.add_argument("client", nargs="?")
+    undo_target.add_argument("--last", type=int, metavar="N", help="Undo the last N changes over every client")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    client_dirs = args.dir or CLIENT_DIRS
+
+    if args.command == "undo" and args.last is not None:
+        results = undo_last(args.last, client_dirs)
+        for entry, error in results:
+            logger.info(f"{entry['client']} {entry['id']} {entry['op']}: {error or 'undone'}")
+        failed = sum(1 for _, error in results if error)
+        logger.info(f"{len(results) - failed}/{len(results)} changes undone.")
+        return 1 if failed else 0
+
+    file_path = client_path(args.client, client_dirs)
+    try:
+        if args.command == "history":
+            records = read_log(log_path(file_path))
+            undone = {record["undoes"] for record in records if "undoes" in record}
+            for record in reversed(records[-args.limit:]):
+                print(describe(record, undone))
+            logger.info(f"{len(records)} changes recorded for {args.client}.")
+        elif args.command == "diff":
+            print(diff(file_path, args.delta), end="")
+        else:
+            delta = undo(file_path)
+            logger.info(f"Undid {delta['id']} ({delta['op']}) on {args.client}.")
+    except HistoryError as e:
+        logger.error(str(e))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
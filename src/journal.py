@@ -0,0 +1,266 @@
+"""
+Append-only operation journal for client files.
+
+Instead of rewriting a client file for every note, a journaled write appends
+one JSON line (an add/update/archive/delete operation, as taken by
+noteTaker --batch) to '.<name>.md.journal' next to the file. Readers apply
+the pending operations over the markdown (store.read_client_file does this
+transparently), and compaction folds them back into the canonical
+In Progress / Que / Archive layout with one atomic write.
+
+Records are resolved before they are appended: the target note is pinned by
+its full identity and the date is fixed, so replaying a journal gives the
+same file on any day, after any crash. Compaction first appends a
+{"compacted": <hash>} record, then replaces the markdown, then deletes the
+journal; a journal that survives a crash is either replayed (the markdown
+was not replaced yet) or recognised as already folded in.
+
+Usage:
+    python src/journal.py status [--dir CLIENT_DIR]
+    python src/journal.py compact [--dir CLIENT_DIR] [--idle SECONDS]
+"""
+import argparse
+import errno
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from cache import file_signature
+from config import CLIENT_DIR
+from history import record_change
+from locking import client_lock
+from note import Note
+from operations import apply_operation, find_note
+from store import content_hash, edit_client_file, journal_path, read_client_file, write_client_file
+
+# Pending operations after which an append compacts the journal itself, so
+# reads never replay an unbounded log
+MAX_PENDING = 200
+# Client files whose last replay is kept in memory
+REPLAY_CACHE_SIZE = 32
+
+logger = logging.getLogger(__name__)
+
+# Last replay per client file, least recently used first: path -> (signature
+# of the markdown, records, content). The journal only grows until it is
+# compacted, so a read replays just the records appended since
+_replayed = OrderedDict()
+_replayed_lock = threading.Lock()
+
+
+def read_journal(path:str) -> tuple[list[dict], str, int]:
+    """
+    Read a journal file.
+
+    A last line without its newline is a torn append from a crash and is
+    ignored, as is everything after a 'compacted' record.
+    Returns:
+        tuple[list[dict], str, int]: The operation records, the hash of the
+            content they were compacted into (or None) and the size in bytes
+            of the complete records.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return [], None, 0
+    records = []
+    size = 0
+    for line in data.splitlines(True):
+        if not line.endswith(b"\n"):
+            break
+        record = json.loads(line)
+        size += len(line)
+        if "compacted" in record:
+            return records, record["compacted"], size
+        records.append(record)
+    return records, None, size
+
+
+def replay(content:str, records:list[dict], file_path:str = "") -> str:
+    """Apply journal records to content; records that no longer apply are logged and skipped."""
+    for record in records:
+        try:
+            content = apply_operation(content, record)
+        except ValueError as e:
+            logger.warning(f"{file_path}: skipping journal record {record}: {e}")
+    return content
+
+
+def apply_pending(file_path:str, content:str, stat_result) -> str:
+    """Return the content of a client file with its pending journal applied; `stat_result` is the file's fstat."""
+    records, compacted, _ = read_journal(journal_path(file_path))
+    return replay_pending(file_path, content, file_signature(stat_result), records, compacted)
+
+
+def replay_pending(file_path:str, markdown:str, signature:tuple, records:list[dict], compacted:str) -> str:
+    """
+    Apply a client file's journal records over its markdown, reusing the last replay of the file.
+
+    Args:
+        file_path (str): The client file.
+        markdown (str): The content of the file on disk.
+        signature (tuple): The (mtime, size, inode) `markdown` was read with.
+        records (list[dict]): Its journal records, as read by read_journal.
+        compacted (str): The hash read_journal found in a 'compacted' record, or None.
+    """
+    if not records or compacted is not None and content_hash(markdown) == compacted:
+        # No journal left, or crashed after the compacted file was written: nothing is pending
+        forget_replay(file_path)
+        return markdown
+    with _replayed_lock:
+        last = _replayed.pop(file_path, None)
+    if last is not None and last[0] == signature and records[:len(last[1])] == last[1]:
+        content = replay(last[2], records[len(last[1]):], file_path)
+    else:
+        content = replay(markdown, records, file_path)
+    remember_replay(file_path, signature, records, content)
+    return content
+
+
+def remember_replay(file_path:str, signature:tuple, records:list[dict], content:str):
+    with _replayed_lock:
+        _replayed[file_path] = (signature, records, content)
+        _replayed.move_to_end(file_path)
+        while len(_replayed) > REPLAY_CACHE_SIZE:
+            _replayed.popitem(last=False)
+
+
+def forget_replay(file_path:str):
+    with _replayed_lock:
+        _replayed.pop(file_path, None)
+
+
+def resolve(content:str, op:dict, today:str = None, note:Note = None) -> dict:
+    """
+    Turn a batch operation into a journal record.
+
+    The date is fixed and `note`/`match` selectors are replaced by the full
+    identity of the note they select in `content`, so the record means the
+    same thing however the notes before it move. `note` is the note `op`
+    selects, when the caller already found it.
+    """
+    record = {key: value for key, value in op.items() if key not in ("note", "match", "client")}
+    record["date"] = op.get("date") or today or datetime.now().strftime("%Y-%m-%d")
+    if op.get("op") != "add":
+        note = note or find_note(content, op)
+        record["match"] = {"section": note.section, "started": note.started, "updated": note.updated,
+                           "action": note.action, "summary": note.summary, "status": note.status}
+    return record
+
+
+def append_operation(file_path:str, op:dict, today:str = None) -> dict:
+    """
+    Journal one operation on a client file instead of rewriting it.
+
+    The operation is validated against the file as last replayed, so an
+    append costs one parse of the file however many records are pending.
+    Raises:
+        ValueError: If the operation is invalid or its note is not found.
+        FileNotFoundError: If the client file does not exist.
+    Returns:
+        dict: The record that was appended.
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), file_path)
+    path = journal_path(file_path)
+    with client_lock(file_path):
+        records, compacted, size = read_journal(path)
+        if compacted is not None:
+            # A compaction was interrupted; finish it before journaling more
+            write_client_file(file_path, read_client_file(file_path)[0])
+            records, compacted, size = [], None, 0
+        with open(file_path, "r") as f:
+            markdown = f.read()
+            signature = file_signature(os.fstat(f.fileno()))
+        content = replay_pending(file_path, markdown, signature, records, compacted)
+        note = find_note(content, op) if op.get("op") != "add" else None
+        record = resolve(content, op, today, note)
+        new_content = apply_operation(content, record, note)  # validates it before it becomes durable
+
+        with open(path, "ab") as f:
+            if f.tell() != size:
+                f.truncate(size)  # drop a torn append
+            f.write(json.dumps(record).encode() + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        remember_replay(file_path, signature, records + [record], new_content)
+        record_change(file_path, content, new_content, record["op"])
+    if len(records) + 1 >= MAX_PENDING:
+        compact(file_path)
+    return record
+
+
+def compact(file_path:str) -> bool:
+    """Fold a client file's journal into its markdown; returns False if it had none."""
+    if not os.path.exists(journal_path(file_path)):
+        return False
+    # Rewriting the file through the normal write path is what folds the journal
+    compacted = edit_client_file(file_path, lambda content: content) is not None
+    forget_replay(file_path)
+    return compacted
+
+
+def pending_journals(client_dir:str) -> list[tuple[str, str]]:
+    """List (client file, journal) pairs in a client directory."""
+    pairs = []
+    with os.scandir(client_dir) as entries:
+        for entry in entries:
+            if entry.name.startswith(".") and entry.name.endswith(".md.journal"):
+                pairs.append((os.path.join(client_dir, entry.name[1:-len(".journal")]), entry.path))
+    return sorted(pairs)
+
+
+def compact_dir(client_dir:str, idle:float = 0) -> int:
+    """
+    Compact every journal in a client directory that was not appended to for `idle` seconds.
+
+    Run at start-up with idle=0 this is also the crash recovery: whatever
+    journals were left behind are replayed into their files.
+    Returns:
+        int: The number of files compacted.
+    """
+    now = time.time()
+    compacted = 0
+    for file_path, path in pending_journals(client_dir):
+        try:
+            if now - os.stat(path).st_mtime < idle:
+                continue
+            compacted += compact(file_path)
+        except FileNotFoundError:
+            continue  # compacted by someone else meanwhile
+        except OSError as e:
+            logger.error(f"Could not compact {file_path}: {e}")
+    return compacted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or compact the client note journals.")
+    parser.add_argument("command", choices=("status", "compact"))
+    parser.add_argument("--dir", default=CLIENT_DIR, help="Client directory (default: %(default)s)")
+    parser.add_argument("--idle", type=float, default=0,
+                        help="With compact, skip journals appended to in the last SECONDS (default: 0)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "status":
+        pairs = pending_journals(args.dir)
+        for file_path, path in pairs:
+            records, compacted, _ = read_journal(path)
+            state = " (compaction interrupted)" if compacted is not None else ""
+            logger.info(f"{os.path.basename(file_path)}: {len(records)} pending{state}")
+        logger.info(f"{len(pairs)} journals pending.")
+        return 0
+
+    start = time.perf_counter()
+    compacted = compact_dir(args.dir, args.idle)
+    logger.info(f"{compacted} journals compacted in {time.perf_counter() - start:.2f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
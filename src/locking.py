@@ -0,0 +1,64 @@
+import fcntl
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class LockTimeout(TimeoutError):
+    """Raised when a client file stays locked by another writer for too long."""
+
+
+# lockf() locks belong to the process, so threads of one process are kept
+# apart by a thread lock per lock file on top of it
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+def lock_path(file_path:str) -> str:
+    """The lock file of a client file: '.<name>.lock' next to it, ignored by the .md scanners."""
+    directory, name = os.path.split(file_path)
+    return os.path.join(directory, f".{name}.lock")
+
+
+def _thread_lock(path:str) -> threading.Lock:
+    with _thread_locks_guard:
+        return _thread_locks.setdefault(path, threading.Lock())
+
+
+@contextmanager
+def client_lock(file_path:str, timeout:float = 10.0, poll:float = 0.01):
+    """
+    Hold the advisory write lock of a client file.
+
+    Only writers take the lock, and only around their read-modify-write;
+    prompts and other slow work must happen outside it. Readers never lock:
+    files are replaced atomically, so a reader always sees one complete
+    version of a file.
+    Raises:
+        LockTimeout: If the lock is still held by someone else after `timeout` seconds.
+    """
+    path = lock_path(file_path)
+    thread_lock = _thread_lock(path)
+    deadline = time.monotonic() + timeout
+    if not thread_lock.acquire(timeout=timeout):
+        raise LockTimeout(f"{file_path} is locked by another writer")
+    try:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            while True:
+                try:
+                    fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except OSError:
+                    if time.monotonic() >= deadline:
+                        raise LockTimeout(f"{file_path} is locked by another writer") from None
+                    time.sleep(poll)
+            try:
+                yield
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+    finally:
+        thread_lock.release()
@@ -0,0 +1,123 @@
+"""
+Logging pipeline shared by noteTaker and the index daemon.
+
+Loggers only put records on a queue (QueueHandler); one listener thread
+formats them and does the console and file I/O, so a slow terminal or a
+log rotation never holds up an edit or an index pass. Log files rotate by
+size and live in the repository's logs/ folder whatever the working
+directory is.
+
+Operations (add, update, archive, delete, ...) are also written as JSON
+lines to logs/operations.jsonl:
+
+    {"ts": "2025-06-13T10:02:11", "op": "archive", "client": "ACME_INC", "action": "EPA", "ok": true, "elapsed_ms": 3.1}
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import time
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
+OPERATIONS_LOGGER = "client_notes.operations"
+OPERATIONS_FILE = "operations.jsonl"
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 5
+
+operations_logger = logging.getLogger(OPERATIONS_LOGGER)
+_console_handlers = []
+
+
+class JsonFormatter(logging.Formatter):
+    """Format an operation record as one JSON object: its time plus the fields logged with it."""
+
+    def format(self, record):
+        fields = {"ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))}
+        fields.update(getattr(record, "fields", {}))
+        return json.dumps(fields)
+
+
+def is_operation(record) -> bool:
+    return record.name == OPERATIONS_LOGGER
+
+
+def not_operation(record) -> bool:
+    return record.name != OPERATIONS_LOGGER
+
+
+def setup_logging(name:str, level:int = logging.INFO, console_formatter:logging.Formatter = None,
+                  log_dir:str = LOG_DIR) -> QueueListener:
+    """
+    Route every log record through a queue to the console and to rotating files.
+
+    Args:
+        name (str): Log file name without extension, e.g. 'note_taker'.
+        level (int): Root logger level.
+        console_formatter (Formatter): Console format (default: the bare message).
+        log_dir (str): Folder of `name`.log and operations.jsonl.
+    Returns:
+        QueueListener: The running listener; it is stopped, and the queue
+            flushed, at interpreter exit.
+    """
+    os.makedirs(log_dir, exist_ok=True)
+
+    console = logging.StreamHandler()
+    console.setFormatter(console_formatter or logging.Formatter("%(message)s"))
+    console.addFilter(not_operation)
+
+    log_file = RotatingFileHandler(os.path.join(log_dir, f"{name}.log"), maxBytes=MAX_BYTES,
+                                   backupCount=BACKUP_COUNT, encoding="utf-8")
+    log_file.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    log_file.addFilter(not_operation)
+
+    operations = RotatingFileHandler(os.path.join(log_dir, OPERATIONS_FILE), maxBytes=MAX_BYTES,
+                                     backupCount=BACKUP_COUNT, encoding="utf-8")
+    operations.setFormatter(JsonFormatter())
+    operations.addFilter(is_operation)
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(records))
+    root.setLevel(level)
+
+    listener = QueueListener(records, console, log_file, operations, respect_handler_level=True)
+    listener.start()
+    _console_handlers.append(console)
+    atexit.register(listener.stop)
+    return listener
+
+
+def console_handlers() -> list[logging.StreamHandler]:
+    """The console handlers of the running listeners."""
+    return list(_console_handlers)
+
+
+def log_operation(op:str, client:str, **fields):
+    """Write one JSON operation record; `fields` are added as they are (e.g. action, ok, error)."""
+    operations_logger.info(op, extra={"fields": {"op": op, "client": client, **fields}})
+
+
+@contextmanager
+def timed_operation(op:str, client:str, **fields):
+    """
+    Log an operation with its elapsed time when the block exits.
+
+    The block may add fields to the yielded dict; 'ok' defaults to True, and
+    an exception escaping the block is recorded as ok=False with its message.
+    """
+    record = dict(fields)
+    start = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record.update(ok=False, error=str(e))
+        raise
+    finally:
+        record.setdefault("ok", True)
+        record["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        log_operation(op, client, **record)
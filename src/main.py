@@ -1,29 +1,31 @@
+import argparse
 import time
 import os
 import logging
 import colorlog
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-from note import get_active_mods
-
-CLIENT_DIR = "/mnt/g/clients/client_notes/docs/clients"
-MOD_FILE = "/mnt/g/clients/client_notes/docs/index.md"
-
-handler = colorlog.StreamHandler()
-handler.setFormatter(colorlog.ColoredFormatter(
-    "%(log_color)s%(message)s",
-    log_colors={
-        'DEBUG':    'cyan',
-        'INFO':     'white',
-        'WARNING':  'yellow',
-        'ERROR':    'red',
-        'CRITICAL': 'red,bg_white',
-    }
-))
-
-logger = colorlog.getLogger(__name__)
-logger.addHandler(handler)
+from cache import ParseCache
+from config import ACTIVE_DIR, CLIENT_DIRS, MOD_FILE, SOCKET_PATH, client_files, client_path
+from journal import compact_dir
+from logs import setup_logging
+from metrics import NULL_STATS, Instrumentation, PassProfiler
+from query import NoteStore, parse_sections
+from service_client import ServiceError, ServiceUnavailable, connect
+from shards import ShardWriter
+from store import read_client_content
+from watcher import create_watcher, watch
+
+LOG_COLORS = {
+    'DEBUG':    'cyan',
+    'INFO':     'white',
+    'WARNING':  'yellow',
+    'ERROR':    'red',
+    'CRITICAL': 'red,bg_white',
+}
+
+logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)  # Set to DEBUG to capture all logs
-logger.propagate = False  # Prevent duplicate logs if root logger is configured
 
 
 def format_notes_for_md(notes:list):
@@ -37,85 +39,320 @@ def format_notes_for_display(notes:list):
     if not notes:
         return ""
     return "".join(note.to_display() for note in notes)
+
+def get_client_name(filename:str) -> str:
+    """Derive the display name of a client from its file name."""
+    client_id = filename[:-3]  # Remove .md extension
+    return client_id.replace('_', ' ').replace('  ', ' & ')
     
 
-def get_all_active_mods():
-    """Process all client files and extract their progress data."""
+def read_client_file(file_path:str) -> str:
+    """Read the content of a client file, with its pending journal applied."""
+    return read_client_content(file_path)
+
+def parse_client(content:str, client_name:str) -> tuple[list[dict], int, dict]:
+    """Parse one client file; returns its active mods, the number of malformed notes and all notes by section."""
+    return parse_sections(content, client_name)
+
+def record_parse(stats, client_mods:list, failures:int):
+    """Count the notes a parse produced and the notes it had to skip."""
+    if stats.enabled:
+        stats.count("notes_parsed", sum(len(c['in_progress']) + len(c['que']) for c in client_mods))
+        stats.count("parse_failures", failures)
+
+def read_if_changed(cache:ParseCache, file_path:str, stats=NULL_STATS) -> tuple:
+    """Return (signature, cached mods, content); the file is only read when not cached."""
+    signature = None
+    if cache:
+        signature, client_mods = cache.lookup(file_path)
+        if client_mods is not None:
+            return signature, client_mods, None
+    with stats.phase("read"):
+        content = read_client_file(file_path)
+    stats.count("bytes_read", len(content))
+    return signature, None, content
+
+def load_client_mods(file_path:str, client_name:str, cache:ParseCache=None, stats=NULL_STATS) -> list[dict]:
+    """Read and parse one client file, unless the cache already has it."""
+    signature, client_mods, content = read_if_changed(cache, file_path, stats)
+    if client_mods is None:
+        with stats.phase("parse"):
+            client_mods, failures, sections = parse_client(content, client_name)
+        record_parse(stats, client_mods, failures)
+        if cache:
+            cache.store(file_path, signature, client_mods, sections)
+    return client_mods
+
+def get_all_active_mods(cache:ParseCache=None, io_executor=None, parse_executor=None, stats=NULL_STATS):
+    """Process all client files and extract their progress data.
+
+    Results are always ordered by client file name, whatever the executors.
+    Args:
+        cache (ParseCache): Optional parse cache; when given only files whose
+            (mtime, size, inode) changed since the last pass are re-parsed.
+        io_executor (Executor): Optional thread pool the files are stat'ed,
+            read (and, without parse_executor, parsed) on.
+        parse_executor (Executor): Optional process pool the files are parsed on.
+        stats (PassStats): Optional phase timers and counters for this pass.
+    """
+    with stats.phase("list"):
+        paths = client_files(CLIENT_DIRS)
+    names = [get_client_name(os.path.basename(file_path)) for file_path in paths]
+    stats.count("files_scanned", len(paths))
+    if cache:
+        cache.parsed = 0
+
+    map_io = io_executor.map if io_executor else map
+    if parse_executor:
+        # Threads do the blocking reads, the process pool does the parsing
+        loaded = list(map_io(lambda file_path: read_if_changed(cache, file_path, stats), paths))
+        stale = [i for i, (_, client_mods, _) in enumerate(loaded) if client_mods is None]
+        with stats.phase("parse"):
+            parsed = list(parse_executor.map(parse_client, [loaded[i][2] for i in stale],
+                                             [names[i] for i in stale], chunksize=16))
+        results = [client_mods for _, client_mods, _ in loaded]
+        for i, (client_mods, failures, sections) in zip(stale, parsed):
+            results[i] = client_mods
+            record_parse(stats, client_mods, failures)
+            if cache:
+                cache.store(paths[i], loaded[i][0], client_mods, sections)
+    else:
+        results = map_io(lambda file_path, client_name: load_client_mods(file_path, client_name, cache, stats),
+                         paths, names)
+
     all_client_mods = []
-    # Get all client files in the directory
-    for filename in sorted(os.listdir(CLIENT_DIR)):
-        if not filename.endswith('.md'):
-            continue
-        
-        # Get Client Name    
-        client_id = filename[:-3]  # Remove .md extension
-        client_name = client_id.replace('_', ' ').replace('  ', ' & ')
-        file_path = os.path.join(CLIENT_DIR, filename)
-        
-        # Read file content
-        with open(file_path, 'r') as f:
-            content = f.read()
-            client_mods = get_active_mods(content, client_name)
-            all_client_mods.extend(client_mods)
-            
+    for client_mods in results:
+        all_client_mods.extend(client_mods)
+
+    if cache:
+        cache.prune(set(paths))
     return all_client_mods
 
-def generate_mod_md(client_notes:list):
-    """Generate a master markdown file with all client mods."""
-    with open(MOD_FILE, 'w') as f:
-        # Write header
-        f.write(f"# Modifications in Progress\n\n")
-        
-        # Write client sections
-        for client in client_notes:
-            f.write(f"### {client['name']}\n")
-
-            if client['in_progress']:
-                note = (client)
-                f.write(f"{format_notes_for_md(client['in_progress'])}\n")
-            if client['que']:
-                f.write(f"{format_notes_for_md(client['que'])}\n")
-
-            f.write("---\n")
-
-def display_mods_to_console(client_notes):
-    """Log the generated markdown file."""
-        # Log information about what was found
-    logger.critical(
-        "Active Mods\n-----------------------------"
-    )
+def reindex_files(cache:ParseCache, filenames:set, stats=NULL_STATS):
+    """Re-parse only the named client files and return the mods of all clients."""
+    cache.parsed = 0
+    stats.count("files_scanned", len(filenames))
+    for filename in filenames:
+        current = client_path(filename[:-3], CLIENT_DIRS)
+        for client_dir in CLIENT_DIRS:
+            file_path = os.path.join(client_dir, filename)
+            # A client that exists in several folders is read from the first
+            if file_path == current and os.path.exists(file_path):
+                load_client_mods(file_path, get_client_name(filename), cache, stats)
+            else:
+                cache.discard(file_path)
+    return cache.client_mods()
+
+def render_mod_md(client_notes:list) -> str:
+    """Render the master markdown file with all client mods."""
+    # Write header
+    parts = ["# Modifications in Progress\n\n"]
+
+    # Write client sections
     for client in client_notes:
-        logger.debug(f"\n{client['name']}")
-        
-        if client['in_progress']:
-            for note in client['in_progress']:
-                logger.info(f"{format_notes_for_display([note])}")
+        parts.append(f"### {client['name']}\n")
 
+        if client['in_progress']:
+            parts.append(f"{format_notes_for_md(client['in_progress'])}\n")
         if client['que']:
-            for note in client['que']:
-                logger.info(f"{format_notes_for_display([note])}")
-                
-
-def main():
-    logger.info("Generating mods status list...")
-    # Get data from all client files
-    all_client_mods = get_all_active_mods()
+            parts.append(f"{format_notes_for_md(client['que'])}\n")
+
+        parts.append("---\n")
+    return "".join(parts)
+
+def generate_mod_md(notes:NoteStore) -> bool:
+    """Generate a master markdown file with all client mods.
+
+    The mods are the active_notes() query over the store. The file is only
+    rewritten when the rendered output differs from what is already on
+    disk, so the mkdocs live server does not rebuild on every pass.
+    Returns:
+        bool: True if MOD_FILE was written.
+    """
+    rendered = render_mod_md(notes.client_mods())
+    try:
+        with open(MOD_FILE, 'r') as f:
+            if f.read() == rendered:
+                return False
+    except FileNotFoundError:
+        pass
+
+    with open(MOD_FILE, 'w') as f:
+        f.write(rendered)
+    return True
+
+def render_console_report(notes:NoteStore) -> str:
+    """The active mods as console text, grouped by client."""
+    lines = ["Active Mods", "-----------------------------"]
+    for client in notes.client_mods():
+        lines.append(f"\n{client['name']}")
+        lines.extend(format_notes_for_display([note]) for note in client['in_progress'] + client['que'])
+    return "\n".join(lines)
+
+def display_mods_to_console(notes:NoteStore):
+    """Log the active mods as a single record, so the console gets one write per pass."""
+    logger.info(render_console_report(notes))
+
+def publish_mods(notes:NoteStore, stats=NULL_STATS, shards:ShardWriter=None):
+    """Write the mods index (or the sharded pages) and log the active mods."""
+    all_client_mods = notes.client_mods()
+    if shards:
+        # Sync even with no active mods, so the last client's pages get removed
+        with stats.phase("write"):
+            written, removed = shards.write(all_client_mods)
+        logger.debug(f"Active pages: {len(written)} written, {len(removed)} removed.")
     if not all_client_mods:
         logger.warning("No active tasks found in any client files.")
         return
-    # Generate the master list
-    generate_mod_md(all_client_mods)
+    if not shards:
+        # Generate the master list
+        with stats.phase("write"):
+            written = generate_mod_md(notes)
+        if not written:
+            logger.debug("Mods list unchanged, index not rewritten.")
     # Display the modifications in the console
-    display_mods_to_console(all_client_mods)
+    with stats.phase("display"):
+        display_mods_to_console(notes)
     
     logger.info(f"Active client tasks found: {len(all_client_mods)}")
 
+class ServedMods:
+    """The active mods as listed by the notes service; published like a NoteStore's."""
+
+    def __init__(self, client_mods:list[dict]):
+        self.mods = client_mods
+
+    def client_mods(self) -> list[dict]:
+        return self.mods
+
+def served_mods(changed:set = None, stats=NULL_STATS):
+    """
+    Get the active mods from the notes service (src/service.py), which keeps every client parsed.
+
+    `changed` names the client files the service should check first; without
+    it the service checks them all.
+    Returns:
+        ServedMods: The mods, or None if no service is running and the
+            files have to be read here.
+    """
+    service = connect(SOCKET_PATH)
+    if service is None:
+        return None
+    try:
+        with stats.phase("fetch"):
+            return ServedMods(service.mods(sorted(changed) if changed is not None else None))
+    except (ServiceUnavailable, ServiceError) as e:
+        logger.warning(f"Notes service failed ({e}), reading the client files instead.")
+        return None
+    finally:
+        service.close()
+
+def compact_journals(idle:float):
+    """Fold the operation journals nobody appended to for `idle` seconds into their files."""
+    compacted = sum(compact_dir(client_dir, idle) for client_dir in CLIENT_DIRS)
+    if compacted:
+        logger.info(f"Compacted {compacted} client journals")
+
+def main(cache:NoteStore=None, io_executor=None, parse_executor=None, instrumentation:Instrumentation=None,
+         shards:ShardWriter=None, compact_idle:float=None):
+    """One pass: publish the active mods, from the notes service when it runs, else from the files."""
+    instrumentation = instrumentation or Instrumentation()
+    stats = instrumentation.start_pass()
+    with instrumentation.profile():
+        logger.info("Generating mods status list...")
+        notes = served_mods(stats=stats)
+        if notes is None:
+            # Without a long-lived store (--full), every pass parses into a fresh one
+            notes = cache if cache is not None else NoteStore()
+            # Get data from all client files
+            get_all_active_mods(notes, io_executor, parse_executor, stats)
+        publish_mods(notes, stats, shards)
+    instrumentation.finish_pass(stats)
+    if compact_idle is not None:
+        compact_journals(compact_idle)
+    return notes
+
+def watch_mods(poll:bool = False, debounce:float = 0.2, io_executor=None, parse_executor=None,
+               instrumentation:Instrumentation=None, shards:ShardWriter=None, compact_idle:float=None):
+    """Rebuild the index whenever client files change instead of on a timer."""
+    # Start watching before the first pass so no edit falls in between
+    watcher = create_watcher(CLIENT_DIRS, poll=poll)
+    instrumentation = instrumentation or Instrumentation()
+    cache = NoteStore()
+    served = main(cache, io_executor, parse_executor, instrumentation, shards, compact_idle) is not cache
+    logger.info(f"Watching {', '.join(CLIENT_DIRS)} ({type(watcher).__name__})")
+    try:
+        for changed in watch(watcher, debounce=debounce):
+            logger.info(f"Changed: {', '.join(sorted(changed))}")
+            stats = instrumentation.start_pass()
+            with instrumentation.profile():
+                notes = served_mods(changed, stats)
+                if notes is None:
+                    if served:
+                        # The store missed the passes the service answered
+                        get_all_active_mods(cache, io_executor, parse_executor, stats)
+                    else:
+                        reindex_files(cache, changed, stats)
+                    notes = cache
+                served = notes is not cache
+                publish_mods(notes, stats, shards)
+            instrumentation.finish_pass(stats)
+            if compact_idle is not None:
+                compact_journals(compact_idle)
+    finally:
+        watcher.close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Keep the mods index in sync with the client notes.")
+    parser.add_argument("--interval", type=int, default=60,
+                        help="Seconds between passes (default: 60)")
+    parser.add_argument("--full", action="store_true",
+                        help="Re-parse every client file on every pass instead of only changed files")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Threads used to stat and read client files (default: 8, 1 reads serially)")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="Processes used to parse client files (default: 0, parse on the reader threads)")
+    parser.add_argument("--watch", action="store_true",
+                        help="Re-index as soon as client files change instead of polling on an interval")
+    parser.add_argument("--poll", action="store_true",
+                        help="With --watch, stat files on a short interval instead of using inotify")
+    parser.add_argument("--debounce", type=float, default=0.2,
+                        help="With --watch, seconds to wait for a burst of edits to settle (default: 0.2)")
+    parser.add_argument("--sharded", action="store_true",
+                        help=f"Write one page per client plus status/action rollups to {ACTIVE_DIR} "
+                             "instead of the single index")
+    parser.add_argument("--compact-journals", type=float, metavar="SECONDS",
+                        help="After every pass, fold client journals idle for SECONDS into their markdown files")
+    parser.add_argument("--stats", action="store_true",
+                        help="Log a JSON line with phase timings and counters after every pass")
+    parser.add_argument("--prom-file",
+                        help="Rewrite this Prometheus textfile-collector file after every pass")
+    return parser.parse_args()
+
 if __name__ == "__main__":
+    args = parse_args()
+    setup_logging("index", level=logging.DEBUG,
+                  console_formatter=colorlog.ColoredFormatter("%(log_color)s%(message)s", log_colors=LOG_COLORS))
+    io_executor = ThreadPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    parse_executor = ProcessPoolExecutor(max_workers=args.processes) if args.processes > 0 else None
+    # NOTES_PROFILE=<dir> additionally dumps a cProfile of each pass; creating the
+    # NOTES_PROFILE_TRIGGER file profiles just the next one
+    instrumentation = Instrumentation(emit=logger.info if args.stats else None, prom_file=args.prom_file,
+                                      profiler=PassProfiler.from_env())
+    shards = ShardWriter(ACTIVE_DIR) if args.sharded else None
+    if args.watch:
+        try:
+            watch_mods(poll=args.poll, debounce=args.debounce, io_executor=io_executor,
+                       parse_executor=parse_executor, instrumentation=instrumentation, shards=shards,
+                       compact_idle=args.compact_journals)
+        except KeyboardInterrupt:
+            pass
+        raise SystemExit(0)
+    cache = None if args.full else NoteStore()
     while True:
         try:
-            main()
-            sleep_time = 60 * 1  # 1 minute
-            time.sleep(sleep_time)
+            main(cache, io_executor, parse_executor, instrumentation, shards, args.compact_journals)
+            time.sleep(args.interval)
         except Exception as e:
             logger.error(f"Error occurred: {e}")
             break
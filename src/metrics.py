@@ -0,0 +1,213 @@
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from config import PROFILE_TRIGGER
+from store import atomic_write
+
+PHASES = ("list", "read", "parse", "fetch", "write", "display")
+COUNTERS = ("files_scanned", "bytes_read", "notes_parsed", "parse_failures")
+COUNTER_HELP = {
+    "files_scanned": "Client files listed during the last pass.",
+    "bytes_read": "Characters read from client files during the last pass.",
+    "notes_parsed": "Active notes parsed during the last pass.",
+    "parse_failures": "Malformed notes skipped during the last pass.",
+}
+
+
+class PassStats:
+    """
+    Phase timers and counters for one pass of the index daemon.
+
+    Timers add up the time spent in each phase; phases run on worker threads
+    (read, parse) are summed across threads, so they can exceed wall time.
+    Attributes:
+        timings (dict): Seconds spent per phase.
+        counters (dict): Value of each counter.
+        wall (float): Wall time of the whole pass, set by finish().
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.timings = dict.fromkeys(PHASES, 0.0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.wall = 0.0
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name:str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.timings[name] += elapsed
+
+    def count(self, name:str, amount:int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def finish(self):
+        self.wall = time.perf_counter() - self._start
+
+    def to_dict(self) -> dict:
+        return {
+            "ts": round(self.started, 3),
+            "wall_s": round(self.wall, 6),
+            "phases_s": {name: round(seconds, 6) for name, seconds in self.timings.items()},
+            **self.counters,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+
+class NullStats:
+    """Stand-in used when instrumentation is off; every call is a no-op."""
+
+    enabled = False
+    _context = nullcontext()
+
+    def phase(self, name:str):
+        return self._context
+
+    def count(self, name:str, amount:int = 1):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_STATS = NullStats()
+
+
+def format_prometheus(stats:PassStats) -> str:
+    """Render pass statistics in the Prometheus text exposition format."""
+    lines = [
+        "# HELP client_notes_pass_timestamp_seconds Unix time the last pass started.",
+        "# TYPE client_notes_pass_timestamp_seconds gauge",
+        f"client_notes_pass_timestamp_seconds {stats.started:.3f}",
+        "# HELP client_notes_pass_duration_seconds Wall time of the last pass.",
+        "# TYPE client_notes_pass_duration_seconds gauge",
+        f"client_notes_pass_duration_seconds {stats.wall:.6f}",
+        "# HELP client_notes_phase_seconds Time spent in each phase of the last pass.",
+        "# TYPE client_notes_phase_seconds gauge",
+    ]
+    lines += [f'client_notes_phase_seconds{{phase="{name}"}} {seconds:.6f}'
+              for name, seconds in stats.timings.items()]
+    for name, value in stats.counters.items():
+        lines += [
+            f"# HELP client_notes_{name} {COUNTER_HELP[name]}",
+            f"# TYPE client_notes_{name} gauge",
+            f"client_notes_{name} {value}",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(stats:PassStats, path:str):
+    """Write a node_exporter textfile-collector file, replacing it atomically."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    atomic_write(path, format_prometheus(stats))
+
+
+class PassProfiler:
+    """
+    Optional cProfile hook for index passes, configured from the environment.
+
+    NOTES_PROFILE=<dir> profiles passes into <dir>/pass-<n>.prof (open them
+    with `python -m pstats`); NOTES_PROFILE_EVERY=<n> only profiles every
+    n-th pass. A daemon that is already running profiles its next pass when
+    the trigger file (NOTES_PROFILE_TRIGGER) appears, which it checks at the
+    start of every pass: `touch .notes/profile`, or write a folder name into
+    it. The file is removed once the pass is profiled.
+    Attributes:
+        directory (str): Folder every due pass is profiled into, or None.
+        every (int): Profile every n-th pass.
+        trigger (str): Path of the trigger file, or None.
+    """
+
+    def __init__(self, directory:str = None, every:int = 1, trigger:str = None):
+        self.directory = directory
+        self.every = max(every, 1)
+        self.trigger = trigger
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.environ.get("NOTES_PROFILE") or None, int(os.environ.get("NOTES_PROFILE_EVERY", "1")),
+                   PROFILE_TRIGGER)
+
+    def profile(self, pass_number:int):
+        """Return a context manager that profiles the pass if it is due or triggered."""
+        if self.directory and not pass_number % self.every:
+            return self._profile(self.directory, pass_number)
+        directory = self.triggered()
+        if directory:
+            return self._profile(directory, pass_number)
+        return nullcontext()
+
+    def triggered(self) -> str:
+        """Consume the trigger file; returns the folder to profile into, or None without a trigger."""
+        if not self.trigger:
+            return None
+        try:
+            with open(self.trigger, "r") as f:
+                directory = f.read().strip()
+            os.unlink(self.trigger)
+        except FileNotFoundError:
+            return None
+        return directory or self.directory or os.path.join(os.path.dirname(self.trigger), "profiles")
+
+    @contextmanager
+    def _profile(self, directory:str, pass_number:int):
+        os.makedirs(directory, exist_ok=True)
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(os.path.join(directory, f"pass-{pass_number}.prof"))
+
+
+class Instrumentation:
+    """
+    Per-pass instrumentation settings of the index daemon.
+
+    With neither a JSON log nor a Prometheus file configured, start_pass()
+    hands out NULL_STATS and the passes run uninstrumented.
+    Attributes:
+        emit (callable): Called with the JSON stats line after each pass, or None.
+        prom_file (str): Path of the Prometheus textfile to rewrite after each pass.
+        profiler (PassProfiler): Optional cProfile hook.
+    """
+
+    def __init__(self, emit=None, prom_file:str = None, profiler:PassProfiler = None):
+        self.emit = emit
+        self.prom_file = prom_file
+        self.profiler = profiler or PassProfiler()
+        self.passes = 0
+
+    def start_pass(self):
+        self.passes += 1
+        if self.emit or self.prom_file:
+            return PassStats()
+        return NULL_STATS
+
+    def profile(self):
+        return self.profiler.profile(self.passes)
+
+    def finish_pass(self, stats):
+        if not stats.enabled:
+            return
+        stats.finish()
+        if self.emit:
+            self.emit(stats.to_json())
+        if self.prom_file:
+            write_prometheus(stats, self.prom_file)
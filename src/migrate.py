@@ -0,0 +1,218 @@
+"""
+Structure migrations for client note files.
+
+Each migration is a version number plus an ordered list of declarative
+transforms. A file records the version it is at in a marker on its first
+line ('<!-- structure: 3 -->'); migrating a file applies every pending
+transform in memory and writes the result once, atomically and under the
+client's lock, so a failed run never leaves a half-migrated file. Files at
+the current version are skipped after reading their first line.
+
+Usage:
+    python src/migrate.py [--dry-run] [--dir CLIENT_DIR] [--workers 8]
+"""
+import argparse
+import difflib
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from config import CLIENT_DIR
+from note import NOTE_SECTIONS, _section_heading, tokenize_notes
+from store import edit_client_file
+
+MARKER = re.compile(r"<!-- structure: (\d+) -->\n?")
+
+logger = logging.getLogger(__name__)
+
+
+def heading_lines(content:str):
+    """Yield (start, end, section) for every markdown heading line."""
+    for match in re.finditer(r"^[ \t]*#.*$", content, re.MULTILINE):
+        yield match.start(), match.end(), _section_heading(match.group())
+
+
+def replace_spans(content:str, edits:list) -> str:
+    """Apply (start, end, replacement) edits, given in file order."""
+    parts = []
+    pos = 0
+    for start, end, replacement in edits:
+        parts.append(content[pos:start])
+        parts.append(replacement)
+        pos = end
+    parts.append(content[pos:])
+    return "".join(parts)
+
+
+class SetHeadingLevel:
+    """Write every section heading as '<level #s> *Name*'."""
+
+    def __init__(self, level:int = 2):
+        self.level = level
+
+    def apply(self, content:str) -> str:
+        return replace_spans(content, [(start, end, f"{'#' * self.level} *{section}*")
+                                       for start, end, section in heading_lines(content)
+                                       if section in NOTE_SECTIONS])
+
+
+class RenameSection:
+    """Rename a section heading, keeping its level."""
+
+    def __init__(self, old:str, new:str):
+        self.old = old
+        self.new = new
+
+    def apply(self, content:str) -> str:
+        edits = []
+        for start, end, section in heading_lines(content):
+            if section == self.old:
+                line = content[start:end].strip()
+                edits.append((start, end, line[:len(line) - len(line.lstrip("#"))] + f" *{self.new}*"))
+        return replace_spans(content, edits)
+
+
+class DropClientHeading:
+    """Remove a client-name title ('# ACME INC') above the first section."""
+
+    def apply(self, content:str) -> str:
+        for start, end, section in heading_lines(content):
+            if section in NOTE_SECTIONS:
+                return content
+            return replace_spans(content, [(start, min(end + 1, len(content)), "")])
+        return content
+
+
+class PadDates:
+    """Zero-pad Started/Updated dates such as '2025-6-5' to '2025-06-05'."""
+
+    pattern = re.compile(r"^([ \t]*(?:- )?(?:Started|Updated):[ \t]*)(\d{4})-(\d{1,2})-(\d{1,2})[ \t]*$", re.MULTILINE)
+
+    def apply(self, content:str) -> str:
+        return self.pattern.sub(lambda m: f"{m[1]}{m[2]}-{int(m[3]):02d}-{int(m[4]):02d}", content)
+
+
+class AddField:
+    """Add a missing field, with a default value, as the last line of every note."""
+
+    def __init__(self, field:str, default:str, sections:tuple = None):
+        self.field = field
+        self.default = default
+        self.sections = sections
+
+    def apply(self, content:str) -> str:
+        edits = []
+        for section, notes in tokenize_notes(content).items():
+            if self.sections and section not in self.sections:
+                continue
+            for note in notes:
+                if getattr(note, self.field.lower()) is None:
+                    edits.append((note.end, note.end, f"\n  {self.field}: {self.default}"))
+        return replace_spans(content, sorted(edits))
+
+
+MIGRATIONS = [
+    # What the old note_structure_fix.sh did, plus stray heading levels and spaces
+    (1, [DropClientHeading(), SetHeadingLevel(2)]),
+    (2, [PadDates()]),
+    # NOTE_PATTERN and the index expect every active note to carry a Status;
+    # archived notes are done, so they are left without one
+    (3, [AddField("Status", "Needs Submission", sections=("In Progress", "Que"))]),
+]
+CURRENT_VERSION = MIGRATIONS[-1][0]
+
+
+def file_version(file_path:str) -> int:
+    """The structure version recorded on the first line of a file (0 without a marker)."""
+    with open(file_path, "r") as f:
+        match = MARKER.match(f.readline())
+    return int(match.group(1)) if match else 0
+
+
+def migrate_content(content:str) -> str:
+    """Bring a file's content to CURRENT_VERSION, marker included."""
+    match = MARKER.match(content)
+    version = int(match.group(1)) if match else 0
+    body = content[match.end():] if match else content
+    for migration_version, transforms in MIGRATIONS:
+        if migration_version > version:
+            for transform in transforms:
+                body = transform.apply(body)
+    return f"<!-- structure: {CURRENT_VERSION} -->\n{body}"
+
+
+def migrate_file(file_path:str, dry_run:bool = False) -> tuple[str, str]:
+    """
+    Migrate one client file.
+
+    Returns:
+        tuple[str, str]: The outcome ('current', 'migrated' or 'error') and
+            the unified diff of the change (in dry runs) or error message.
+    """
+    try:
+        if file_version(file_path) >= CURRENT_VERSION:
+            return "current", ""
+        if dry_run:
+            with open(file_path, "r") as f:
+                content = f.read()
+            # Diff without the marker lines, so marker-only updates show no diff
+            name = os.path.basename(file_path)
+            diff = difflib.unified_diff(MARKER.sub("", content, 1).splitlines(True),
+                                        MARKER.sub("", migrate_content(content), 1).splitlines(True),
+                                        f"a/{name}", f"b/{name}")
+            return "migrated", "".join(diff)
+        edit_client_file(file_path, migrate_content, op="migrate")
+        return "migrated", ""
+    except (OSError, UnicodeDecodeError) as e:
+        return "error", str(e)
+
+
+def migrate_all(client_dir:str, dry_run:bool = False, workers:int = 8) -> dict:
+    """Migrate every client file in parallel; returns file name -> (outcome, detail)."""
+    filenames = sorted(filename for filename in os.listdir(client_dir) if filename.endswith(".md"))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        outcomes = executor.map(lambda filename: migrate_file(os.path.join(client_dir, filename), dry_run),
+                                filenames)
+        return dict(zip(filenames, outcomes))
+
+
+def diff_stat(diff:str) -> tuple[int, int]:
+    lines = diff.splitlines()
+    added = sum(1 for line in lines if line.startswith("+") and not line.startswith("+++"))
+    removed = sum(1 for line in lines if line.startswith("-") and not line.startswith("---"))
+    return added, removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate client note files to the current structure.")
+    parser.add_argument("--dir", default=CLIENT_DIR, help="Client directory (default: %(default)s)")
+    parser.add_argument("--dry-run", action="store_true", help="Print the changes as a unified diff, write nothing")
+    parser.add_argument("--workers", type=int, default=8, help="Files processed in parallel (default: 8)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    results = migrate_all(args.dir, args.dry_run, args.workers)
+    counts = {"current": 0, "migrated": 0, "error": 0}
+    for filename, (outcome, detail) in results.items():
+        counts[outcome] += 1
+        if outcome == "error":
+            logger.error(f"{filename}: {detail}")
+        elif args.dry_run and detail:
+            logger.info(detail.rstrip("\n"))
+
+    if args.dry_run:
+        logger.info("")
+        for filename, (outcome, detail) in results.items():
+            if outcome == "migrated" and detail:
+                added, removed = diff_stat(detail)
+                logger.info(f" {filename} | +{added} -{removed}")
+    verb = "would be migrated" if args.dry_run else "migrated"
+    changed = f" ({sum(1 for _, detail in results.values() if detail)} with content changes)" if args.dry_run else ""
+    logger.info(f"{counts['migrated']} files {verb} to structure {CURRENT_VERSION}{changed}, "
+                f"{counts['current']} already current, {counts['error']} errors.")
+    return 1 if counts["error"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,83 @@
+"""
+mkdocs hooks that build the "Mods In Progress" page and the client nav.
+
+Registered in mkdocs.yml under `hooks:`. The page is rendered in memory from
+the client files on every build, so it can never lag behind them the way a
+docs/index.md written by a separate process can, and `mkdocs serve` no
+longer needs the index daemon running next to it.
+
+mkdocs imports a hook file once per process, so the module-level parse cache
+survives live-reload rebuilds and only client files whose mtime changed are
+parsed again.
+"""
+import json
+import logging
+import os
+
+from mkdocs.structure.files import File
+
+from cache import ParseCache
+from client_list import client_name_from_id
+from main import get_client_name, load_client_mods, render_mod_md
+
+MODS_PAGE = "index.md"
+CLIENT_PAGES = "clients/"
+# Client ID -> display name (with the punctuation file names cannot carry),
+# next to mkdocs.yml
+CLIENTS_FILE = "clients.json"
+
+log = logging.getLogger("mkdocs.hooks.client_notes")
+
+parse_cache = ParseCache()
+client_paths = []
+
+
+def load_display_names(config) -> dict:
+    path = os.path.join(os.path.dirname(config.config_file_path), CLIENTS_FILE)
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def client_nav(client_files:list, display_names:dict) -> list:
+    """Nav entries for the client pages, sorted by display name."""
+    entries = []
+    for file in client_files:
+        client_id = file.src_uri[len(CLIENT_PAGES):-3]
+        entries.append({display_names.get(client_id) or client_name_from_id(client_id): file.src_uri})
+    entries.sort(key=lambda entry: next(iter(entry)))
+    return entries
+
+
+def on_files(files, config):
+    """Note the client files mkdocs found and append their pages to the nav."""
+    client_files = sorted((file for file in files.documentation_pages()
+                           if file.src_uri.startswith(CLIENT_PAGES) and file.src_uri.count("/") == 1),
+                          key=lambda file: file.src_uri)
+    client_paths[:] = [file.abs_src_path for file in client_files]
+
+    if files.get_file_from_path(MODS_PAGE) is None:
+        files.append(File.generated(config, MODS_PAGE, content=""))
+
+    if config.nav is not None:
+        listed = {next(iter(entry.values())) for entry in config.nav if isinstance(entry, dict)}
+        config.nav += [entry for entry in client_nav(client_files, load_display_names(config))
+                       if next(iter(entry.values())) not in listed]
+    return files
+
+
+def on_page_markdown(markdown, page, config, files):
+    """Replace the mods page with one rendered from the client files."""
+    if page.file.src_uri != MODS_PAGE:
+        return markdown
+
+    parse_cache.parsed = 0
+    all_client_mods = []
+    for file_path in client_paths:
+        all_client_mods.extend(load_client_mods(file_path, get_client_name(os.path.basename(file_path)),
+                                                parse_cache))
+    parse_cache.prune(set(client_paths))
+    log.info(f"Mods page built from {len(client_paths)} client files ({parse_cache.parsed} parsed)")
+    return render_mod_md(all_client_mods)
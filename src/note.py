@@ -1,5 +1,7 @@
+import logging
 import re
-import colorlog
+import sys
+from datetime import date
 
 NOTE_PATTERN = (
     r"- Started: (\d{4}-\d{2}-\d{2})\n"
@@ -16,26 +18,64 @@ NOTE_SECTIONS = {
     "Archive": r"## \*Archive\*\s*(.*?)(?=\n\s*----|\n----|----|$)"
 }
 
-logger = colorlog.getLogger(__name__)
+NOTE_FIELDS = ("Updated", "Action", "Summary", "Status")
+DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}\Z")
+
+logger = logging.getLogger(__name__)
+
+
+def to_ordinal(value) -> int:
+    """Convert a 'YYYY-MM-DD' string, date or ordinal to a date ordinal."""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = date.fromisoformat(value)
+    return value.toordinal()
 
 
 class Note:
     """
     Represents a client note with details about the action taken, summary, and status.
+
+    Notes are held in memory for every client, so the class uses __slots__,
+    keeps dates as ordinals and interns the small action/status vocabulary.
     Attributes:
-        started (str): The date when the note was started.
-        updated (str): The date when the note was last updated.
+        started (str): The date when the note was started, as 'YYYY-MM-DD'.
+        updated (str): The date when the note was last updated, as 'YYYY-MM-DD'.
+        started_ordinal (int): `started` as a date ordinal.
+        updated_ordinal (int): `updated` as a date ordinal.
         action (str): The action taken or to be taken.
         summary (str): A summary of the note.
         status (str): The current status of the note.
+        section (str): The section the note was parsed from, if known.
+        start (int): Offset of the note's first character in the file, if known.
+        end (int): Offset just past the note's last character in the file, if known.
     """
 
-    def __init__(self, started, updated, action, summary, status=None):
-        self.started = started
-        self.updated = updated
-        self.action = action
+    __slots__ = ("started_ordinal", "updated_ordinal", "action", "summary", "status",
+                 "section", "start", "end")
+
+    def __init__(self, started, updated, action, summary, status=None,
+                 section=None, start=None, end=None):
+        self.started_ordinal = to_ordinal(started)
+        self.updated_ordinal = to_ordinal(updated)
+        self.action = sys.intern(action)
         self.summary = summary
-        self.status = status
+        self.status = sys.intern(status) if status is not None else None
+        self.section = section
+        self.start = start
+        self.end = end
+
+    @property
+    def started(self) -> str:
+        return date.fromordinal(self.started_ordinal).isoformat()
+
+    @property
+    def updated(self) -> str:
+        return date.fromordinal(self.updated_ordinal).isoformat()
+
+    def __repr__(self):
+        return f"Note({self.started!r}, {self.updated!r}, {self.action!r}, {self.summary!r}, {self.status!r})"
 
 
     def to_markdown(self):
@@ -50,6 +90,18 @@ class Note:
         )
         return md
     
+    def to_entry(self):
+        """Format the note the way it is stored in a client file."""
+        entry = (
+            f"- Started: {self.started}\n"
+            f"  Updated: {self.updated}\n"
+            f"  Action: {self.action}\n"
+            f"  Summary: {self.summary}"
+        )
+        if self.status is not None:
+            entry += f"\n  Status: {self.status}"
+        return entry
+
     def to_display(self):
         """Format the note for console display."""
         return f"{self.action}:{self.status}"
@@ -89,30 +141,137 @@ def extract_note_section(content:str, section_name:str) -> str:
     return None
 
 
-def get_active_mods(content:str, client_name:str) -> list[dict]:
+def _section_heading(line:str):
+    """Return the section name if the line is a section heading like '## *Que*'."""
+    stripped = line.strip()
+    if not stripped.startswith("#"):
+        return None
+    title = stripped.lstrip("#").strip()
+    if len(title) > 2 and title[0] == "*" and title[-1] == "*":
+        return title[1:-1]
+    return title
+
+
+def _build_note(fields:dict, section:str, start:int, end:int):
+    """Create a Note from collected fields, or None if the note is malformed."""
+    started = fields.get("Started")
+    updated = fields.get("Updated")
+    action = fields.get("Action")
+    summary = fields.get("Summary")
+    if not (started and updated and action and summary):
+        return None
+    if not (DATE_PATTERN.match(started) and DATE_PATTERN.match(updated)):
+        return None
+    try:
+        return Note(started, updated, action, summary.rstrip(), fields.get("Status"),
+                    section=section, start=start, end=end)
+    except ValueError:
+        # Well-formed but impossible dates such as 2025-13-40
+        return None
+
+
+def tokenize_notes(content:str, malformed:list = None) -> dict[str, list[Note]]:
+    """
+    Parse every note section of a client file in a single pass.
+
+    - Walks the file line by line, so running time is linear in its size.
+    - A section starts at its '## *Name*' heading and ends at a '----' rule
+      or the next heading.
+    - A note starts at '- Started:' and collects the Updated, Action, Summary
+      and Status fields; Summary may continue over several lines.
+    - Notes missing Started, Updated, Action or Summary are skipped; Status
+      is optional and left as None when absent.
+
+    Args:
+        content (str): The markdown content of the client file.
+        malformed (list): Optional list the start offset of every skipped
+            note is appended to.
+    Returns:
+        dict[str, list[Note]]: Notes for each name in NOTE_SECTIONS, in file
+            order, with `section`, `start` and `end` set.
+    """
+    sections = {name: [] for name in NOTE_SECTIONS}
+    section = None
+    fields = None          # fields of the note being collected
+    last_field = None      # field that continuation lines are appended to
+    note_start = note_end = 0
+
+    def finish():
+        if fields is not None:
+            note = _build_note(fields, section, note_start, note_end)
+            if note:
+                sections[section].append(note)
+            elif malformed is not None:
+                malformed.append(note_start)
+
+    pos = 0
+    length = len(content)
+    while pos < length:
+        newline = content.find("\n", pos)
+        line_end = length if newline == -1 else newline
+        line = content[pos:line_end]
+        stripped = line.strip()
+
+        heading = _section_heading(line) if stripped.startswith("#") else None
+        if heading is not None or stripped.startswith("----"):
+            finish()
+            fields = None
+            section = heading if heading in sections else None
+        elif section is None:
+            pass
+        elif stripped.startswith("- Started:"):
+            finish()
+            fields = {"Started": stripped[len("- Started:"):].strip()}
+            last_field = "Started"
+            note_start, note_end = pos + line.index("-"), line_end
+        elif fields is not None:
+            name, sep, value = stripped.partition(":")
+            if sep and name in NOTE_FIELDS and name not in fields:
+                fields[name] = value.strip()
+                last_field = name
+                note_end = line_end
+            elif last_field == "Summary":
+                # Summaries may span lines, including blank ones
+                fields["Summary"] += "\n" + line
+                if stripped:
+                    note_end = line_end
+            elif stripped and last_field == "Status":
+                fields["Status"] += "\n" + stripped
+                note_end = line_end
+            elif not stripped and last_field == "Status":
+                finish()
+                fields = None
+        pos = line_end + 1
+
+    finish()
+    return sections
+
+
+def active_mods(sections:dict, client_name:str) -> list[dict]:
+    """Build the active modifications entry of a client from its parsed sections.
+
+    The index only shows In Progress and Que notes with a Status; clients
+    without any get no entry.
+    """
+    in_progress_notes = [note for note in sections["In Progress"] if note.status is not None]
+    que_notes = [note for note in sections["Que"] if note.status is not None]
+    if not in_progress_notes and not que_notes:
+        return []
+    return [{
+        'name': client_name,
+        'in_progress': in_progress_notes,
+        'que': que_notes
+    }]
+
+
+def get_active_mods(content:str, client_name:str, malformed:list = None) -> list[dict]:
     """Extract active modifications for a client from the markdown content.
     Args:
         content (str): The markdown content of the client file.
         client_name (str): The name of the client.
+        malformed (list): Optional list that collects the offsets of skipped notes.
     Returns:
         list[dict]: A list of dictionaries containing active modifications for the client.
     """
-    active_mod_list = []
-
-    # Extract in progress
-    in_progress_content = extract_note_section(content, "In Progress")
-    # Extract que sections
-    que_content = extract_note_section(content, "Que")
-
-    # Parse the detailed notes from each section
-    in_progress_notes = parse_client_notes(in_progress_content)
-    que_notes = parse_client_notes(que_content)
-    
-    # Only include clients with active items
-    if in_progress_notes or que_notes:
-        active_mod_list.append({
-            'name': client_name,
-            'in_progress': in_progress_notes,
-            'que': que_notes
-        })
-    return active_mod_list
\ No newline at end of file
+    # Parse every section in one pass
+    return active_mods(tokenize_notes(content, malformed), client_name)
@@ -0,0 +1,156 @@
+import os
+import time
+from datetime import datetime
+
+from logs import log_operation, timed_operation
+from note import Note, tokenize_notes
+from store import edit_client_file, insert_note, remove_note, replace_note
+
+OPERATIONS = ("add", "update", "archive", "delete")
+# Note fields a `match` selector may compare
+MATCH_FIELDS = ("section", "started", "updated", "action", "summary", "status")
+# Text fields an operation may carry, and whether they may be null
+TEXT_FIELDS = {"action": False, "summary": False, "section": False, "status": True, "date": True}
+
+
+def check_fields(op:dict):
+    """
+    Check the types of an operation's fields, as a JSON batch line can hold anything.
+
+    Raises:
+        ValueError: If `note` is not a note number or a text field is not a string.
+    """
+    if "note" in op and (isinstance(op["note"], bool) or not isinstance(op["note"], (int, str))):
+        raise ValueError(f"note must be a note number, not {op['note']!r}")
+    for field, nullable in TEXT_FIELDS.items():
+        if field in op and not isinstance(op[field], str) and not (nullable and op[field] is None):
+            raise ValueError(f"{field} must be a string, not {op[field]!r}")
+
+
+def list_notes(content:str) -> list[Note]:
+    """Parse every section in one pass and list the notes in file order."""
+    sections = tokenize_notes(content)
+    mods = [note for notes in sections.values() for note in notes]
+    mods.sort(key=lambda note: note.start)
+    return mods
+
+
+def find_note(content:str, op:dict) -> Note:
+    """
+    Find the note a batch operation targets.
+
+    Notes are picked either by `note`, their 1-based position as listed by
+    the interactive menu, or by `match`, a dict of field values (e.g.
+    {"action": "EPA", "section": "Que"}) of which the first matching note wins.
+    Raises:
+        ValueError: If the selector is invalid or selects no note.
+    """
+    check_fields(op)
+    if "match" in op and "note" not in op:
+        if not isinstance(op["match"], dict):
+            raise ValueError(f"match must map note fields to values, not {op['match']!r}")
+        unknown = [field for field in op["match"] if field not in MATCH_FIELDS]
+        if unknown:
+            raise ValueError(f"unknown match field {', '.join(map(repr, unknown))} "
+                             f"(expected one of {', '.join(MATCH_FIELDS)})")
+    mods = list_notes(content)
+    if "note" in op:
+        index = int(op["note"])
+        if not 1 <= index <= len(mods):
+            raise ValueError(f"note {index} out of range (client has {len(mods)} notes)")
+        return mods[index - 1]
+    if "match" in op:
+        for note in mods:
+            if all(getattr(note, field) == value for field, value in op["match"].items()):
+                return note
+        raise ValueError(f"no note matches {op['match']}")
+    raise ValueError("operation needs 'note' or 'match' to select a note")
+
+
+def apply_operation(content:str, op:dict, note:Note = None) -> str:
+    """
+    Apply one batch operation to a client file's content and return the new content.
+
+    New and touched notes are dated today, or `op["date"]` when given, so a
+    journaled operation replays to the same result on any day. `note` is the
+    note the operation selects, when the caller already found it.
+    Raises:
+        ValueError: If the operation is invalid or its note is not found.
+    """
+    check_fields(op)
+    kind = op.get("op")
+    timestamp = op.get("date") or datetime.now().strftime("%Y-%m-%d")
+
+    if kind == "add":
+        if not op.get("summary"):
+            raise ValueError("add needs a summary")
+        note = Note(timestamp, timestamp, op.get("action", "MOD"), op["summary"], op.get("status"))
+        new_content = insert_note(content, op.get("section", "In Progress"), note)
+        if new_content is None:
+            raise ValueError(f"section '{op.get('section', 'In Progress')}' not found")
+        return new_content
+
+    if kind not in OPERATIONS:
+        raise ValueError(f"unknown operation '{kind}'")
+    note = note or find_note(content, op)
+
+    if kind == "update":
+        updated_note = Note(note.started, timestamp, op.get("action", note.action),
+                            op.get("summary", note.summary), op.get("status", note.status))
+        return replace_note(content, note, updated_note)
+    if kind == "archive":
+        archived = Note(note.started, timestamp, note.action, note.summary, note.status)
+        new_content = insert_note(remove_note(content, note), "Archive", archived)
+        if new_content is None:
+            raise ValueError("section 'Archive' not found")
+        return new_content
+    return remove_note(content, note)
+
+
+def apply_operations(file_path:str, ops:list[dict], journal:bool = False) -> list[tuple[dict, str]]:
+    """
+    Apply every operation for one client file with a single read and a single write.
+
+    Operations run in order, each seeing the result of the previous ones; a
+    failed operation is skipped without affecting the others. With `journal`
+    each operation is appended to the client's journal instead.
+    Returns:
+        list[tuple[dict, str]]: Each operation with its error, or None on success.
+    """
+    client_id = os.path.basename(file_path)[:-3]
+    results = []
+
+    if journal:
+        from journal import append_operation  # journal imports this module
+
+        for op in ops:
+            try:
+                with timed_operation(op.get("op"), client_id, action=op.get("action"), journal=True):
+                    append_operation(file_path, op)
+                results.append((op, None))
+            except (OSError, ValueError) as e:
+                results.append((op, str(e)))
+        return results
+
+    def transform(content):
+        changed = False
+        for op in ops:
+            try:
+                content = apply_operation(content, op)
+                results.append((op, None))
+                changed = True
+            except ValueError as e:
+                results.append((op, str(e)))
+        return content if changed else None
+
+    start = time.perf_counter()
+    try:
+        edit_client_file(file_path, transform, op="batch" if len(ops) != 1 else ops[0].get("op"))
+    except OSError as e:
+        results = [(op, str(e)) for op in ops]
+    # One read and write serve the whole group, so its time is what each operation cost
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 3)
+    for op, error in results:
+        log_operation(op.get("op"), client_id, action=op.get("action"), ok=error is None, error=error,
+                      elapsed_ms=elapsed_ms, batch=len(ops))
+    return results
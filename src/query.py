@@ -0,0 +1,407 @@
+"""
+In-memory query API over every note of every client.
+
+NoteStore is a ParseCache that also keeps each client's full set of parsed
+notes (archive included) and indexes them: inverted indexes by section,
+status and action, and sorted indexes on the updated and started dates.
+The indexes are updated per file, as the daemon re-parses changed files,
+so a query never rescans the client directory.
+
+    store.query().where(section="In Progress", status="Needs Submission").updated_between(before=cutoff)
+    store.query().where(action="Photo").updated_between(after="2025-06-01").order_by("-updated").page(1, 20)
+
+Usage:
+    python src/query.py [--section S] [--status S] [--action A] [--stale DAYS] [--since DATE]
+                        [--sort=-updated,client] [--page N]
+"""
+import argparse
+import bisect
+import copy
+import os
+import threading
+from datetime import date, timedelta
+from typing import NamedTuple
+
+from cache import ParseCache
+from client_list import client_name_from_id
+from config import CLIENT_DIR
+from note import Note, active_mods, to_ordinal, tokenize_notes
+from store import read_client_content
+
+ACTIVE_SECTIONS = ("In Progress", "Que")
+SECTION_ORDER = {"In Progress": 0, "Que": 1, "Archive": 2}
+INDEXED_FIELDS = ("section", "status", "action")
+
+
+class NoteRef(NamedTuple):
+    """A note together with the client file it belongs to."""
+    file_path: str
+    client_name: str
+    note: Note
+
+
+SORT_KEYS = {
+    # By file name, as config.client_files lists them, whatever folder the file is in
+    "client": lambda ref: (os.path.basename(ref.file_path), ref.file_path),
+    "section": lambda ref: SECTION_ORDER.get(ref.note.section, len(SECTION_ORDER)),
+    "position": lambda ref: ref.note.start,
+    "updated": lambda ref: ref.note.updated_ordinal,
+    "started": lambda ref: ref.note.started_ordinal,
+    "action": lambda ref: ref.note.action,
+    "status": lambda ref: ref.note.status or "",
+}
+
+
+class NoteStore(ParseCache):
+    """
+    Parse cache that indexes every note of every client for queries.
+
+    Attributes:
+        refs (dict): note id -> NoteRef.
+        file_ids (dict): client file path -> ids of its notes.
+        indexes (dict): field ('section', 'status', 'action') -> value -> set of ids.
+        dates (dict): 'updated'/'started' -> sorted list of (date ordinal, id).
+            New entries are appended to `unsorted` and merged in before the
+            list is next searched, so loading every file costs one sort.
+            Entries of removed notes stay behind, skipped by queries (ids are
+            never reused), until they outnumber the live notes and the list
+            is compacted, so re-indexing a file never searches or shifts it.
+
+    The daemon parses files on a thread pool, so every change to the
+    indexes, and every read of them, holds `lock`.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.refs = {}
+        self.file_ids = {}
+        self.indexes = {field: {} for field in INDEXED_FIELDS}
+        self.dates = {"updated": [], "started": []}
+        self.unsorted = {"updated": [], "started": []}
+        self.stale = {"updated": 0, "started": 0}
+        self.next_id = 0
+        self.lock = threading.RLock()
+        self.active = None  # client_mods(), until a file is re-indexed
+
+    def store(self, file_path:str, signature:tuple, client_mods:list[dict], sections:dict = None):
+        """Record a freshly parsed file; `sections` (tokenize_notes output) replaces its indexed notes."""
+        with self.lock:
+            super().store(file_path, signature, client_mods)
+            if sections is not None:
+                self.index_file(file_path, sections)
+
+    def get(self, file_path:str, client_name:str) -> list[dict]:
+        signature, client_mods = self.lookup(file_path)
+        if client_mods is None:
+            content = read_client_content(file_path)
+            client_mods, _, sections = parse_sections(content, client_name)
+            self.store(file_path, signature, client_mods, sections)
+        return client_mods
+
+    def discard(self, file_path:str):
+        with self.lock:
+            super().discard(file_path)
+            self.unindex_file(file_path)
+
+    def prune(self, live_paths:set):
+        with self.lock:
+            super().prune(live_paths)
+            for file_path in list(self.file_ids):
+                if file_path not in live_paths:
+                    self.unindex_file(file_path)
+
+    def index_file(self, file_path:str, sections:dict):
+        """Replace the indexed notes of a file; callers hold `lock`."""
+        self.unindex_file(file_path)
+        self.active = None
+        client_name = client_name_from_id(os.path.basename(file_path)[:-3])
+        ids = []
+        for notes in sections.values():
+            for note in notes:
+                note_id = self.next_id
+                self.next_id += 1
+                self.refs[note_id] = NoteRef(file_path, client_name, note)
+                for field in INDEXED_FIELDS:
+                    self.indexes[field].setdefault(getattr(note, field), set()).add(note_id)
+                self.unsorted["updated"].append((note.updated_ordinal, note_id))
+                self.unsorted["started"].append((note.started_ordinal, note_id))
+                ids.append(note_id)
+        self.file_ids[file_path] = ids
+
+    def unindex_file(self, file_path:str):
+        """Drop the indexed notes of a file; their date entries are left for sorted_dates to compact."""
+        if file_path in self.file_ids:
+            self.active = None
+        ids = self.file_ids.pop(file_path, ())
+        for note_id in ids:
+            note = self.refs.pop(note_id).note
+            for field in INDEXED_FIELDS:
+                index = self.indexes[field]
+                value = getattr(note, field)
+                index[value].discard(note_id)
+                if not index[value]:
+                    del index[value]
+        for name in self.stale:
+            self.stale[name] += len(ids)
+            if self.stale[name] > len(self.refs):
+                self.compact_dates(name)
+
+    def compact_dates(self, name:str):
+        """Drop the entries of removed notes from a date index."""
+        self.dates[name] = [entry for entry in self.dates[name] if entry[1] in self.refs]
+        self.unsorted[name] = [entry for entry in self.unsorted[name] if entry[1] in self.refs]
+        self.stale[name] = 0
+
+    def sorted_dates(self, name:str) -> list:
+        """
+        The sorted (ordinal, id) index of a date field, with pending entries merged in.
+
+        It may still hold entries of removed notes: skip ids not in `refs`.
+        Callers hold `lock`.
+        """
+        entries = self.dates[name]
+        if self.unsorted[name]:
+            entries.extend(self.unsorted[name])
+            entries.sort()
+            self.unsorted[name] = []
+        return entries
+
+    def query(self) -> "Query":
+        return Query(self)
+
+    def client_mods(self) -> list[dict]:
+        """The active mods of every client, as get_active_mods would list them."""
+        with self.lock:
+            if self.active is None:
+                self.active = group_by_client(active_notes(self))
+            return self.active
+
+    def refresh(self, client_dir:str = CLIENT_DIR) -> int:
+        """Re-parse the files of a client directory that changed; returns how many were parsed."""
+        self.parsed = 0
+        paths = set()
+        for filename in os.listdir(client_dir):
+            if filename.endswith(".md"):
+                file_path = os.path.join(client_dir, filename)
+                paths.add(file_path)
+                self.get(file_path, client_name_from_id(filename[:-3]))
+        self.prune(paths)
+        return self.parsed
+
+
+class Query:
+    """
+    A composable, immutable query over a NoteStore.
+
+    Every method returns a new query; nothing runs until the results are
+    read with all(), count(), first() or iteration. Indexed constraints are
+    intersected smallest first, then the remaining filters run on the
+    candidates only.
+    """
+
+    def __init__(self, store:NoteStore):
+        self.store = store
+        self.equals = []       # (field, values): one of the values
+        self.exclusions = []   # (field, values): none of the values
+        self.ranges = []       # (date field, first ordinal, last ordinal)
+        self.clients = None
+        self.predicates = []
+        self.keys = ()
+        self.offset = 0
+        self.size = None
+
+    def _copy(self) -> "Query":
+        query = copy.copy(self)
+        query.equals = list(self.equals)
+        query.exclusions = list(self.exclusions)
+        query.ranges = list(self.ranges)
+        query.predicates = list(self.predicates)
+        return query
+
+    def where(self, client=None, **fields) -> "Query":
+        """
+        Keep notes whose fields equal the given value, or one of the given values.
+
+        Fields are 'section', 'status' and 'action'; `client` takes client IDs.
+        """
+        query = self._copy()
+        for field, value in fields.items():
+            if field not in INDEXED_FIELDS:
+                raise ValueError(f"cannot filter on '{field}', use one of {INDEXED_FIELDS}")
+            query.equals.append((field, _values(value)))
+        if client is not None:
+            query.clients = _values(client)
+        return query
+
+    def exclude(self, **fields) -> "Query":
+        """Drop notes whose fields equal the given value(s); exclude(status=None) drops notes without a Status."""
+        query = self._copy()
+        for field, value in fields.items():
+            if field not in INDEXED_FIELDS:
+                raise ValueError(f"cannot filter on '{field}', use one of {INDEXED_FIELDS}")
+            query.exclusions.append((field, _values(value)))
+        return query
+
+    def updated_between(self, after=None, before=None) -> "Query":
+        """Keep notes updated on or after `after` and on or before `before` (dates, 'YYYY-MM-DD' or ordinals)."""
+        return self._date_range("updated", after, before)
+
+    def started_between(self, after=None, before=None) -> "Query":
+        return self._date_range("started", after, before)
+
+    def _date_range(self, field:str, after, before) -> "Query":
+        query = self._copy()
+        query.ranges.append((field, to_ordinal(after) if after is not None else None,
+                             to_ordinal(before) if before is not None else None))
+        return query
+
+    def filter(self, predicate) -> "Query":
+        """Keep the NoteRefs for which `predicate(ref)` is true."""
+        query = self._copy()
+        query.predicates.append(predicate)
+        return query
+
+    def order_by(self, *keys:str) -> "Query":
+        """Sort by keys from SORT_KEYS, most significant first; '-updated' sorts descending."""
+        for key in keys:
+            if key.lstrip("-") not in SORT_KEYS:
+                raise ValueError(f"cannot sort on '{key}', use one of {tuple(SORT_KEYS)}")
+        query = self._copy()
+        query.keys = keys
+        return query
+
+    def limit(self, size:int, offset:int = 0) -> "Query":
+        query = self._copy()
+        query.size = size
+        query.offset = offset
+        return query
+
+    def page(self, number:int, size:int = 20) -> "Query":
+        """The 1-based `number`th page of `size` results."""
+        return self.limit(size, (number - 1) * size)
+
+    def _candidates(self) -> set:
+        with self.store.lock:
+            return self._indexed_candidates()
+
+    def _indexed_candidates(self) -> set:
+        store = self.store
+        sets = []
+        for field, values in self.equals:
+            index = store.indexes[field]
+            sets.append(set().union(*(index.get(value, ()) for value in values)))
+        for field, first, last in self.ranges:
+            entries = store.sorted_dates(field)
+            start = bisect.bisect_left(entries, (first,)) if first is not None else 0
+            end = bisect.bisect_left(entries, (last + 1,)) if last is not None else len(entries)
+            sets.append({note_id for _, note_id in entries[start:end] if note_id in store.refs})
+        if self.clients is not None:
+            sets.append({note_id for file_path, ids in store.file_ids.items()
+                         if os.path.basename(file_path)[:-3] in self.clients for note_id in ids})
+        if not sets:
+            candidates = set(store.refs)
+        else:
+            sets.sort(key=len)
+            candidates = sets[0].intersection(*sets[1:])
+        for field, values in self.exclusions:
+            index = store.indexes[field]
+            for value in values:
+                candidates -= index.get(value, set())
+        return candidates
+
+    def _matches(self) -> list[NoteRef]:
+        with self.store.lock:
+            refs = [self.store.refs[note_id] for note_id in self._indexed_candidates()]
+        for predicate in self.predicates:
+            refs = [ref for ref in refs if predicate(ref)]
+        # Stable sorts, least significant key first
+        for key in reversed(self.keys):
+            refs.sort(key=SORT_KEYS[key.lstrip("-")], reverse=key.startswith("-"))
+        return refs
+
+    def all(self) -> list[NoteRef]:
+        refs = self._matches()
+        end = self.offset + self.size if self.size is not None else None
+        return refs[self.offset:end]
+
+    def count(self) -> int:
+        """The number of matches, ignoring limit() and page()."""
+        if not self.predicates:
+            return len(self._candidates())
+        return len(self._matches())
+
+    def first(self):
+        refs = self.limit(1, self.offset).all()
+        return refs[0] if refs else None
+
+    def __iter__(self):
+        return iter(self.all())
+
+
+def _values(value) -> tuple:
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(value)
+    return (value,)
+
+
+def parse_sections(content:str, client_name:str, malformed:list = None) -> tuple[list[dict], int, dict]:
+    """Parse a client file once; returns its active mods, malformed note count and all its notes by section."""
+    malformed = [] if malformed is None else malformed
+    sections = tokenize_notes(content, malformed)
+    return active_mods(sections, client_name), len(malformed), sections
+
+
+def active_notes(store:NoteStore) -> Query:
+    """The notes the mods index shows: In Progress and Que notes with a Status, in file order."""
+    return store.query().where(section=ACTIVE_SECTIONS).exclude(status=None).order_by("client", "section", "position")
+
+
+def group_by_client(refs) -> list[dict]:
+    """Group ordered NoteRefs of active notes into get_active_mods' per-client dicts."""
+    client_mods = []
+    for ref in refs:
+        if not client_mods or client_mods[-1]["file_path"] != ref.file_path:
+            client_mods.append({"file_path": ref.file_path, "name": ref.client_name, "in_progress": [], "que": []})
+        client_mods[-1]["in_progress" if ref.note.section == "In Progress" else "que"].append(ref.note)
+    for client in client_mods:
+        del client["file_path"]
+    return client_mods
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query every client's notes.")
+    parser.add_argument("--dir", default=CLIENT_DIR, help="Client directory (default: %(default)s)")
+    parser.add_argument("--section", action="append", help="Repeat to allow several sections")
+    parser.add_argument("--status", action="append")
+    parser.add_argument("--action", action="append")
+    parser.add_argument("--client", action="append", help="Client ID")
+    parser.add_argument("--stale", type=int, metavar="DAYS", help="Only notes not updated in DAYS days")
+    parser.add_argument("--since", metavar="YYYY-MM-DD", help="Only notes updated on or after this date")
+    parser.add_argument("--sort", default="-updated",
+                        help="Comma-separated sort keys, '-' for descending (default: %(default)s)")
+    parser.add_argument("--page", type=int, default=1)
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+
+    store = NoteStore()
+    store.refresh(args.dir)
+    query = store.query()
+    fields = {field: getattr(args, field) for field in INDEXED_FIELDS if getattr(args, field)}
+    if fields or args.client:
+        query = query.where(client=args.client, **fields)
+    if args.stale is not None:
+        query = query.updated_between(before=date.today() - timedelta(days=args.stale))
+    if args.since:
+        query = query.updated_between(after=args.since)
+    query = query.order_by(*args.sort.split(","))
+
+    for ref in query.page(args.page, args.page_size):
+        note = ref.note
+        print(f"{ref.client_name} | {note.section} | {note.updated} | {note.action} | {note.status} | {note.summary}")
+    total = query.count()
+    print(f"-- page {args.page} of {max(1, -(-total // args.page_size))}, {total} notes")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
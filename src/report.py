@@ -0,0 +1,253 @@
+"""
+Workload report: how fast mods are opened, closed and worked through.
+
+Every parsed note, plus the cold history of archived notes, is loaded into
+NoteColumns: NumPy arrays of date ordinals and categorical codes for
+action, status, section and client. The aggregates are array operations
+over those columns, not loops over notes:
+
+    * mods opened (by Started date) and closed (moved to the Archive, by
+      Updated date) per week
+    * median and 90th percentile age of In Progress mods, by action
+    * Que wait, by action. Client files do not record when a note moved
+      from Que to In Progress, so the wait is approximated by how long the
+      notes still in Que have been waiting
+    * open mods by status, and the clients with the most open mods
+
+The page is written next to the mods index (docs/report.md by default).
+
+Usage:
+    python src/report.py [--weeks 26] [--no-history] [--today YYYY-MM-DD] [--output PATH]
+"""
+import argparse
+import logging
+import os
+import time
+from array import array
+from datetime import date
+
+import numpy as np
+
+from client_list import client_name_from_id
+from config import CLIENT_DIRS, COLD_DIR, REPORT_FILE, client_files
+from note import NOTE_SECTIONS, tokenize_notes
+from store import atomic_write, read_client_content
+
+SECTIONS = tuple(NOTE_SECTIONS)
+IN_PROGRESS, QUE, ARCHIVE = (SECTIONS.index(name) for name in ("In Progress", "Que", "Archive"))
+WEEKS = 26
+TOP_CLIENTS = 10
+
+logger = logging.getLogger(__name__)
+
+
+class NoteColumns:
+    """
+    Notes as parallel NumPy arrays, one element per note.
+
+    Attributes:
+        started (np.ndarray): Started date ordinals (int32).
+        updated (np.ndarray): Updated date ordinals (int32).
+        action (np.ndarray): Codes into `actions` (int32).
+        status (np.ndarray): Codes into `statuses` (int32); a note without
+            a Status has the code of None.
+        section (np.ndarray): Index into SECTIONS (int8).
+        client (np.ndarray): Codes into `clients` (int32).
+        actions, statuses, clients (list): The value of each code.
+    """
+
+    def __init__(self, started, updated, action, status, section, client, actions, statuses, clients):
+        self.started = started
+        self.updated = updated
+        self.action = action
+        self.status = status
+        self.section = section
+        self.client = client
+        self.actions = actions
+        self.statuses = statuses
+        self.clients = clients
+
+    def __len__(self):
+        return len(self.started)
+
+    @classmethod
+    def from_notes(cls, notes) -> "NoteColumns":
+        """Build the columns from (client_id, Note) pairs; the only per-note Python loop."""
+        started, updated = array("i"), array("i")
+        action, status, client = array("i"), array("i"), array("i")
+        section = array("b")
+        actions, statuses, clients = {}, {}, {}
+        section_codes = {name: i for i, name in enumerate(SECTIONS)}
+        for client_id, note in notes:
+            started.append(note.started_ordinal)
+            updated.append(note.updated_ordinal)
+            action.append(actions.setdefault(note.action, len(actions)))
+            status.append(statuses.setdefault(note.status, len(statuses)))
+            section.append(section_codes.get(note.section, ARCHIVE))
+            client.append(clients.setdefault(client_id, len(clients)))
+        return cls(np.frombuffer(started, dtype=np.intc), np.frombuffer(updated, dtype=np.intc),
+                   np.frombuffer(action, dtype=np.intc), np.frombuffer(status, dtype=np.intc),
+                   np.frombuffer(section, dtype=np.int8), np.frombuffer(client, dtype=np.intc),
+                   list(actions), list(statuses), list(clients))
+
+
+def client_notes(client_dirs:list[str] = None, cold_dir:str = None):
+    """Yield (client_id, Note) for every note of every client file, then of the cold history."""
+    for file_path in client_files(client_dirs):
+        client_id = os.path.basename(file_path)[:-3]
+        try:
+            sections = tokenize_notes(read_client_content(file_path))
+        except FileNotFoundError:
+            continue
+        for notes in sections.values():
+            for note in notes:
+                yield client_id, note
+    if cold_dir:
+        from cold import history_clients, load_history
+
+        for client_id in history_clients(cold_dir):
+            for note in load_history(client_id, cold_dir):
+                yield client_id, note
+
+
+def weekly_throughput(columns:NoteColumns, today:int, weeks:int = WEEKS) -> tuple:
+    """
+    Mods opened and closed in each of the last `weeks` weeks (Monday to Sunday).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: The ordinal of each week's
+            Monday, oldest first, and the opened and closed counts.
+    """
+    # Ordinal 1 (0001-01-01) was a Monday
+    last = (today - 1) // 7
+    first = last - weeks + 1
+
+    def per_week(ordinals):
+        week = (ordinals - 1) // 7 - first
+        return np.bincount(week[(week >= 0) & (week < weeks)], minlength=weeks)
+
+    opened = per_week(columns.started)
+    closed = per_week(columns.updated[columns.section == ARCHIVE])
+    mondays = (np.arange(first, last + 1) * 7) + 1
+    return mondays, opened, closed
+
+
+def group_percentiles(codes:np.ndarray, values:np.ndarray, percentile:float = 90) -> tuple:
+    """
+    Count, median and percentile of `values` for each code, from one sort.
+
+    Returns:
+        tuple[np.ndarray, ...]: The codes present, and per code the count,
+            the median and the percentile (nearest rank).
+    """
+    if not len(codes):
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype=float), empty
+    order = np.lexsort((values, codes))
+    codes, values = codes[order], values[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    counts = np.diff(np.r_[starts, len(codes)])
+    medians = (values[starts + (counts - 1) // 2] + values[starts + counts // 2]) / 2
+    ranks = starts + np.ceil(counts * percentile / 100).astype(np.int64) - 1
+    return codes[starts], counts, medians, values[ranks]
+
+
+def ages_by_action(columns:NoteColumns, section:int, today:int) -> list[tuple]:
+    """(action, notes, median age, 90th percentile age) of a section's notes, most notes first."""
+    in_section = columns.section == section
+    ages = today - columns.started[in_section]
+    codes, counts, medians, p90 = group_percentiles(columns.action[in_section], ages)
+    rows = [(columns.actions[code], int(count), float(median), int(high))
+            for code, count, median, high in zip(codes, counts, medians, p90)]
+    rows.sort(key=lambda row: (-row[1], row[0]))
+    if len(ages):
+        _, counts, medians, p90 = group_percentiles(np.zeros(len(ages), dtype=np.int64), ages)
+        rows.append(("All actions", int(counts[0]), float(medians[0]), int(p90[0])))
+    return rows
+
+
+def open_by_status(columns:NoteColumns) -> list[tuple]:
+    """(status, open mods) over In Progress and Que, most first."""
+    open_notes = columns.section != ARCHIVE
+    counts = np.bincount(columns.status[open_notes], minlength=len(columns.statuses))
+    rows = [(columns.statuses[code] or "No status", int(counts[code])) for code in np.flatnonzero(counts)]
+    rows.sort(key=lambda row: (-row[1], row[0]))
+    return rows
+
+
+def busiest_clients(columns:NoteColumns, top:int = TOP_CLIENTS) -> list[tuple]:
+    """(client name, open mods) of the `top` clients with the most In Progress and Que notes."""
+    counts = np.bincount(columns.client[columns.section != ARCHIVE], minlength=len(columns.clients))
+    codes = np.flatnonzero(counts)
+    codes = codes[np.lexsort((codes, -counts[codes]))][:top]
+    return [(client_name_from_id(columns.clients[code]), int(counts[code])) for code in codes]
+
+
+def render_report(columns:NoteColumns, today:int, weeks:int = WEEKS) -> str:
+    """The report page as markdown."""
+    parts = ["# Workload Report\n\n",
+             f"_{date.fromordinal(today).isoformat()}: {len(columns)} notes of {len(columns.clients)} clients._\n\n"]
+
+    mondays, opened, closed = weekly_throughput(columns, today, weeks)
+    parts.append(f"## Mods opened and closed per week\n\nLast {weeks} weeks; a mod is closed when it is "
+                 "moved to the Archive.\n\n| Week of | Opened | Closed | Net |\n|---|---:|---:|---:|\n")
+    for monday, week_opened, week_closed in zip(mondays[::-1], opened[::-1], closed[::-1]):
+        parts.append(f"| {date.fromordinal(int(monday)).isoformat()} | {week_opened} | {week_closed} "
+                     f"| {int(week_opened) - int(week_closed):+d} |\n")
+    total_opened, total_closed = int(opened.sum()), int(closed.sum())
+    parts.append(f"| **Total** | **{total_opened}** | **{total_closed}** | **{total_opened - total_closed:+d}** |\n\n")
+
+    for title, section, note in (
+            ("Age of In Progress mods by action", IN_PROGRESS, "Days since the mod was started."),
+            ("Que wait by action", QUE, "Days the mods still in Que have waited since they were started; client "
+                                        "files do not record when a mod moves on to In Progress.")):
+        parts.append(f"## {title}\n\n{note}\n\n")
+        rows = ages_by_action(columns, section, today)
+        if not rows:
+            parts.append("No mods.\n\n")
+            continue
+        parts.append("| Action | Mods | Median (days) | 90th percentile (days) |\n|---|---:|---:|---:|\n")
+        for action, count, median, high in rows:
+            parts.append(f"| {action} | {count} | {median:g} | {high} |\n")
+        parts.append("\n")
+
+    parts.append("## Open mods by status\n\n| Status | Mods |\n|---|---:|\n")
+    parts.extend(f"| {status} | {count} |\n" for status, count in open_by_status(columns))
+    parts.append("\n## Clients with the most open mods\n\n| Client | Mods |\n|---|---:|\n")
+    parts.extend(f"| {client} | {count} |\n" for client, count in busiest_clients(columns))
+    return "".join(parts)
+
+
+def write_report(output:str = REPORT_FILE, client_dirs:list[str] = None, cold_dir:str = COLD_DIR,
+                 today:date = None, weeks:int = WEEKS) -> NoteColumns:
+    """Load every note into columns and write the report page; returns the columns."""
+    today = (today or date.today()).toordinal()
+    start = time.perf_counter()
+    columns = NoteColumns.from_notes(client_notes(client_dirs, cold_dir))
+    loaded = time.perf_counter()
+    rendered = render_report(columns, today, weeks)
+    atomic_write(output, rendered)
+    logger.info(f"Loaded {len(columns)} notes in {loaded - start:.2f}s, "
+                f"report written to {output} in {time.perf_counter() - loaded:.2f}s")
+    return columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the workload report page.")
+    parser.add_argument("--dir", action="append",
+                        help="Client folder; repeat for several (default: NOTES_CLIENT_DIRS or the shared drive)")
+    parser.add_argument("--cold-dir", default=COLD_DIR, help="History directory (default: %(default)s)")
+    parser.add_argument("--no-history", action="store_true", help="Leave the cold history out")
+    parser.add_argument("--weeks", type=int, default=WEEKS, help="Weeks of throughput (default: %(default)s)")
+    parser.add_argument("--today", type=date.fromisoformat, help="Report as of this date (default: today)")
+    parser.add_argument("--output", default=REPORT_FILE, help="Report page (default: %(default)s)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    write_report(args.output, args.dir or CLIENT_DIRS, None if args.no_history else args.cold_dir,
+                 args.today, args.weeks)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
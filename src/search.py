@@ -0,0 +1,203 @@
+import argparse
+import logging
+import os
+import sqlite3
+import time
+
+from cache import client_signature
+from config import INDEX_DB, client_files
+from note import tokenize_notes
+from store import read_client_content
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    inode INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    client_id TEXT NOT NULL,
+    client_name TEXT NOT NULL,
+    section TEXT NOT NULL,
+    started TEXT NOT NULL,
+    updated TEXT NOT NULL,
+    action TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS notes_path ON notes(path);
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+    action, summary, status,
+    content='notes', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS notes_ai AFTER INSERT ON notes BEGIN
+    INSERT INTO notes_fts(rowid, action, summary, status)
+    VALUES (new.id, new.action, new.summary, new.status);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_ad AFTER DELETE ON notes BEGIN
+    INSERT INTO notes_fts(notes_fts, rowid, action, summary, status)
+    VALUES ('delete', old.id, old.action, old.summary, old.status);
+END;
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def connect(db_path:str = INDEX_DB) -> sqlite3.Connection:
+    """Open the search index, creating it if needed."""
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _index_file(conn:sqlite3.Connection, file_path:str, client_id:str):
+    """Replace the indexed notes of one client file."""
+    content = read_client_content(file_path)
+    client_name = client_id.replace("_", " ").replace("  ", " & ")
+    conn.execute("DELETE FROM notes WHERE path = ?", (file_path,))
+    conn.executemany(
+        "INSERT INTO notes (path, client_id, client_name, section, started, updated, action, summary, status)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [
+            (file_path, client_id, client_name, section, note.started, note.updated,
+             note.action, note.summary, note.status)
+            for section, notes in tokenize_notes(content).items()
+            for note in notes
+        ],
+    )
+
+
+def update_index(conn:sqlite3.Connection, client_dirs:list[str] = None) -> int:
+    """
+    Bring the index up to date with the client folders.
+
+    Only files whose (mtime, size, inode) changed since they were indexed are
+    re-parsed; files that disappeared are dropped.
+    Args:
+        conn (sqlite3.Connection): The index.
+        client_dirs (list[str]): The client folders; defaults to CLIENT_DIRS.
+    Returns:
+        int: The number of files re-indexed.
+    """
+    indexed = {row[0]: tuple(row[1:]) for row in conn.execute("SELECT path, mtime_ns, size, inode FROM files")}
+    seen = set()
+    reindexed = 0
+    with conn:
+        for path in client_files(client_dirs):
+            try:
+                signature = client_signature(path, os.stat(path))
+            except FileNotFoundError:
+                continue
+            seen.add(path)
+            if indexed.get(path) == signature:
+                continue
+            _index_file(conn, path, os.path.basename(path)[:-3])
+            conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (path, *signature))
+            reindexed += 1
+
+        for path in indexed.keys() - seen:
+            conn.execute("DELETE FROM notes WHERE path = ?", (path,))
+            conn.execute("DELETE FROM files WHERE path = ?", (path,))
+    return reindexed
+
+
+def update_files(conn:sqlite3.Connection, paths) -> int:
+    """
+    Re-index just the named client files, e.g. the ones a client batch created or removed.
+
+    A path that no longer exists is dropped from the index.
+    Returns:
+        int: The number of files re-indexed.
+    """
+    reindexed = 0
+    with conn:
+        for path in paths:
+            try:
+                signature = client_signature(path, os.stat(path))
+                _index_file(conn, path, os.path.basename(path)[:-3])
+            except FileNotFoundError:
+                conn.execute("DELETE FROM notes WHERE path = ?", (path,))
+                conn.execute("DELETE FROM files WHERE path = ?", (path,))
+                continue
+            conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", (path, *signature))
+            reindexed += 1
+    return reindexed
+
+
+def rebuild_index(conn:sqlite3.Connection, client_dirs:list[str] = None) -> int:
+    """Drop everything and re-index from the markdown files."""
+    with conn:
+        conn.execute("DELETE FROM notes")
+        conn.execute("DELETE FROM files")
+        conn.execute("INSERT INTO notes_fts(notes_fts) VALUES ('rebuild')")
+    return update_index(conn, client_dirs)
+
+
+def _match_expression(query:str) -> str:
+    """Turn free text into an FTS5 query: every word must match, the last as a prefix."""
+    terms = ['"' + term.replace('"', '""') + '"' for term in query.split()]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search(conn:sqlite3.Connection, query:str, limit:int = 20, raw:bool = False) -> list[dict]:
+    """
+    Search action, summary and status of every indexed note.
+
+    Args:
+        query (str): Free text, or an FTS5 query when `raw` is True.
+        limit (int): Maximum number of hits.
+    Returns:
+        list[dict]: Hits ordered by bm25 rank, best first.
+    """
+    expression = query if raw else _match_expression(query)
+    if not expression:
+        return []
+    rows = conn.execute(
+        "SELECT n.client_id, n.client_name, n.section, n.started, n.updated, n.action, n.summary, n.status,"
+        " bm25(notes_fts) AS rank"
+        " FROM notes_fts JOIN notes n ON n.id = notes_fts.rowid"
+        " WHERE notes_fts MATCH ? ORDER BY rank LIMIT ?",
+        (expression, limit),
+    )
+    columns = ("client_id", "name", "section", "started", "updated", "action", "summary", "status", "rank")
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text search over all client notes.")
+    parser.add_argument("--db", default=INDEX_DB, help="Path of the SQLite index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    search_parser = subparsers.add_parser("search", help="Search notes (the index is refreshed first)")
+    search_parser.add_argument("query", nargs="+")
+    search_parser.add_argument("--limit", type=int, default=20)
+    search_parser.add_argument("--raw", action="store_true", help="Pass the query to FTS5 unchanged")
+    subparsers.add_parser("update", help="Re-index client files that changed")
+    subparsers.add_parser("rebuild", help="Rebuild the whole index from the markdown files")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    conn = connect(args.db)
+    start = time.perf_counter()
+
+    if args.command == "rebuild":
+        logger.info(f"Rebuilt index from {rebuild_index(conn)} client files.")
+    elif args.command == "update":
+        logger.info(f"Re-indexed {update_index(conn)} client files.")
+    else:
+        update_index(conn)
+        hits = search(conn, " ".join(args.query), limit=args.limit, raw=args.raw)
+        for hit in hits:
+            logger.info(f"{hit['name']} [{hit['section']}] {hit['action']}: {hit['summary'][:60]}"
+                        f" ({hit['status'] or 'no status'}, updated {hit['updated']})")
+        logger.info(f"{len(hits)} hits in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Resident notes service.
+
+Parses every client file of the configured folders once, keeps the notes
+in a NoteStore and answers requests on a Unix domain socket, so noteTaker
+and the index daemon get clients and notes from memory instead of scanning
+the disk. Each request is one JSON object per line (see service_client.py
+for the client side):
+
+    {"op": "list"}                                   every (client_id, client_name)
+    {"op": "list", "query": "acme", "limit": 5}      the best matches, as noteTaker completes them
+    {"op": "get", "client": "ACME_INC"}              a client's notes in file order and content hash
+    {"op": "search", "terms": ["epa"], "limit": 50}  notes containing every term
+    {"op": "mods", "changed": ["ACME_INC.md"]}       the active mods of every client
+    {"op": "mutate", "ops": [...], "journal": false} batch operations, as noteTaker --batch takes them
+    {"op": "ping"}
+
+A file watcher re-parses client files as they change. A 'get' also checks
+the client's signature (one stat) and a 'mods' checks the files it names,
+or all of them, so answers never lag behind a save the watcher has not
+reported yet.
+
+Usage:
+    python src/service.py [--socket PATH] [--poll]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+from client_index import ClientIndex
+from client_list import client_name_from_id, list_clients
+from config import CLIENT_DIRS, SOCKET_PATH, client_files, client_path
+from logs import setup_logging
+from operations import apply_operations
+from query import NoteStore, parse_sections
+from service_client import encode_note
+from store import read_client_file
+from watcher import create_watcher
+
+# Requests are single lines; a large mutate batch can be several MB
+MAX_REQUEST = 64 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+class RequestError(Exception):
+    """A request the service cannot answer; `code` tells the client why."""
+
+    def __init__(self, message:str, code:str = "invalid"):
+        super().__init__(message)
+        self.code = code
+
+
+class NotesService:
+    """
+    The parsed notes of every client, kept current, and the request handlers.
+
+    Everything runs on the event loop's thread; only file writes and the
+    watcher's blocking reads are handed to worker threads.
+    Attributes:
+        store (NoteStore): Every note of every client, indexed.
+        digests (dict): client file path -> hash of the content its notes were parsed from.
+        clients (list[tuple[str, str]]): (client_id, client_name), sorted by ID.
+    """
+
+    def __init__(self, client_dirs:list[str] = None):
+        self.client_dirs = client_dirs or CLIENT_DIRS
+        self.store = NoteStore()
+        self.digests = {}
+        self.clients = []
+        self.index = None
+        self.dir_mtimes = None
+        self.handlers = {"ping": self.do_ping, "list": self.do_list, "get": self.do_get, "search": self.do_search,
+                         "mods": self.do_mods, "mutate": self.do_mutate}
+
+    def load(self, file_path:str) -> bool:
+        """Parse a client file unless its signature is unchanged; returns False if it does not exist."""
+        try:
+            signature, client_mods = self.store.lookup(file_path)
+            if client_mods is None:
+                content, digest = read_client_file(file_path)
+                client_name = client_name_from_id(os.path.basename(file_path)[:-3])
+                client_mods, _, sections = parse_sections(content, client_name)
+                self.store.store(file_path, signature, client_mods, sections)
+                self.digests[file_path] = digest
+        except FileNotFoundError:
+            self.forget(file_path)
+            return False
+        return True
+
+    def forget(self, file_path:str):
+        self.store.discard(file_path)
+        self.digests.pop(file_path, None)
+
+    def refresh(self, filenames=None) -> int:
+        """
+        Re-parse the client files that changed; returns how many were parsed.
+
+        `filenames` limits the check to those names (in every folder);
+        without it every file is checked and deleted clients are dropped.
+        """
+        self.store.parsed = 0
+        if filenames is None:
+            paths = client_files(self.client_dirs)
+            for file_path in paths:
+                self.load(file_path)
+            for file_path in set(self.digests) - set(paths):
+                self.forget(file_path)
+            return self.store.parsed
+
+        for filename in filenames:
+            current = client_path(filename[:-3], self.client_dirs)
+            for client_dir in self.client_dirs:
+                file_path = os.path.join(client_dir, filename)
+                # A client that exists in several folders is read from the first
+                if file_path != current or not self.load(file_path):
+                    self.forget(file_path)
+        return self.store.parsed
+
+    def client_list(self) -> list[tuple[str, str]]:
+        """The client list, re-listed only when a folder's mtime changed (files added, removed or renamed)."""
+        mtimes = [os.stat(client_dir).st_mtime_ns for client_dir in self.client_dirs]
+        if mtimes != self.dir_mtimes:
+            clients = {}
+            for client_dir in self.client_dirs:
+                for client_id, client_name in list_clients(client_dir):
+                    clients.setdefault(client_id, client_name)
+            self.clients = sorted(clients.items())
+            self.index = None
+            self.dir_mtimes = mtimes
+        return self.clients
+
+    def do_ping(self, request:dict) -> dict:
+        return {"clients": len(self.digests), "notes": len(self.store.refs)}
+
+    def do_list(self, request:dict) -> dict:
+        clients = self.client_list()
+        if request.get("query") is None:
+            return {"clients": clients}
+        if self.index is None:
+            self.index = ClientIndex(clients)
+            self.index.build_trigrams()
+        return {"clients": self.index.search(request["query"], request.get("limit") or 20)}
+
+    def do_get(self, request:dict) -> dict:
+        client_id = request.get("client")
+        if not client_id:
+            raise RequestError("get needs a client")
+        file_path = client_path(client_id, self.client_dirs)
+        if not self.load(file_path):
+            raise RequestError(f"Client file '{file_path}' does not exist.", code="not_found")
+        notes = sorted((self.store.refs[note_id].note for note_id in self.store.file_ids[file_path]),
+                       key=lambda note: note.start)
+        return {"notes": [encode_note(note) for note in notes], "digest": self.digests[file_path]}
+
+    def do_search(self, request:dict) -> dict:
+        terms = [term.lower() for term in request.get("terms") or ()]
+        if not terms:
+            raise RequestError("search needs terms")
+
+        def matches(ref):
+            note = ref.note
+            text = f"{note.action} {note.summary} {note.status or ''}".lower()
+            return all(term in text for term in terms)
+
+        query = self.store.query()
+        if request.get("client"):
+            query = query.where(client=request["client"])
+        query = query.filter(matches).order_by("-updated").limit(request.get("limit") or 50)
+        return {"notes": [{"client": os.path.basename(ref.file_path)[:-3], **encode_note(ref.note)}
+                          for ref in query]}
+
+    def do_mods(self, request:dict) -> dict:
+        self.refresh(request.get("changed"))
+        return {"clients": [{"name": client["name"],
+                             "in_progress": [encode_note(note) for note in client["in_progress"]],
+                             "que": [encode_note(note) for note in client["que"]]}
+                            for client in self.store.client_mods()]}
+
+    async def do_mutate(self, request:dict) -> dict:
+        ops = request.get("ops") or []
+        groups = {}
+        for op in ops:
+            groups.setdefault(op.get("client"), []).append(op)
+
+        async def apply_group(client_id:str, client_ops:list[dict]) -> list:
+            file_path = client_path(client_id, self.client_dirs)
+            results = await asyncio.to_thread(apply_operations, file_path, client_ops, bool(request.get("journal")))
+            self.load(file_path)
+            return results
+
+        # Client files are independent and each is locked while it is written, so they run in parallel
+        applied = await asyncio.gather(*(apply_group(client_id, client_ops)
+                                         for client_id, client_ops in groups.items()))
+        return {"results": [result for results in applied for result in results]}
+
+    async def handle(self, request:dict) -> dict:
+        handler = self.handlers.get(request.get("op"))
+        if handler is None:
+            raise RequestError(f"unknown request '{request.get('op')}'")
+        response = handler(request)
+        if asyncio.iscoroutine(response):
+            response = await response
+        return {"ok": True, **response}
+
+    async def serve_connection(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                try:
+                    response = await self.handle(json.loads(line))
+                except RequestError as e:
+                    response = {"ok": False, "error": str(e), "code": e.code}
+                except (ValueError, TypeError, KeyError, AttributeError) as e:
+                    response = {"ok": False, "error": f"bad request: {e}", "code": "invalid"}
+                except OSError as e:
+                    response = {"ok": False, "error": str(e), "code": "io"}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass  # client went away, or sent a line over MAX_REQUEST
+        finally:
+            writer.close()
+
+    def watch(self, loop:asyncio.AbstractEventLoop, poll:bool = False):
+        """Re-parse changed files as the watcher reports them; runs on its own thread."""
+        watcher = create_watcher(self.client_dirs, poll=poll)
+        while True:
+            changed = watcher.read_events(3600.0)
+            if changed:
+                loop.call_soon_threadsafe(self.refresh, changed)
+
+
+def socket_in_use(path:str) -> bool:
+    """Whether a service is already listening on `path`."""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+async def serve(service:NotesService, socket_path:str = SOCKET_PATH, poll:bool = False):
+    if os.path.exists(socket_path):
+        if socket_in_use(socket_path):
+            raise RuntimeError(f"a notes service is already listening on {socket_path}")
+        os.unlink(socket_path)  # left behind by a service that did not shut down
+
+    start = time.perf_counter()
+    service.refresh()
+    service.client_list()
+    logger.info(f"Loaded {len(service.store.refs)} notes of {len(service.digests)} clients "
+                f"in {time.perf_counter() - start:.2f}s")
+
+    loop = asyncio.get_running_loop()
+    threading.Thread(target=service.watch, args=(loop, poll), daemon=True).start()
+    server = await asyncio.start_unix_server(service.serve_connection, socket_path, limit=MAX_REQUEST)
+    os.chmod(socket_path, 0o600)
+    logger.info(f"Serving {', '.join(service.client_dirs)} on {socket_path}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        os.unlink(socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep every client's notes in memory and serve them on a Unix socket.")
+    parser.add_argument("--socket", default=SOCKET_PATH, help="Socket path (default: %(default)s)")
+    parser.add_argument("--dir", action="append",
+                        help="Client folder; repeat for several (default: NOTES_CLIENT_DIRS or the shared drive)")
+    parser.add_argument("--poll", action="store_true", help="Stat files on an interval instead of using inotify")
+    args = parser.parse_args()
+    setup_logging("service")
+
+    try:
+        asyncio.run(serve(NotesService(args.dir), args.socket, args.poll))
+    except KeyboardInterrupt:
+        pass
+    except RuntimeError as e:
+        logger.error(str(e))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,132 @@
+"""
+Client side of the notes service (src/service.py).
+
+Stdlib-only and cheap to import: noteTaker and the index daemon ask a
+running service for clients and notes over its Unix socket, and read the
+client files themselves when connect() finds no service listening.
+
+Requests and responses are single JSON objects, one per line:
+
+    -> {"op": "get", "client": "ACME_INC"}
+    <- {"ok": true, "notes": [...], "digest": "..."}
+    <- {"ok": false, "error": "...", "code": "not_found"}
+"""
+import json
+import socket
+import threading
+
+from config import SOCKET_PATH
+from note import Note
+
+# A service that is not listening refuses at once; this only bounds a hung one
+CONNECT_TIMEOUT = 0.5
+REQUEST_TIMEOUT = 60.0
+
+
+class ServiceUnavailable(Exception):
+    """The connection to the notes service was lost."""
+
+
+class ServiceError(Exception):
+    """The notes service could not carry out a request."""
+
+
+def encode_note(note:Note) -> dict:
+    return {"started": note.started, "updated": note.updated, "action": note.action, "summary": note.summary,
+            "status": note.status, "section": note.section, "start": note.start, "end": note.end}
+
+
+def decode_note(record:dict) -> Note:
+    return Note(record["started"], record["updated"], record["action"], record["summary"], record["status"],
+                section=record["section"], start=record["start"], end=record["end"])
+
+
+class ServiceClient:
+    """
+    One connection to the notes service.
+
+    Requests are sent one at a time; the connection may be shared between
+    threads.
+    """
+
+    def __init__(self, sock:socket.socket):
+        self.sock = sock
+        self.reader = sock.makefile("rb")
+        self.lock = threading.Lock()
+
+    def request(self, op:str, **fields) -> dict:
+        """
+        Send one request and return the response.
+
+        Raises:
+            ServiceUnavailable: If the service went away.
+            FileNotFoundError: If the request named a client that does not exist.
+            ServiceError: If the service rejected the request.
+        """
+        message = json.dumps({"op": op, **fields}).encode() + b"\n"
+        with self.lock:
+            try:
+                self.sock.sendall(message)
+                line = self.reader.readline()
+            except OSError as e:
+                raise ServiceUnavailable(str(e)) from e
+        if not line:
+            raise ServiceUnavailable("the notes service closed the connection")
+        response = json.loads(line)
+        if not response.get("ok"):
+            if response.get("code") == "not_found":
+                raise FileNotFoundError(response.get("error"))
+            raise ServiceError(response.get("error", f"{op} failed"))
+        return response
+
+    def list_clients(self, query:str = None, limit:int = None) -> list[tuple[str, str]]:
+        """(client_id, client_name) of every client, or the best `limit` matches of `query`."""
+        response = self.request("list", query=query, limit=limit)
+        return [tuple(client) for client in response["clients"]]
+
+    def get(self, client_id:str) -> tuple[list[Note], str]:
+        """A client's notes in file order and the hash of the content they were parsed from."""
+        response = self.request("get", client=client_id)
+        return [decode_note(record) for record in response["notes"]], response["digest"]
+
+    def search(self, terms:list[str], client:str = None, limit:int = 50) -> list[tuple[str, Note]]:
+        """(client_id, Note) of the notes containing every term, most recently updated first."""
+        response = self.request("search", terms=terms, client=client, limit=limit)
+        return [(record["client"], decode_note(record)) for record in response["notes"]]
+
+    def mods(self, changed:list[str] = None) -> list[dict]:
+        """
+        The active mods of every client, as NoteStore.client_mods() lists them.
+
+        `changed` names client files (e.g. 'ACME_INC.md') to check before
+        answering; without it every file is checked.
+        """
+        response = self.request("mods", changed=changed)
+        return [{"name": client["name"],
+                 "in_progress": [decode_note(record) for record in client["in_progress"]],
+                 "que": [decode_note(record) for record in client["que"]]}
+                for client in response["clients"]]
+
+    def mutate(self, ops:list[dict], journal:bool = False) -> list[tuple[dict, str]]:
+        """Apply batch operations; returns each operation with its error, or None on success."""
+        response = self.request("mutate", ops=ops, journal=journal)
+        return [(op, error) for op, error in response["results"]]
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+def connect(socket_path:str = SOCKET_PATH, timeout:float = CONNECT_TIMEOUT):
+    """Connect to the notes service; returns None when it is not running (or `socket_path` is None)."""
+    if not socket_path:
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        return None
+    sock.settimeout(REQUEST_TIMEOUT)
+    return ServiceClient(sock)
@@ -0,0 +1,176 @@
+import os
+import re
+
+from store import atomic_write
+
+# Sub-directories of the output folder; everything in them is generated
+CLIENT_PAGES = "clients"
+STATUS_PAGES = "status"
+ACTION_PAGES = "action"
+
+
+def client_page_name(client_name:str) -> str:
+    """Map a client's display name back to its file stem: 'A & B INC' -> 'A__B_INC'."""
+    return client_name.replace(" & ", "__").replace(" ", "_")
+
+
+def slug(text:str) -> str:
+    """File name for a status or action: 'Pending C&P' -> 'pending-c-p'."""
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "none"
+
+
+def client_notes(client:dict) -> list:
+    return client['in_progress'] + client['que']
+
+
+def render_client_page(client:dict) -> str:
+    """One client's active mods, linked to the client's notes page."""
+    page_name = client_page_name(client['name'])
+    parts = [f"# {client['name']}\n\n[Client notes](../../clients/{page_name}.md)\n\n"]
+    for heading, notes in (("In Progress", client['in_progress']), ("Que", client['que'])):
+        if notes:
+            parts.append(f"## {heading}\n\n")
+            parts.append("\n\n".join(note.to_markdown() for note in notes))
+            parts.append("\n")
+    return "".join(parts)
+
+
+def render_rollup_page(title:str, groups:list) -> str:
+    """A status or action page: the matching notes, grouped by client."""
+    parts = [f"# {title}\n\n"]
+    for client_name, notes in groups:
+        parts.append(f"### [{client_name}](../{CLIENT_PAGES}/{client_page_name(client_name)}.md)\n")
+        parts.append("\n\n".join(note.to_markdown() for note in notes))
+        parts.append("\n---\n")
+    return "".join(parts)
+
+
+def render_overview(client_mods:list, statuses:dict, actions:dict) -> str:
+    """The landing page of the folder: every client, status and action with counts."""
+    parts = ["# Active Client Actions\n\n## Clients\n\n"]
+    for client in client_mods:
+        parts.append(f"- [{client['name']}]({CLIENT_PAGES}/{client_page_name(client['name'])}.md)"
+                     f" ({len(client_notes(client))})\n")
+    for heading, directory, groups in (("Status", STATUS_PAGES, statuses), ("Action", ACTION_PAGES, actions)):
+        parts.append(f"\n## By {heading}\n\n")
+        for page, (values, client_groups) in sorted(groups.items(), key=lambda item: group_title(item[1][0])):
+            count = sum(len(notes) for _, notes in client_groups)
+            parts.append(f"- [{group_title(values)}]({directory}/{page}.md) ({count})\n")
+    return "".join(parts)
+
+
+def group_title(values:list) -> str:
+    return " / ".join(sorted(values))
+
+
+def add_to_group(groups:dict, value:str, client_name:str, note):
+    """
+    File a note under the page of its status or action.
+
+    Values that only differ in case or punctuation ('DESCRIPTION CHANGE',
+    'DESCRIPTION Change') share a page name, so they share the page.
+    Args:
+        groups (dict): Page name -> (values, [(client name, notes)]), in client order.
+    """
+    values, client_groups = groups.setdefault(slug(value), ([], []))
+    if value not in values:
+        values.append(value)
+    if not client_groups or client_groups[-1][0] != client_name:
+        client_groups.append((client_name, []))
+    client_groups[-1][1].append(note)
+
+
+def render_shards(client_mods:list) -> dict:
+    """
+    Render every page of the sharded output.
+
+    Returns:
+        dict: Page path relative to the output folder -> page content.
+    """
+    pages = {}
+    statuses = {}
+    actions = {}
+    for client in client_mods:
+        pages[f"{CLIENT_PAGES}/{client_page_name(client['name'])}.md"] = render_client_page(client)
+        for note in client_notes(client):
+            add_to_group(statuses, note.status, client['name'], note)
+            add_to_group(actions, note.action, client['name'], note)
+
+    for directory, groups, label in ((STATUS_PAGES, statuses, "Status"), (ACTION_PAGES, actions, "Action")):
+        for page, (values, client_groups) in groups.items():
+            pages[f"{directory}/{page}.md"] = render_rollup_page(f"{label}: {group_title(values)}", client_groups)
+    pages["index.md"] = render_overview(client_mods, statuses, actions)
+    return pages
+
+
+class ShardWriter:
+    """
+    Keeps a folder of per-client, per-status and per-action pages in sync.
+
+    Only pages whose content changed are rewritten, and pages that are no
+    longer produced (a client with no active work left, a status nobody is
+    in) are removed, so one note edit rewrites a handful of small pages
+    instead of the whole index. The content of every page is remembered
+    between passes; the folder is only read on the first pass.
+    Attributes:
+        directory (str): The output folder, e.g. docs/active.
+        pages (dict): Page path -> content currently on disk (None if not read yet).
+    """
+
+    def __init__(self, directory:str):
+        self.directory = directory
+        self.pages = None
+
+    def existing_pages(self) -> dict:
+        pages = dict.fromkeys(["index.md"] if os.path.exists(os.path.join(self.directory, "index.md")) else [])
+        for subdirectory in (CLIENT_PAGES, STATUS_PAGES, ACTION_PAGES):
+            try:
+                entries = os.scandir(os.path.join(self.directory, subdirectory))
+            except FileNotFoundError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.name.endswith(".md") and entry.is_file():
+                        pages[f"{subdirectory}/{entry.name}"] = None
+        return pages
+
+    def read_page(self, page:str):
+        try:
+            with open(os.path.join(self.directory, page), 'r') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, client_mods:list) -> tuple[list, list]:
+        """
+        Bring the folder in line with `client_mods`.
+
+        Returns:
+            tuple[list, list]: The pages written and the pages removed.
+        """
+        if self.pages is None:
+            self.pages = self.existing_pages()
+
+        rendered = render_shards(client_mods)
+        written = []
+        for page, content in rendered.items():
+            current = self.pages.get(page)
+            if current is None and page in self.pages:
+                current = self.read_page(page)
+            if current == content:
+                self.pages[page] = content
+                continue
+            path = os.path.join(self.directory, page)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write(path, content)
+            self.pages[page] = content
+            written.append(page)
+
+        removed = [page for page in self.pages if page not in rendered]
+        for page in removed:
+            try:
+                os.unlink(os.path.join(self.directory, page))
+            except FileNotFoundError:
+                pass
+            del self.pages[page]
+        return written, removed
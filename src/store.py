@@ -0,0 +1,209 @@
+import errno
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+from locking import client_lock
+from note import Note, tokenize_notes
+
+
+class ConcurrentModificationError(Exception):
+    """Raised when a client file changed on disk since its notes were read."""
+
+
+def content_hash(content:str) -> str:
+    """Return the hex SHA-256 of a file's content."""
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def journal_path(file_path:str) -> str:
+    """The operation journal of a client file: '.<name>.journal' next to it."""
+    directory, name = os.path.split(file_path)
+    return os.path.join(directory, f".{name}.journal")
+
+
+def read_client_content(file_path:str) -> str:
+    """Read a client file with the operations still pending in its journal applied."""
+    with open(file_path, "r") as f:
+        content = f.read()
+        stat_result = os.fstat(f.fileno())
+    if os.path.exists(journal_path(file_path)):
+        from journal import apply_pending  # journal builds on this module
+        content = apply_pending(file_path, content, stat_result)
+    return content
+
+
+def read_client_file(file_path:str) -> tuple[str, str]:
+    """Read a client file (journal applied) and return its content and content hash."""
+    content = read_client_content(file_path)
+    return content, content_hash(content)
+
+
+def atomic_write(file_path:str, content:str):
+    """
+    Replace a file so readers see either the old or the new content, never a mix.
+
+    The content goes to a temp file in the same directory, is fsynced and then
+    renamed over the original with os.replace(). The temp name does not end in
+    .md, so directory watchers ignore it.
+    """
+    directory = os.path.dirname(file_path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(file_path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(tmp_path, os.stat(file_path).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    # Persist the rename itself; not every filesystem supports fsync on directories
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def write_client_file(file_path:str, content:str):
+    """
+    Atomically replace a client file, folding in its journal.
+
+    `content` must already include the journal's pending operations (it is
+    derived from read_client_file). The journal is marked as folded into
+    this exact content before the file is replaced and deleted afterwards,
+    so a crash in between can never replay it a second time.
+    Callers hold the client's lock.
+    """
+    journal = journal_path(file_path)
+    if not os.path.exists(journal):
+        atomic_write(file_path, content)
+        return
+    with open(journal, "a") as f:
+        f.write(json.dumps({"compacted": content_hash(content)}) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    atomic_write(file_path, content)
+    os.unlink(journal)
+
+
+def edit_client_file(file_path:str, transform, expected_hash:str = None, op:str = "edit"):
+    """
+    Apply `transform` to a client file with one read and one atomic write.
+
+    The read-modify-write runs under the client's advisory lock, so
+    concurrent writers are serialized instead of overwriting each other.
+
+    Args:
+        file_path (str): The client file.
+        transform (callable): Takes the current content and returns the new
+            content, or None to leave the file untouched.
+        expected_hash (str): Hash of the content the caller's notes (and their
+            offsets) were parsed from. If the file no longer matches, nothing
+            is written and ConcurrentModificationError is raised.
+        op (str): What the edit does, for the client's version history.
+    Returns:
+        str: The hash of the new content, or None if nothing was written.
+    """
+    from history import record_change  # history builds on this module
+
+    if not os.path.exists(file_path):
+        # Don't leave a lock file behind for a client that does not exist
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), file_path)
+    with client_lock(file_path):
+        content, current_hash = read_client_file(file_path)
+        if expected_hash is not None and current_hash != expected_hash:
+            raise ConcurrentModificationError(f"{file_path} changed since it was read")
+
+        new_content = transform(content)
+        if new_content is None:
+            return None
+        write_client_file(file_path, new_content)
+        new_hash = content_hash(new_content)
+        record_change(file_path, content, new_content, op, current_hash, new_hash)
+    return new_hash
+
+
+def same_note(a:Note, b:Note) -> bool:
+    return (a.section, a.started_ordinal, a.updated_ordinal, a.action, a.summary, a.status) == \
+           (b.section, b.started_ordinal, b.updated_ordinal, b.action, b.summary, b.status)
+
+
+def relocate_note(content:str, note:Note):
+    """
+    Find `note` in a newer version of its file, where its offsets may have moved.
+
+    Returns the note as parsed from `content`, or None when it was changed or
+    removed, or when identical copies make it ambiguous.
+    """
+    candidates = [other for other in tokenize_notes(content).get(note.section, []) if same_note(other, note)]
+    if len(candidates) > 1:
+        candidates = [other for other in candidates if other.start == note.start]
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def edit_note(file_path:str, note:Note, change, expected_hash:str = None, op:str = "edit"):
+    """
+    Apply `change(content, note)` to one note of a client file.
+
+    `note` was parsed from the version of the file hashed `expected_hash`.
+    If the file was saved by someone else since, the edit is merged: it is
+    applied to the same note in the current version as long as that note
+    itself is unchanged, and rejected otherwise.
+    Raises:
+        ConcurrentModificationError: If the note was changed or removed meanwhile.
+    Returns:
+        str: The hash of the new content, or None if nothing was written.
+    """
+    def transform(content):
+        current = note
+        if expected_hash is not None and content_hash(content) != expected_hash:
+            current = relocate_note(content, note)
+            if current is None:
+                raise ConcurrentModificationError(f"the note in {file_path} changed since it was read")
+        return change(content, current)
+
+    return edit_client_file(file_path, transform, op=op)
+
+
+def splice(content:str, start:int, end:int, replacement:str = "") -> str:
+    """Replace content[start:end] with `replacement`."""
+    return content[:start] + replacement + content[end:]
+
+
+def insert_note(content:str, section:str, note:Note):
+    """Insert a note right after a section heading; None if the section is missing."""
+    section_match = re.search(f"## \\*{re.escape(section)}\\*", content)
+    if not section_match:
+        return None
+    pos = section_match.end()
+    return splice(content, pos, pos, "\n\n" + note.to_entry())
+
+
+def replace_note(content:str, note:Note, new_note:Note) -> str:
+    """Replace a parsed note (located by its offsets) with another note."""
+    return splice(content, note.start, note.end, new_note.to_entry())
+
+
+def remove_note(content:str, note:Note) -> str:
+    """Remove a parsed note and the line break that separated it from what follows."""
+    end = note.end
+    if content.startswith("\n\n", end):
+        end += 2
+    elif content.startswith("\n", end):
+        end += 1
+    return splice(content, note.start, end)
@@ -0,0 +1,163 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+from cache import file_signature
+
+# inotify event masks (see <sys/inotify.h>)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")
+JOURNAL_SUFFIX = ".journal"
+
+
+def watched_name(name:str, suffix:str):
+    """
+    Map a changed file name to the client file it affects, or None.
+
+    A change to the journal '.X.md.journal' is reported as a change to 'X.md'.
+    """
+    if name.startswith(".") and name.endswith(suffix + JOURNAL_SUFFIX):
+        return name[1:-len(JOURNAL_SUFFIX)]
+    if name.endswith(suffix):
+        return name
+    return None
+
+
+def as_directories(directory) -> list[str]:
+    """Watchers take one directory or a list of them."""
+    return [directory] if isinstance(directory, str) else list(directory)
+
+
+class InotifyWatcher:
+    """
+    Watch one or more directories through Linux inotify, loaded with ctypes from libc.
+
+    Blocks in select() between events, so an idle watcher costs no CPU.
+    Raises OSError from the constructor when inotify is not available.
+    """
+
+    def __init__(self, directory, suffix:str = ".md"):
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found, inotify unavailable")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify unavailable on this platform")
+
+        self.suffix = suffix
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        for path in as_directories(directory):
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                os.close(self.fd)
+                raise OSError(errno, f"inotify_add_watch failed for {path}")
+
+    def read_events(self, timeout:float) -> set[str]:
+        """Wait up to `timeout` seconds and return the file names that changed."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        names = set()
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode()
+            offset += length
+            name = watched_name(name, self.suffix)
+            if name:
+                names.add(name)
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """
+    Stdlib-only fallback that stats files instead of reading them.
+
+    Each poll is one directory scan plus one stat per file; file contents are
+    never touched until a signature (mtime, size, inode) changes.
+    """
+
+    def __init__(self, directory, suffix:str = ".md", interval:float = 1.0):
+        self.directories = as_directories(directory)
+        self.suffix = suffix
+        self.interval = interval
+        self.signatures = self._scan()
+
+    def _scan(self) -> dict:
+        signatures = {}
+        for directory in self.directories:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    name = watched_name(entry.name, self.suffix)
+                    if name:
+                        try:
+                            signatures[entry.path] = (name, file_signature(entry.stat()))
+                        except FileNotFoundError:
+                            continue
+        return signatures
+
+    def read_events(self, timeout:float) -> set[str]:
+        """Wait up to `timeout` seconds and return the file names that changed."""
+        time.sleep(min(timeout, self.interval))
+        current = self._scan()
+        previous = self.signatures
+        self.signatures = current
+        changed = {name for entry, (name, sig) in current.items() if previous.get(entry) != (name, sig)}
+        changed.update(name for entry, (name, _) in previous.items() if entry not in current)
+        return changed
+
+    def close(self):
+        pass
+
+
+def create_watcher(directory, poll:bool = False):
+    """Return an inotify watcher for a directory (or list of them), or a polling watcher if unavailable."""
+    if not poll:
+        try:
+            return InotifyWatcher(directory)
+        except OSError:
+            pass
+    return PollingWatcher(directory)
+
+
+def watch(watcher, debounce:float = 0.2, timeout:float = 3600.0):
+    """
+    Yield sets of changed file names, debouncing bursts of events.
+
+    After the first event, events keep being collected until the directory has
+    been quiet for `debounce` seconds, so a save that touches a file several
+    times produces a single batch.
+    """
+    while True:
+        changed = watcher.read_events(timeout)
+        if not changed:
+            continue
+        while True:
+            more = watcher.read_events(debounce)
+            if not more:
+                break
+            changed |= more
+        yield changed
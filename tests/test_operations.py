@@ -0,0 +1,57 @@
+import pytest
+
+from operations import apply_operation, apply_operations
+
+CONTENT = """# A INC
+
+## *In Progress*
+
+- Started: 2025-06-10
+  Updated: 2025-06-13
+  Action: EPA
+  Summary: Mass mod EPA
+  Status: Submitted
+
+--------------------
+
+## *Que*
+
+-----------------------------------
+
+## *Archive*
+
+-----------------------------------
+"""
+
+BAD_OPS = [
+    {"op": "update", "note": None, "status": "In FCP"},
+    {"op": "update", "note": True, "status": "In FCP"},
+    {"op": "update", "note": 1, "action": None},
+    {"op": "update", "note": 1, "summary": 42},
+    {"op": "update", "note": 1, "status": ["In FCP"]},
+    {"op": "add", "summary": None},
+    {"op": "add", "summary": "x", "action": None},
+    {"op": "add", "summary": "x", "section": 3},
+    {"op": "delete", "match": {"action": "EPA"}, "date": 20250613},
+]
+
+
+@pytest.mark.parametrize("op", BAD_OPS)
+def test_wrongly_typed_fields_raise_value_error(op):
+    with pytest.raises(ValueError):
+        apply_operation(CONTENT, op)
+
+
+def test_null_status_and_date_are_allowed():
+    content = apply_operation(CONTENT, {"op": "update", "note": 1, "status": None, "date": None})
+    assert "Status:" not in content.split("## *Que*")[0]
+
+
+def test_bad_line_fails_alone_in_its_client_group(tmp_path):
+    file_path = tmp_path / "A_INC.md"
+    file_path.write_text(CONTENT)
+    ops = [{"op": "update", "note": None}, {"op": "add", "summary": "kept", "date": "2026-01-02"}]
+    results = apply_operations(str(file_path), ops)
+
+    assert results[0][1] is not None and results[1][1] is None
+    assert "Summary: kept" in file_path.read_text()
@@ -0,0 +1,25 @@
+from note import Note
+from shards import render_shards
+
+
+def client(name:str, *notes:Note) -> dict:
+    return {"file_path": f"{name.replace(' ', '_')}.md", "name": name, "in_progress": list(notes), "que": []}
+
+
+def test_values_differing_only_in_case_share_one_page():
+    first = Note("2025-06-10", "2025-06-13", "DESCRIPTION Change", "Photo adds needed", "Needs Submission")
+    second = Note("2025-06-10", "2025-06-13", "DESCRIPTION CHANGE", "Names mismatched", "In FCP")
+    pages = render_shards([client("AVIATE ENTERPRISES INC", first), client("MANS DISTRIBUTORS INC", second)])
+
+    page = pages["action/description-change.md"]
+    assert "Photo adds needed" in page and "Names mismatched" in page
+    assert page.startswith("# Action: DESCRIPTION CHANGE / DESCRIPTION Change\n")
+    links = [line for line in pages["index.md"].splitlines() if "action/description-change.md" in line]
+    assert links == ["- [DESCRIPTION CHANGE / DESCRIPTION Change](action/description-change.md) (2)"]
+
+
+def test_notes_of_one_client_stay_under_one_heading():
+    notes = [Note("2025-06-10", "2025-06-13", action, "x", "In FCP") for action in ("EPA", "epa", "EPA")]
+    page = render_shards([client("A INC", *notes)])["action/epa.md"]
+    assert page.count("### [A INC]") == 1
+    assert page.count("```code") == 3